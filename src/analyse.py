@@ -0,0 +1,170 @@
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from bitboard import BitBoard
+from search import Search
+from tablebase import Tablebase
+from notation import parseSan, toSan
+from pgn import readPgn
+from fen import readEpd
+from parallel import defaultWorkers
+from worker import gameStatus
+from constants import START_FEN
+
+BACKENDS = {'grid': Board, 'bitboard': BitBoard}
+
+# Tasks queued per worker: keeps the workers busy without reading the whole file ahead
+PENDING_PER_WORKER = 4
+
+# Tablebases opened by this process, by directory (tasks only carry the directory, worker processes open their own)
+TABLEBASES = {}
+
+
+def openTablebase(directory):
+    # The process's Tablebase for a directory, or None without one
+    if not directory:
+        return None
+    if directory not in TABLEBASES:
+        TABLEBASES[directory] = Tablebase(directory)
+    return TABLEBASES[directory]
+
+
+def searchPosition(engine, board, legalMoves, depth, timeLimit):
+    # Searches the position and returns the best move in SAN with its score (side to move's view)
+    move = engine.search(board, depth=depth, timeLimit=timeLimit)
+    return toSan(board, move, legalMoves), engine.bestScore
+
+
+def replayGame(task):
+    # Replays one PGN game, checking every SAN move
+    # - With a depth or time limit, also searches each position before the move that was played
+    boardType, index, headers, sanMoves, depth, timeLimit, tablebases = task
+    record = {'game': index, 'white': headers.get('White'), 'black': headers.get('Black'), 'result': headers.get('Result')}
+
+    board = boardType.fromFen(headers.get('FEN', START_FEN))
+    engine = Search(tablebase=openTablebase(tablebases)) if depth or timeLimit else None
+    analysis = []
+    legalMoves = board.generateAllLegalMoves(board.turn)
+
+    for ply, san in enumerate(sanMoves, 1):
+        try:
+            move = parseSan(board, san, legalMoves)
+        except ValueError as error:
+            record['error'] = str(error)
+            record['errorPly'] = ply
+            break
+
+        if engine:
+            best, score = searchPosition(engine, board, legalMoves, depth, timeLimit)
+            analysis.append({'ply': ply, 'move': san, 'best': best, 'score': score})
+
+        board.makeMove(move)
+        legalMoves = board.generateAllLegalMoves(board.turn)
+
+    record['plies'] = len(board.history)
+    record['status'] = gameStatus(board, legalMoves)
+    record['fen'] = board.toFen()
+    if engine:
+        record['analysis'] = analysis
+    return record
+
+
+def analysePosition(task):
+    # Checks one EPD position and, with a depth or time limit, searches it
+    # - A 'bm' (best move) operation is compared with the move found
+    boardType, index, fen, operations, depth, timeLimit, tablebases = task
+    record = {'position': index, 'fen': fen}
+    if 'id' in operations:
+        record['id'] = operations['id']
+
+    try:
+        board = boardType.fromFen(fen)
+    except ValueError as error:
+        record['error'] = str(error)
+        return record
+
+    legalMoves = board.generateAllLegalMoves(board.turn)
+    record['legalMoves'] = len(legalMoves)
+    record['status'] = gameStatus(board, legalMoves)
+
+    if legalMoves and (depth or timeLimit):
+        engine = Search(tablebase=openTablebase(tablebases))
+        record['best'], record['score'] = searchPosition(engine, board, legalMoves, depth, timeLimit)
+        record['depth'] = engine.completedDepth
+        record['nodes'] = engine.nodes
+        if 'bm' in operations:
+            expected = operations['bm'].split()
+            record['expected'] = expected
+            record['solved'] = record['best'].rstrip('+#') in (san.rstrip('+#!?') for san in expected)
+
+    return record
+
+
+def readTasks(path, fileFormat, boardType, depth, timeLimit, tablebases=None):
+    # Streams (function, task) pairs from the input file
+    if fileFormat == 'pgn':
+        for index, (headers, sanMoves) in enumerate(readPgn(path), 1):
+            yield replayGame, (boardType, index, headers, sanMoves, depth, timeLimit, tablebases)
+    else:
+        for index, (fen, operations) in enumerate(readEpd(path), 1):
+            yield analysePosition, (boardType, index, fen, operations, depth, timeLimit, tablebases)
+
+
+def runTasks(tasks, workers):
+    # Runs the tasks and yields their results in input order
+    # - Only a bounded number of tasks are in flight, so memory stays flat however long the input is
+    if workers <= 1:
+        for function, task in tasks:
+            yield function(task)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for function, task in tasks:
+            pending.append(pool.submit(function, task))
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay or analyse PGN games and EPD positions, writing one JSON record per line")
+    parser.add_argument("input", help="PGN or EPD/FEN file")
+    parser.add_argument("--format", choices=['pgn', 'epd'], help="input format (default: from the file extension)")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=defaultWorkers(), help="worker processes (1 runs in this process)")
+    parser.add_argument("--depth", type=int, help="search depth per position (default: replay only)")
+    parser.add_argument("--time", type=float, help="search seconds per position")
+    parser.add_argument("--backend", choices=list(BACKENDS), default='grid', help="board backend")
+    parser.add_argument("--tablebases", help="endgame tablebase directory (built by tablebase.py generate)")
+    args = parser.parse_args()
+
+    fileFormat = args.format or ('pgn' if args.input.lower().endswith('.pgn') else 'epd')
+    tasks = readTasks(args.input, fileFormat, BACKENDS[args.backend], args.depth, args.time, args.tablebases)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    count = 0
+    errors = 0
+    start = time.perf_counter()
+    try:
+        for record in runTasks(tasks, args.workers):
+            count += 1
+            errors += 'error' in record
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{count} records, {errors} errors in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
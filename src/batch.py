@@ -0,0 +1,141 @@
+import numpy as np
+
+from evaluation import SCORES_MG, SCORES_EG, PHASE_WEIGHTS, MAX_PHASE
+from constants import DIMENSION, PIECE_TYPES
+
+COLOURS = ('w', 'b')
+SQUARE_COUNT = DIMENSION * DIMENSION
+
+# Plane of each (colour, type): white P N B R Q K, then black (same order as the BitBoard piece codes)
+PLANES = {(colour, pieceType): index * 6 + typeIndex for index, colour in enumerate(COLOURS) for typeIndex, pieceType in enumerate(PIECE_TYPES)}
+PLANE_COUNT = 12
+
+# Mailbox code of an empty square, and of a character that is not a piece
+EMPTY = PLANE_COUNT
+INVALID = 255
+
+# Signed material + piece-square scores per mailbox code and square (white positive, empty squares score 0)
+CODE_SCORES_MG = np.array([SCORES_MG[colour][pieceType] for colour in COLOURS for pieceType in PIECE_TYPES] + [[0] * SQUARE_COUNT], dtype=np.int32)
+CODE_SCORES_EG = np.array([SCORES_EG[colour][pieceType] for colour in COLOURS for pieceType in PIECE_TYPES] + [[0] * SQUARE_COUNT], dtype=np.int32)
+CODE_PHASE = np.array([PHASE_WEIGHTS[pieceType] for _ in COLOURS for pieceType in PIECE_TYPES] + [0], dtype=np.int32)
+
+# FEN placement -> one character per square ('.' for empty), done by str.translate
+FEN_EXPAND = str.maketrans({**{str(empty): '.' * empty for empty in range(1, DIMENSION + 1)}, '/': None})
+
+# FEN character byte -> mailbox code
+CHAR_CODES = np.full(256, INVALID, dtype=np.uint8)
+CHAR_CODES[ord('.')] = EMPTY
+for (colour, pieceType), plane in PLANES.items():
+    CHAR_CODES[ord(pieceType if colour == 'w' else pieceType.lower())] = plane
+
+# (colour, type) and BitBoard piece code -> FEN character byte
+PIECE_BYTES = {(colour, pieceType): ord(pieceType if colour == 'w' else pieceType.lower()) for colour, pieceType in PLANES}
+CODE_BYTES = [PIECE_BYTES[colour, pieceType] for colour in COLOURS for pieceType in PIECE_TYPES]
+
+SQUARE_INDEX = np.arange(SQUARE_COUNT)
+
+
+def boardSquares(board):
+    # One FEN character per square ('.' for empty) for a Board or BitBoard
+    squares = bytearray(b'.' * SQUARE_COUNT)
+
+    mailbox = getattr(board, 'mailbox', None)
+    if mailbox is not None:
+        for sq, code in enumerate(mailbox):
+            if code is not None:
+                squares[sq] = CODE_BYTES[code]
+        return squares
+
+    grid = board.grid
+    for colour in COLOURS:
+        for row, col in board.pieceSqs[colour]:
+            squares[row * DIMENSION + col] = PIECE_BYTES[colour, grid[row][col].type]
+    return squares
+
+
+def encodeMailboxes(positions):
+    # Encodes Boards, BitBoards or FEN strings as mailbox codes
+    # - Returns (mailboxes, turns): mailboxes is uint8 N x 64 holding the piece plane of each square (EMPTY for none),
+    #   turns is +1 for white to move, -1 for black
+    # - FEN placements are expanded with str.translate and the whole batch is decoded in one table lookup
+    chunks = []
+    turns = []
+
+    for position in positions:
+        if isinstance(position, str):
+            placement, _, rest = position.partition(' ')
+            chunk = placement.translate(FEN_EXPAND).encode('ascii', 'replace')
+            if len(chunk) != SQUARE_COUNT:
+                raise ValueError(f"Invalid FEN placement: {placement!r}")
+            chunks.append(chunk)
+            turns.append(-1 if rest[:1] == 'b' else 1)
+        else:
+            chunks.append(boardSquares(position))
+            turns.append(1 if position.turn == 'w' else -1)
+
+    mailboxes = CHAR_CODES[np.frombuffer(b''.join(chunks), dtype=np.uint8)].reshape(len(chunks), SQUARE_COUNT)
+    if (mailboxes == INVALID).any():
+        raise ValueError("Invalid FEN placement in batch")
+
+    return mailboxes, np.array(turns, dtype=np.int32)
+
+
+def planesFromMailboxes(mailboxes):
+    # One-hot piece planes: uint8 N x 12 x 64
+    return (mailboxes[:, None, :] == np.arange(PLANE_COUNT, dtype=np.uint8)[None, :, None]).astype(np.uint8)
+
+
+def encodePositions(positions):
+    # Encodes Boards, BitBoards or FEN strings into piece planes
+    # - Returns (planes, turns): planes is uint8 N x 12 x 64, turns is +1 for white to move, -1 for black
+    mailboxes, turns = encodeMailboxes(positions)
+    return planesFromMailboxes(mailboxes), turns
+
+
+def taperScores(mg, eg, phase, turns):
+    # Tapered scores from the side to move's point of view (taper and sideToMoveScore over a batch)
+    phase = np.minimum(phase, MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    return score * turns
+
+
+def evaluateMailboxes(mailboxes, turns):
+    # Tapered material + piece-square scores from the side to move's point of view
+    # - Matches evaluatePieces position by position
+    mg = CODE_SCORES_MG[mailboxes, SQUARE_INDEX].sum(axis=1)
+    eg = CODE_SCORES_EG[mailboxes, SQUARE_INDEX].sum(axis=1)
+    phase = CODE_PHASE[mailboxes].sum(axis=1)
+    return taperScores(mg, eg, phase, turns)
+
+
+def evaluateBoards(boards):
+    # Scores built Boards or BitBoards from the totals they keep up to date incrementally
+    # - Nothing is gathered per square: only the tapering is vectorized
+    totals = np.array([(board.mg, board.eg, board.phase, 1 if board.turn == 'w' else -1) for board in boards], dtype=np.int64).reshape(-1, 4)
+    return taperScores(*totals.T)
+
+
+def evaluateBatch(positions):
+    # Evaluates many Boards, BitBoards or FEN strings in one vectorized pass
+    # - FEN strings are decoded and scored square by square, built boards from their incremental totals
+    positions = list(positions)
+    fenIndexes = [index for index, position in enumerate(positions) if isinstance(position, str)]
+    boardIndexes = [index for index, position in enumerate(positions) if not isinstance(position, str)]
+
+    scores = np.zeros(len(positions), dtype=np.int64)
+    if fenIndexes:
+        scores[fenIndexes] = evaluateMailboxes(*encodeMailboxes([positions[index] for index in fenIndexes]))
+    if boardIndexes:
+        scores[boardIndexes] = evaluateBoards([positions[index] for index in boardIndexes])
+    return scores
+
+
+def networkInput(positions):
+    # Encodes positions as float32 N x 12 x 8 x 8 from the side to move's point of view
+    # - Planes 0-5 are the side to move's pieces, 6-11 the opponent's
+    # - Positions with black to move are mirrored vertically so the side to move always plays up the board
+    planes, turns = encodePositions(positions)
+    boards = planes.reshape(len(planes), PLANE_COUNT, DIMENSION, DIMENSION).astype(np.float32)
+    black = turns < 0
+    boards[black] = boards[black][:, [*range(6, 12), *range(6)], ::-1, :]
+    return boards
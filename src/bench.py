@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from board import Board
+from bitboard import BitBoard
+from parallel import parallelPerft, ParallelSearch, defaultWorkers
+from search import Search
+from constants import START_FEN
+
+BACKENDS = {'grid': Board, 'bitboard': BitBoard}
+
+# Standard perft positions with known node counts (index = depth - 1)
+POSITIONS = [
+    ("start", START_FEN,
+        [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603]),
+    ("en passant", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624]),
+    ("promotion", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333]),
+    ("castling", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487]),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594]),
+    # The castling field claims White's queen side, but there is no rook on a1: the right must be dropped
+    ("bad rights", "r3k2r/8/8/8/8/8/8/4K2R w KQkq - 0 1",
+        [15, 336, 5167, 123854]),
+]
+
+
+def runBenchmark(backends, depth, out=sys.stdout):
+    # Runs perft over every position for each backend
+    # - Reports nodes per second and checks the counts against the known values
+    # - Returns True if every count matched
+    passed = True
+
+    for backendName in backends:
+        boardType = BACKENDS[backendName]
+        totalNodes = 0
+        totalTime = 0.0
+
+        for name, fen, counts in POSITIONS:
+            positionDepth = min(depth, len(counts))
+            board = boardType.fromFen(fen)
+
+            start = time.perf_counter()
+            nodes = board.perft(positionDepth)
+            elapsed = time.perf_counter() - start
+
+            expected = counts[positionDepth - 1]
+            status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+            passed = passed and nodes == expected
+            totalNodes += nodes
+            totalTime += elapsed
+
+            print(f"{backendName:9} {name:11} depth {positionDepth}  {nodes:>9} nodes  {elapsed:7.2f}s  {nodes / elapsed:>9.0f} nps  {status}", file=out)
+
+        print(f"{backendName:9} total               {totalNodes:>9} nodes  {totalTime:7.2f}s  {totalNodes / totalTime:>9.0f} nps", file=out)
+
+    return passed
+
+
+def workerCounts(maxWorkers):
+    # 1, 2, 4, ... up to and including maxWorkers
+    counts = []
+    workers = 1
+    while workers < maxWorkers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(maxWorkers)
+    return counts
+
+
+def runParallelBenchmark(depth, maxWorkers, out=sys.stdout):
+    # Reports the speedup per core of parallel perft (root split) and lazy SMP search (time to depth)
+    name, fen, counts = POSITIONS[1]
+    perftDepth = min(depth + 1, len(counts))
+
+    start = time.perf_counter()
+    nodes = Board.fromFen(fen).perft(perftDepth)
+    serialTime = time.perf_counter() - start
+    print(f"perft   {name} depth {perftDepth}  serial     {serialTime:7.2f}s  {nodes} nodes", file=out)
+
+    for workers in workerCounts(maxWorkers):
+        start = time.perf_counter()
+        parallelNodes = parallelPerft(Board.fromFen(fen), perftDepth, workers)
+        elapsed = time.perf_counter() - start
+        status = "ok" if parallelNodes == counts[perftDepth - 1] else f"FAIL ({parallelNodes})"
+        speedup = serialTime / elapsed
+        print(f"perft   {name} depth {perftDepth}  {workers:2} workers {elapsed:7.2f}s  speedup {speedup:5.2f}  per core {speedup / workers:4.2f}  {status}", file=out)
+
+    searchDepth = depth + 2
+    start = time.perf_counter()
+    Search().search(Board.fromFen(fen), depth=searchDepth)
+    serialTime = time.perf_counter() - start
+    print(f"search  {name} depth {searchDepth}  serial     {serialTime:7.2f}s", file=out)
+
+    for workers in workerCounts(maxWorkers):
+        search = ParallelSearch(workers)
+        try:
+            start = time.perf_counter()
+            search.search(Board.fromFen(fen), depth=searchDepth)
+            elapsed = time.perf_counter() - start
+        finally:
+            search.close()
+        speedup = serialTime / elapsed
+        print(f"search  {name} depth {searchDepth}  {workers:2} workers {elapsed:7.2f}s  speedup {speedup:5.2f}  per core {speedup / workers:4.2f}", file=out)
+
+
+def runSearchBenchmark(depth, out=sys.stdout):
+    # Searches every position to a fixed depth, reporting nodes, time and the move ordering cutoff statistics
+    totalNodes = 0
+    totalTime = 0.0
+
+    for name, fen, _ in POSITIONS:
+        search = Search()
+        start = time.perf_counter()
+        move = search.search(Board.fromFen(fen), depth=depth)
+        elapsed = time.perf_counter() - start
+        stats = search.stats()
+        totalNodes += stats['nodes']
+        totalTime += elapsed
+
+        print(f"search  {name:11} depth {depth}  {move.toUci():6} {stats['nodes']:>8} nodes  {elapsed:6.2f}s  cutoffs {stats['cutoffs']:>6}  first move {stats['firstMoveCutoffRate']:6.1%}", file=out)
+
+    print(f"search  total                      {totalNodes:>8} nodes  {totalTime:6.2f}s", file=out)
+
+
+def randomPositions(count, seed=1):
+    # FENs from random games played from the starting position
+    rng = random.Random(seed)
+    fens = []
+    board = Board()
+    while len(fens) < count:
+        moves = board.generateAllLegalMoves(board.turn)
+        if not moves or len(board.history) >= 200:
+            board = Board()
+            continue
+        board.makeMove(rng.choice(moves))
+        fens.append(board.toFen())
+    return fens
+
+
+def runBatchBenchmark(count, out=sys.stdout):
+    # Compares vectorized batch evaluation against evaluating one board at a time
+    # - Built boards already keep their evaluation incrementally, so batching only pays off for FEN input:
+    #   a batch slower than the loop is reported as SLOWER rather than passing
+    from batch import evaluateBatch
+
+    fens = randomPositions(count)
+    boards = [Board.fromFen(fen) for fen in fens]
+
+    for name, positions, loop in (
+        ("fen", fens, lambda: [Board.fromFen(fen).evaluate() for fen in fens]),
+        ("board", boards, lambda: [board.evaluate() for board in boards]),
+    ):
+        start = time.perf_counter()
+        expected = loop()
+        loopTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = evaluateBatch(positions)
+        batchTime = time.perf_counter() - start
+
+        if list(scores) != expected:
+            status = "FAIL"
+        elif batchTime > loopTime:
+            status = "SLOWER"
+        else:
+            status = "ok"
+        print(f"batch   {name:5} {count} positions  loop {loopTime:6.3f}s  batch {batchTime:6.3f}s  speedup {loopTime / batchTime:5.1f}  {status}", file=out)
+
+
+# Games replayed under tracemalloc to measure memory (tracing slows everything down a lot)
+SERVER_MEMORY_GAMES = 200
+
+
+async def playServerGames(server, games, plies, seed):
+    # Plays games concurrently through local clients, each picking random legal moves
+    from server import LocalClient
+
+    async def playGame(rng):
+        client = LocalClient(server)
+        reply = await client.request('new')
+        gameId = reply['game']
+        for _ in range(plies):
+            if reply['status']:
+                break
+            moves = (await client.request('moves', game=gameId))['moves']
+            reply = await client.request('move', game=gameId, move=rng.choice(moves))
+
+    await asyncio.gather(*(playGame(random.Random(seed + index)) for index in range(games)))
+
+
+def runServerBenchmark(games, plies=40, out=sys.stdout):
+    # Hosts games concurrently on the asyncio server and reports moves per second and memory per game
+    from server import GameServer
+
+    server = GameServer()
+    start = time.perf_counter()
+    asyncio.run(playServerGames(server, games, plies, seed=1))
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    print(f"server  {games} games  {stats['movesPlayed']} moves  {elapsed:6.2f}s  {stats['movesPlayed'] / elapsed:8.0f} moves/s  "
+          f"cache hit rate {stats['cacheHitRate']:5.1%}", file=out)
+
+    # Memory: a sample of the games again under tracemalloc, with the shared move cache measured apart
+    games = min(games, SERVER_MEMORY_GAMES)
+    server = GameServer()
+    tracemalloc.start()
+    asyncio.run(playServerGames(server, games, plies, seed=1))
+    withCache = tracemalloc.get_traced_memory()[0]
+    cachedPositions = len(server.moveCache)
+    server.moveCache.clear()
+    sessionsOnly = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"server  {sessionsOnly / games:8.0f} bytes per game  move cache {(withCache - sessionsOnly) / 1024:8.0f} KB "
+          f"({cachedPositions} positions)", file=out)
+
+
+# Startup scenarios, each run in a fresh interpreter: prints {step: seconds} plus peak RSS in KB and whether pygame was imported
+# - headless: the engine modules (game included, which must not pull in pygame)
+# - gui: importing pygame, creating the window with the pieces, and a second Gui (sprites already scaled)
+STARTUP_SCRIPTS = {
+    'headless': (
+        "import json, resource, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import board, bitboard, movegen, search, game\n"
+        "board.Board().generateAllLegalMoves('w')\n"
+        "steps = {'imports': time.perf_counter() - start}\n"
+        "print(json.dumps([steps, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pygame' in sys.modules]))\n"
+    ),
+    'gui': (
+        "import json, resource, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import pygame, gui\n"
+        "steps = {'import pygame': time.perf_counter() - start}\n"
+        "start = time.perf_counter()\n"
+        "pygame.display.init()\n"
+        "gui.Gui()\n"
+        "steps['first Gui'] = time.perf_counter() - start\n"
+        "start = time.perf_counter()\n"
+        "gui.Gui()\n"
+        "steps['second Gui'] = time.perf_counter() - start\n"
+        "print(json.dumps([steps, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pygame' in sys.modules]))\n"
+    ),
+}
+
+
+def timeStartup(script):
+    # Runs a startup script in a fresh interpreter (no display needed) and returns ({step: seconds}, peak RSS KB, pygame imported)
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    output = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def runStartupBenchmark(repeats=5, out=sys.stdout):
+    # Reports the best time of each startup step over several fresh starts, with the peak memory
+    for name, script in STARTUP_SCRIPTS.items():
+        runs = [timeStartup(script) for _ in range(repeats)]
+        memory = min(run[1] for run in runs)
+        for step in runs[0][0]:
+            elapsed = min(run[0][step] for run in runs)
+            print(f"startup {name:8} {step:13} {elapsed * 1000:7.1f} ms", file=out)
+        print(f"startup {name:8} peak RSS {memory / 1024:6.1f} MB  pygame imported: {runs[0][2]}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft move generation benchmark")
+    parser.add_argument("--depth", type=int, default=3, help="perft depth (capped at the deepest known count)")
+    parser.add_argument("--backend", choices=list(BACKENDS), action="append", help="board backend to test (default: all)")
+    parser.add_argument("--parallel", action="store_true", help="measure multi-process perft and search speedup instead")
+    parser.add_argument("--workers", type=int, default=defaultWorkers(), help="most worker processes to try with --parallel")
+    parser.add_argument("--search", type=int, metavar="DEPTH", help="measure fixed depth search and move ordering instead")
+    parser.add_argument("--batch", type=int, metavar="N", help="measure NumPy batch evaluation of N positions instead (needs numpy)")
+    parser.add_argument("--startup", action="store_true", help="measure headless and GUI startup time and memory instead")
+    parser.add_argument("--server", type=int, metavar="GAMES", help="measure the multi-game server with GAMES concurrent games instead")
+    args = parser.parse_args()
+
+    if args.server:
+        runServerBenchmark(args.server)
+        return
+
+    if args.startup:
+        runStartupBenchmark()
+        return
+
+    if args.search:
+        runSearchBenchmark(args.search)
+        return
+
+    if args.batch:
+        runBatchBenchmark(args.batch)
+        return
+
+    if args.parallel:
+        runParallelBenchmark(args.depth, args.workers)
+        return
+
+    passed = runBenchmark(args.backend or list(BACKENDS), args.depth)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,813 @@
+from piece import Piece
+from move import Move, encodeMove, PROMOTION_PIECES, FLAG_CAPTURE, FLAG_EN_PASSANT, FLAG_CASTLE
+from fen import parseFen, formatFen
+from movecache import LegalMoveCache
+from movegen import GEN_ALL, GEN_CAPTURES, GEN_QUIETS, GEN_CHECKS
+from perft import perftPacked, divide
+from evaluation import evaluatePieces, sideToMoveScore, SCORES_MG, SCORES_EG, PHASE_WEIGHTS
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE, CASTLING_CHARS, FIFTY_MOVE_PLIES, countRepetitions
+from constants import DIMENSION, START_FEN, KNIGHT_OFFSETS, BISHOP_DIRECTIONS, ROOK_DIRECTIONS, KING_OFFSETS
+
+# Colour and piece type indices used by the bitboard arrays
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+COLOURS = ('w', 'b')
+PIECE_TYPES = ('P', 'N', 'B', 'R', 'Q', 'K')
+COLOUR_INDEX = {'w': WHITE, 'b': BLACK}
+TYPE_INDEX = {'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+
+# Shared Piece objects handed out through getPiece/grid and Moves (indexed by colour * 6 + type)
+PIECES = [Piece(colour, pieceType) for colour in COLOURS for pieceType in PIECE_TYPES]
+
+# Square index (row * 8 + col) to (row, col)
+SQUARES = [divmod(sq, DIMENSION) for sq in range(DIMENSION * DIMENSION)]
+
+# Zobrist piece keys, piece-square scores and phase weights indexed by piece code
+CODE_KEYS = [PIECE_KEYS[colour][pieceType] for colour in COLOURS for pieceType in PIECE_TYPES]
+CODE_SCORES_MG = [SCORES_MG[colour][pieceType] for colour in COLOURS for pieceType in PIECE_TYPES]
+CODE_SCORES_EG = [SCORES_EG[colour][pieceType] for colour in COLOURS for pieceType in PIECE_TYPES]
+CODE_PHASE = [PHASE_WEIGHTS[pieceType] for colour in COLOURS for pieceType in PIECE_TYPES]
+
+
+def buildLeaperTable(offsets):
+    # Builds the attack mask of a single step piece for every square
+    table = []
+    for sq in range(64):
+        row, col = SQUARES[sq]
+        mask = 0
+        for rowOffset, colOffset in offsets:
+            r = row + rowOffset
+            c = col + colOffset
+            if 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+                mask |= 1 << (r * DIMENSION + c)
+        table.append(mask)
+    return table
+
+
+def buildRayTable(direction):
+    # Builds the mask of every square along a direction (excluding the origin) for every square
+    rowDir, colDir = direction
+    table = []
+    for sq in range(64):
+        row, col = SQUARES[sq]
+        mask = 0
+        r = row + rowDir
+        c = col + colDir
+        while 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+            mask |= 1 << (r * DIMENSION + c)
+            r += rowDir
+            c += colDir
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = buildLeaperTable(KNIGHT_OFFSETS)
+KING_ATTACKS = buildLeaperTable(KING_OFFSETS)
+
+# Squares attacked by a pawn of each colour (white pawns move towards row 0)
+PAWN_ATTACKS = [buildLeaperTable([(-1, -1), (-1, 1)]), buildLeaperTable([(1, -1), (1, 1)])]
+
+# Ray tables paired with whether the direction increases the square index
+# - Increasing rays are blocked by their lowest set bit, decreasing rays by their highest
+ROOK_RAYS = [(buildRayTable(d), d[0] * DIMENSION + d[1] > 0) for d in ROOK_DIRECTIONS]
+BISHOP_RAYS = [(buildRayTable(d), d[0] * DIMENSION + d[1] > 0) for d in BISHOP_DIRECTIONS]
+
+# Castling rights kept after a move touches a square (king and rook home squares)
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[60] = 15 & ~(WHITE_KING_SIDE | WHITE_QUEEN_SIDE)
+CASTLING_MASK[63] = 15 & ~WHITE_KING_SIDE
+CASTLING_MASK[56] = 15 & ~WHITE_QUEEN_SIDE
+CASTLING_MASK[4] = 15 & ~(BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+CASTLING_MASK[7] = 15 & ~BLACK_KING_SIDE
+CASTLING_MASK[0] = 15 & ~BLACK_QUEEN_SIDE
+
+# Squares and piece codes a castling right needs in place: right -> ((king square, code), (rook square, code))
+CASTLING_PIECES = {
+    WHITE_KING_SIDE: ((60, WHITE * 6 + KING), (63, WHITE * 6 + ROOK)),
+    WHITE_QUEEN_SIDE: ((60, WHITE * 6 + KING), (56, WHITE * 6 + ROOK)),
+    BLACK_KING_SIDE: ((4, BLACK * 6 + KING), (7, BLACK * 6 + ROOK)),
+    BLACK_QUEEN_SIDE: ((4, BLACK * 6 + KING), (0, BLACK * 6 + ROOK)),
+}
+
+# Per colour pawn data: push offset, double push start row, promotion row
+PAWN_PUSH = (-DIMENSION, DIMENSION)
+PAWN_START_ROW = (6, 1)
+PAWN_PROMOTION_ROW = (0, DIMENSION - 1)
+
+# Packed move promotion codes (Q, R, B, N) and the piece type index for each code
+PROMOTION_MOVE_CODES = [code << 12 for code in range(1, 5)]
+PROMOTION_TYPE_INDEX = [None] + [TYPE_INDEX[pieceType] for pieceType in PROMOTION_PIECES[1:]]
+
+
+def slidingAttacks(sq, occupied, rays):
+    # Classical ray attacks: each ray is cut off behind its first blocker
+    attacks = 0
+    for table, increasing in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if increasing:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def buildBetweenTable():
+    # Squares strictly between two squares on a shared rank, file or diagonal (0 when they are not aligned)
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        row, col = SQUARES[sq]
+        for rowDir, colDir in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            between = 0
+            r = row + rowDir
+            c = col + colDir
+            while 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+                table[sq][r * DIMENSION + c] = between
+                between |= 1 << (r * DIMENSION + c)
+                r += rowDir
+                c += colDir
+    return table
+
+
+BETWEEN = buildBetweenTable()
+
+# Rook and bishop lines from each square on an empty board (the sliders that could pin or check along them)
+ROOK_LINES = [slidingAttacks(sq, 0, ROOK_RAYS) for sq in range(64)]
+BISHOP_LINES = [slidingAttacks(sq, 0, BISHOP_RAYS) for sq in range(64)]
+
+ALL_SQUARES = (1 << 64) - 1
+
+
+class BitBoard:
+    """
+    Bitboard chess board (alternative to Board)
+    - Stores the position as 64-bit occupancy ints per colour and piece type
+    - Uses precomputed knight/king/pawn attack tables and classical ray sliding attacks
+    - Exposes the same getPiece/grid/makeMove/undoMove/generateAllLegalMoves API as Board
+    - Keeps the same Zobrist hash as Board for a given position, and the hashes of earlier positions for repetition checks
+    - Generates and makes packed int moves (undo state on a board-side stack), Move objects only at the API
+    - Generates legal moves directly from the checkers and pinned pieces, found once per position with between-square masks
+    - Keeps the middlegame/endgame piece-square scores and game phase updated incrementally for evaluation
+    """
+    # Recomputes the hash from scratch after every make/undo and raises on drift
+    debugHash = False
+
+    # Recomputes the evaluation from scratch after every make/undo and raises on drift
+    debugEval = False
+
+    def __init__(self, fen=START_FEN):
+        # Sets up the position from a FEN string (the starting position by default)
+        self.setFen(fen)
+
+
+    @classmethod
+    def fromFen(cls, fen=START_FEN):
+        # Builds a board from a FEN string
+        return cls(fen)
+
+
+    def setFen(self, fen):
+        # Replaces the position with a FEN string
+        placement, turn, castling, enPassantSq, halfMoveClock, fullMoveNumber = parseFen(fen)
+
+        self.pieces = [[0] * 6 for _ in COLOURS]
+        self.occupancy = [0, 0]
+        self.mailbox = [None] * 64
+        self.hash = 0
+        self.mg = self.eg = self.phase = 0
+        for row, col, colour, pieceType in placement:
+            self.putPiece(row * DIMENSION + col, COLOUR_INDEX[colour] * 6 + TYPE_INDEX[pieceType])
+
+        # Castling rights whose king or rook is not on its home square are dropped
+        self.castlingRights = 0
+        for char, right in CASTLING_CHARS:
+            if char in castling and all(self.mailbox[sq] == code for sq, code in CASTLING_PIECES[right]):
+                self.castlingRights |= right
+
+        self.epSquare = None if enPassantSq is None else enPassantSq[0] * DIMENSION + enPassantSq[1]
+        self.turn = turn
+        self.halfMoveClock = halfMoveClock
+        self.fullMoveNumber = fullMoveNumber
+        self.history = []
+        self.hashHistory = []
+        self.undoStack = []
+        self.legalMoveCache = None
+        self.hash = self.computeHash()
+
+
+    def enPassantKey(self):
+        # Key of the en Passant square, only if the side to move has a pawn that can capture on it
+        if self.epSquare is None:
+            return 0
+
+        us = COLOUR_INDEX[self.turn]
+        if PAWN_ATTACKS[us ^ 1][self.epSquare] & self.pieces[us][PAWN]:
+            return EN_PASSANT_KEYS[self.epSquare % DIMENSION]
+        return 0
+
+
+    def computeHash(self):
+        # Computes the Zobrist hash from scratch
+        key = 0
+        for sq, code in enumerate(self.mailbox):
+            if code is not None:
+                key ^= CODE_KEYS[code][sq]
+
+        if self.turn == 'b':
+            key ^= SIDE_KEY
+
+        return key ^ CASTLING_KEYS[self.castlingRights] ^ self.enPassantKey()
+
+
+    def checkHash(self):
+        # Debug check: the incremental hash must match a full recompute
+        if self.computeHash() != self.hash:
+            raise RuntimeError(f"Zobrist hash drift after {self.history[-1] if self.history else 'undo'}")
+
+
+    def evaluate(self):
+        # Static evaluation from the side to move's point of view, from the incrementally updated scores
+        return sideToMoveScore(self.mg, self.eg, self.phase, self.turn)
+
+
+    def evaluateFromScratch(self):
+        # Static evaluation recomputed by walking every piece (checks evaluate)
+        return evaluatePieces(((COLOURS[code // 6], PIECE_TYPES[code % 6], sq) for sq, code in enumerate(self.mailbox) if code is not None), self.turn)
+
+
+    def checkEvaluation(self):
+        # Debug check: the incremental evaluation must match a full recompute
+        if self.evaluate() != self.evaluateFromScratch():
+            raise RuntimeError(f"Evaluation drift after {self.history[-1] if self.history else 'undo'}")
+
+
+    def toFen(self):
+        # Writes the position as a FEN string
+        castling = ''.join(char for char, right in CASTLING_CHARS if self.castlingRights & right)
+        return formatFen(self.grid, self.turn, castling, self.enPassantSq, self.halfMoveClock, self.fullMoveNumber)
+
+
+    def repetitionCount(self):
+        # Number of times the current position has occurred, counting this one
+        return 1 + countRepetitions(self.hashHistory, self.hash, self.halfMoveClock)
+
+
+    def isRepetition(self):
+        # Checks if the position occurred before since the last capture or pawn move (draw scoring in search)
+        return countRepetitions(self.hashHistory, self.hash, self.halfMoveClock, 1) > 0
+
+
+    def isFiftyMoveDraw(self):
+        # Checks if fifty moves have passed without a capture or pawn move
+        return self.halfMoveClock >= FIFTY_MOVE_PLIES
+
+
+    def perft(self, depth):
+        # Counts leaf nodes of the legal move tree (move generator check) on the packed move path
+        return perftPacked(self, depth)
+
+
+    def divide(self, depth):
+        # Perft counts split by root move
+        return divide(self, depth)
+
+
+    @property
+    def enPassantSq(self):
+        # En Passant square as (row, col) like Board
+        return None if self.epSquare is None else SQUARES[self.epSquare]
+
+
+    @property
+    def grid(self):
+        # Builds an 8x8 grid of pieces for drawing
+        return [[self.getPiece((row, col)) for col in range(DIMENSION)] for row in range(DIMENSION)]
+
+
+    def getPiece(self, square):
+        # Returns piece at square
+        row, col = square
+        code = self.mailbox[row * DIMENSION + col]
+        return None if code is None else PIECES[code]
+
+
+    def putPiece(self, sq, code):
+        # Places a piece code on an empty square
+        colour = code // 6
+        bit = 1 << sq
+        self.pieces[colour][code % 6] |= bit
+        self.occupancy[colour] |= bit
+        self.mailbox[sq] = code
+        self.hash ^= CODE_KEYS[code][sq]
+        self.mg += CODE_SCORES_MG[code][sq]
+        self.eg += CODE_SCORES_EG[code][sq]
+        self.phase += CODE_PHASE[code]
+
+
+    def removePiece(self, sq, code):
+        # Removes a piece code from a square
+        colour = code // 6
+        bit = 1 << sq
+        self.pieces[colour][code % 6] ^= bit
+        self.occupancy[colour] ^= bit
+        self.mailbox[sq] = None
+        self.hash ^= CODE_KEYS[code][sq]
+        self.mg -= CODE_SCORES_MG[code][sq]
+        self.eg -= CODE_SCORES_EG[code][sq]
+        self.phase -= CODE_PHASE[code]
+
+
+    def kingSquare(self, colour):
+        # Index of a colour's king
+        return self.pieces[colour][KING].bit_length() - 1
+
+
+    def squareAttacked(self, sq, enemy, occupied=None):
+        # Checks if a square index is attacked by the enemy colour index
+        # - occupied overrides the occupancy sliders are blocked by (e.g. without the king that is moving)
+        pieces = self.pieces[enemy]
+
+        if PAWN_ATTACKS[enemy ^ 1][sq] & pieces[PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & pieces[KING]:
+            return True
+
+        if occupied is None:
+            occupied = self.occupancy[0] | self.occupancy[1]
+
+        rooks = pieces[ROOK] | pieces[QUEEN]
+        if rooks & ROOK_LINES[sq] and slidingAttacks(sq, occupied, ROOK_RAYS) & rooks:
+            return True
+
+        bishops = pieces[BISHOP] | pieces[QUEEN]
+        if bishops & BISHOP_LINES[sq] and slidingAttacks(sq, occupied, BISHOP_RAYS) & bishops:
+            return True
+
+        return False
+
+
+    def checkers(self, us, kingSq, occupied):
+        # Bitboard of the enemy pieces giving check to a colour index's king
+        them = us ^ 1
+        pieces = self.pieces[them]
+        checkers = (PAWN_ATTACKS[us][kingSq] & pieces[PAWN]) | (KNIGHT_ATTACKS[kingSq] & pieces[KNIGHT])
+
+        rooks = (pieces[ROOK] | pieces[QUEEN]) & ROOK_LINES[kingSq]
+        if rooks:
+            checkers |= slidingAttacks(kingSq, occupied, ROOK_RAYS) & rooks
+        bishops = (pieces[BISHOP] | pieces[QUEEN]) & BISHOP_LINES[kingSq]
+        if bishops:
+            checkers |= slidingAttacks(kingSq, occupied, BISHOP_RAYS) & bishops
+        return checkers
+
+
+    def pinnedPieces(self, us, kingSq, occupied):
+        # Pinned pieces of a colour index: square -> squares it may move to (the pin ray up to and including the pinner)
+        pins = {}
+        own = self.occupancy[us]
+        pieces = self.pieces[us ^ 1]
+
+        for lines, sliders in ((ROOK_LINES, pieces[ROOK] | pieces[QUEEN]), (BISHOP_LINES, pieces[BISHOP] | pieces[QUEEN])):
+            snipers = lines[kingSq] & sliders
+            while snipers:
+                bit = snipers & -snipers
+                snipers ^= bit
+                between = BETWEEN[kingSq][bit.bit_length() - 1]
+                blockers = between & occupied
+                # Exactly one piece in between, and it is ours
+                if blockers & own and not blockers & (blockers - 1):
+                    pins[blockers.bit_length() - 1] = between | bit
+
+        return pins
+
+
+    def inCheck(self, colour):
+        us = COLOUR_INDEX[colour]
+        return self.squareAttacked(self.kingSquare(us), us ^ 1)
+
+
+    def generateCastlingMoves(self, us, occupied, moves):
+        # Adds castling moves when the rights remain and the king's path is empty and safe
+        # - Only called when the king is not in check
+        them = us ^ 1
+        if us == WHITE:
+            kingSq, kingSide, queenSide = 60, WHITE_KING_SIDE, WHITE_QUEEN_SIDE
+        else:
+            kingSq, kingSide, queenSide = 4, BLACK_KING_SIDE, BLACK_QUEEN_SIDE
+
+        if not self.castlingRights & (kingSide | queenSide):
+            return
+
+        if self.castlingRights & kingSide and not occupied & (0b11 << (kingSq + 1)):
+            if not self.squareAttacked(kingSq + 1, them) and not self.squareAttacked(kingSq + 2, them):
+                moves.append(kingSq | (kingSq + 2) << 6 | FLAG_CASTLE)
+
+        if self.castlingRights & queenSide and not occupied & (0b111 << (kingSq - 3)):
+            if not self.squareAttacked(kingSq - 1, them) and not self.squareAttacked(kingSq - 2, them):
+                moves.append(kingSq | (kingSq - 2) << 6 | FLAG_CASTLE)
+
+
+    def generateLegalPackedMoves(self, mode=GEN_ALL):
+        # Generates the side to move's legal moves as packed ints
+        # - Checkers and pins are found once, so moves are generated legal: only king steps (tested with the king
+        #   off the board) and en Passant (make/undo, as it removes two pieces from one row) need a test of their own
+        # - mode selects captures/promotions or quiet moves at the source, or checking moves
+        us = COLOUR_INDEX[self.turn]
+        if mode == GEN_CHECKS:
+            checkInfo = self.checkInfo(us)
+            return [packed for packed in self.generateLegal(us) if self.givesCheck(packed, checkInfo)]
+        return self.generateLegal(us, mode)
+
+
+    def checkInfo(self, us):
+        # What a colour index needs to find its checking moves without making them
+        # - checkSquares: piece type -> squares from which that piece attacks the enemy king
+        # - discovered: square of our piece that alone blocks one of our sliders from the enemy king -> that line
+        them = us ^ 1
+        occupied = self.occupancy[0] | self.occupancy[1]
+        enemyKingSq = self.pieces[them][KING].bit_length() - 1
+
+        bishopSquares = slidingAttacks(enemyKingSq, occupied, BISHOP_RAYS)
+        rookSquares = slidingAttacks(enemyKingSq, occupied, ROOK_RAYS)
+        checkSquares = [PAWN_ATTACKS[them][enemyKingSq], KNIGHT_ATTACKS[enemyKingSq], bishopSquares, rookSquares, bishopSquares | rookSquares, 0]
+
+        discovered = {}
+        own = self.occupancy[us]
+        pieces = self.pieces[us]
+        for lines, sliders in ((ROOK_LINES, pieces[ROOK] | pieces[QUEEN]), (BISHOP_LINES, pieces[BISHOP] | pieces[QUEEN])):
+            snipers = lines[enemyKingSq] & sliders
+            while snipers:
+                bit = snipers & -snipers
+                snipers ^= bit
+                between = BETWEEN[enemyKingSq][bit.bit_length() - 1]
+                blockers = between & occupied
+                if blockers & own and not blockers & (blockers - 1):
+                    discovered[blockers.bit_length() - 1] = between | bit
+
+        return enemyKingSq, checkSquares, discovered
+
+
+    def givesCheck(self, packed, checkInfo):
+        # Checks if a legal packed move gives check, from checkInfo(us) of the position it is made in
+        # - Direct checks: the piece lands on a square attacking the king; discovered checks: it leaves a slider's line
+        # - Castling and en Passant move two pieces, so they are made and tested instead
+        if packed & (FLAG_CASTLE | FLAG_EN_PASSANT):
+            us = self.mailbox[packed & 63] // 6
+            self.makePacked(packed)
+            check = self.squareAttacked(self.pieces[us ^ 1][KING].bit_length() - 1, us)
+            self.undoPacked()
+            return check
+
+        enemyKingSq, checkSquares, discovered = checkInfo
+        fromSq = packed & 63
+        toSq = (packed >> 6) & 63
+        if fromSq in discovered and not (discovered[fromSq] >> toSq) & 1:
+            return True
+
+        promotion = (packed >> 12) & 7
+        if not promotion:
+            return (checkSquares[self.mailbox[fromSq] % 6] >> toSq) & 1 == 1
+
+        # A promoted slider can check through the square the pawn left
+        pieceType = PROMOTION_TYPE_INDEX[promotion]
+        if pieceType == KNIGHT:
+            return (KNIGHT_ATTACKS[toSq] >> enemyKingSq) & 1 == 1
+        occupied = (self.occupancy[0] | self.occupancy[1]) & ~(1 << fromSq)
+        attacks = 0
+        if pieceType != BISHOP:
+            attacks |= slidingAttacks(toSq, occupied, ROOK_RAYS)
+        if pieceType != ROOK:
+            attacks |= slidingAttacks(toSq, occupied, BISHOP_RAYS)
+        return (attacks >> enemyKingSq) & 1 == 1
+
+
+    def generateLegal(self, us, mode=GEN_ALL):
+        # Generates the legal moves of a colour index as packed ints (GEN_ALL, GEN_CAPTURES or GEN_QUIETS)
+        # - Captures and quiet moves are separated at the source by their target squares (enemy or empty)
+        moves = []
+        them = us ^ 1
+        own = self.occupancy[us]
+        enemy = self.occupancy[them]
+        occupied = own | enemy
+        pieces = self.pieces[us]
+        kingSq = pieces[KING].bit_length() - 1
+        captures = mode & GEN_CAPTURES
+        quiets = mode & GEN_QUIETS
+        targetMask = (enemy if captures else 0) | (~occupied & ALL_SQUARES if quiets else 0)
+
+        # King steps: legal if the target is not attacked once the king has left its square
+        withoutKing = occupied ^ (1 << kingSq)
+        targets = KING_ATTACKS[kingSq] & targetMask
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            toSq = bit.bit_length() - 1
+            if not self.squareAttacked(toSq, them, withoutKing):
+                moves.append(kingSq | toSq << 6 | (FLAG_CAPTURE if bit & enemy else 0))
+
+        checkers = self.checkers(us, kingSq, occupied)
+
+        # Double check: only the king can move
+        if checkers & (checkers - 1):
+            return moves
+
+        # In check, other pieces must capture the checker or block it
+        if checkers:
+            allowed = checkers | BETWEEN[kingSq][checkers.bit_length() - 1]
+        else:
+            allowed = ALL_SQUARES
+            if quiets:
+                self.generateCastlingMoves(us, occupied, moves)
+
+        pins = self.pinnedPieces(us, kingSq, occupied)
+
+        # Pawns
+        push = PAWN_PUSH[us]
+        startRow = PAWN_START_ROW[us]
+        promotionRow = PAWN_PROMOTION_ROW[us]
+        pawns = pieces[PAWN]
+        while pawns:
+            bit = pawns & -pawns
+            pawns ^= bit
+            fromSq = bit.bit_length() - 1
+            mask = allowed & pins[fromSq] if fromSq in pins else allowed
+            promotes = fromSq // DIMENSION + push // DIMENSION == promotionRow
+
+            # Pushes are quiet, except promotions which count as captures
+            toSq = fromSq + push
+            if (captures if promotes else quiets) and not (occupied >> toSq) & 1:
+                if (mask >> toSq) & 1:
+                    if promotes:
+                        for code in PROMOTION_MOVE_CODES:
+                            moves.append(fromSq | toSq << 6 | code)
+                    else:
+                        moves.append(fromSq | toSq << 6)
+                doubleSq = toSq + push
+                if fromSq // DIMENSION == startRow and not (occupied >> doubleSq) & 1 and (mask >> doubleSq) & 1:
+                    moves.append(fromSq | doubleSq << 6)
+
+            if not captures:
+                continue
+
+            targets = PAWN_ATTACKS[us][fromSq] & enemy & mask
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                toSq = bit.bit_length() - 1
+                if promotes:
+                    for code in PROMOTION_MOVE_CODES:
+                        moves.append(fromSq | toSq << 6 | code | FLAG_CAPTURE)
+                else:
+                    moves.append(fromSq | toSq << 6 | FLAG_CAPTURE)
+
+            if self.epSquare is not None and (PAWN_ATTACKS[us][fromSq] >> self.epSquare) & 1:
+                packed = fromSq | self.epSquare << 6 | FLAG_CAPTURE | FLAG_EN_PASSANT
+                self.makePacked(packed)
+                if not self.squareAttacked(kingSq, them):
+                    moves.append(packed)
+                self.undoPacked()
+
+        # Knights and sliders (a pinned knight has no target on its pin ray)
+        for pieceType in (KNIGHT, BISHOP, ROOK, QUEEN):
+            bits = pieces[pieceType]
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                fromSq = bit.bit_length() - 1
+
+                if pieceType == KNIGHT:
+                    targets = KNIGHT_ATTACKS[fromSq]
+                elif pieceType == BISHOP:
+                    targets = slidingAttacks(fromSq, occupied, BISHOP_RAYS)
+                elif pieceType == ROOK:
+                    targets = slidingAttacks(fromSq, occupied, ROOK_RAYS)
+                else:
+                    targets = slidingAttacks(fromSq, occupied, ROOK_RAYS) | slidingAttacks(fromSq, occupied, BISHOP_RAYS)
+
+                targets &= allowed & targetMask
+                if fromSq in pins:
+                    targets &= pins[fromSq]
+
+                while targets:
+                    bit = targets & -targets
+                    targets ^= bit
+                    moves.append(fromSq | (bit.bit_length() - 1) << 6 | (FLAG_CAPTURE if bit & enemy else 0))
+
+        return moves
+
+
+    def hasLegalMove(self, colour):
+        # Checks if a player has any legal move, trying the king's steps before generating the other moves
+        us = COLOUR_INDEX[colour]
+        turn, epSquare = self.turn, self.epSquare
+        if colour != turn:
+            # The en Passant square is the side to move's, so the other side gets none
+            self.turn, self.epSquare = colour, None
+
+        try:
+            kingSq = self.kingSquare(us)
+            withoutKing = (self.occupancy[0] | self.occupancy[1]) ^ (1 << kingSq)
+            targets = KING_ATTACKS[kingSq] & ~self.occupancy[us]
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                if not self.squareAttacked(bit.bit_length() - 1, us ^ 1, withoutKing):
+                    return True
+            return bool(self.generateLegal(us))
+        finally:
+            self.turn, self.epSquare = turn, epSquare
+
+
+    def moveCache(self):
+        # The board's legal move cache (created on first use, so boards that never query it stay small)
+        if self.legalMoveCache is None:
+            self.legalMoveCache = LegalMoveCache()
+        return self.legalMoveCache
+
+
+    def legalMoves(self):
+        # The side to move's legal moves, generated once per position and cached by hash
+        return self.moveCache().moves(self)
+
+
+    def legalMovesFrom(self, square):
+        # The side to move's legal moves from a square, answered from the cached list
+        return self.moveCache().movesFrom(self, square)
+
+
+    def generateLegalMoves(self, piece, square):
+        # Generates the legal moves for the piece on a square
+        return [move for move in self.generateAllLegalMoves(piece.colour) if move.startSq == square]
+
+
+    def generateAllLegalMoves(self, colour, mode=GEN_ALL):
+        # Generates all legal moves for a player as Move objects (or only those of one generation mode)
+        if colour == self.turn:
+            return [self.decodeMove(packed) for packed in self.generateLegalPackedMoves(mode)]
+
+        # The en Passant square is the side to move's, so the other side is generated without one
+        turn, epSquare = self.turn, self.epSquare
+        self.turn, self.epSquare = colour, None
+        try:
+            return [self.decodeMove(packed) for packed in self.generateLegalPackedMoves(mode)]
+        finally:
+            self.turn, self.epSquare = turn, epSquare
+
+
+    def decodeMove(self, packed):
+        # Converts a packed move (or 15-bit move key) to a Move object for Game and the GUI
+        # - En passant and castling are recognised from the position, so the flags are optional
+        fromSq = packed & 63
+        toSq = (packed >> 6) & 63
+        code = self.mailbox[fromSq]
+        capturedCode = self.mailbox[toSq]
+
+        isEnPassant = code % 6 == PAWN and (fromSq - toSq) % DIMENSION != 0 and capturedCode is None
+        if isEnPassant:
+            capturedCode = self.mailbox[(fromSq // DIMENSION) * DIMENSION + toSq % DIMENSION]
+
+        isCastle = code % 6 == KING and abs(fromSq - toSq) == 2
+        captured = None if capturedCode is None else PIECES[capturedCode]
+        return Move(SQUARES[fromSq], SQUARES[toSq], PIECES[code], captured, PROMOTION_PIECES[(packed >> 12) & 7], isEnPassant, isCastle, isCastle and toSq > fromSq)
+
+
+    def insufficientMaterial(self):
+        # Checks for Insufficient Material
+        white, black = self.pieces
+        for pieces in self.pieces:
+            if pieces[PAWN] or pieces[ROOK] or pieces[QUEEN]:
+                return False
+
+        minors = [pieces[KNIGHT].bit_count() + pieces[BISHOP].bit_count() for pieces in self.pieces]
+
+        # King VS King / King VS King + Minor Piece
+        if sum(minors) <= 1:
+            return True
+
+        # King + Bishop VS King + Bishop (same colour)
+        if minors == [1, 1] and white[BISHOP] and black[BISHOP]:
+            whiteSq = white[BISHOP].bit_length() - 1
+            blackSq = black[BISHOP].bit_length() - 1
+            return sum(SQUARES[whiteSq]) % 2 == sum(SQUARES[blackSq]) % 2
+
+        return False
+
+
+    def makeMove(self, move):
+        # Executes a move object on the board and pushes it to history
+        self.makePacked(encodeMove(move))
+        self.history.append(move)
+
+
+    def undoMove(self):
+        # Undoes a move using history
+        self.history.pop()
+        self.undoPacked()
+
+
+    def makePacked(self, packed):
+        # Executes a packed move, keeping its undo state on the undo stack
+        fromSq = packed & 63
+        toSq = (packed >> 6) & 63
+        mailbox = self.mailbox
+
+        code = mailbox[fromSq]
+        captured = mailbox[toSq]
+
+        # Stores previous states for undo
+        self.undoStack.append((packed, captured, self.castlingRights, self.epSquare, self.hash, self.halfMoveClock))
+        self.hashHistory.append(self.hash)
+        self.hash ^= self.enPassantKey()
+
+        if packed & FLAG_EN_PASSANT:
+            capturedSq = (fromSq // DIMENSION) * DIMENSION + toSq % DIMENSION
+            self.removePiece(capturedSq, mailbox[capturedSq])
+        elif captured is not None:
+            self.removePiece(toSq, captured)
+
+        self.removePiece(fromSq, code)
+
+        promotion = (packed >> 12) & 7
+        if promotion:
+            self.putPiece(toSq, (code // 6) * 6 + PROMOTION_TYPE_INDEX[promotion])
+        else:
+            self.putPiece(toSq, code)
+
+        if packed & FLAG_CASTLE:
+            if toSq > fromSq:
+                rookFrom, rookTo = fromSq + 3, fromSq + 1
+            else:
+                rookFrom, rookTo = fromSq - 4, fromSq - 1
+            rook = mailbox[rookFrom]
+            self.removePiece(rookFrom, rook)
+            self.putPiece(rookTo, rook)
+
+        prevCastlingRights = self.castlingRights
+        self.castlingRights &= CASTLING_MASK[fromSq] & CASTLING_MASK[toSq]
+        self.hash ^= CASTLING_KEYS[prevCastlingRights] ^ CASTLING_KEYS[self.castlingRights]
+
+        if code % 6 == PAWN and abs(fromSq - toSq) == 16:
+            self.epSquare = (fromSq + toSq) // 2
+        else:
+            self.epSquare = None
+
+        # Pawn moves and captures reset the fifty move clock, Black's moves complete a full move
+        if code % 6 == PAWN or captured is not None:
+            self.halfMoveClock = 0
+        else:
+            self.halfMoveClock += 1
+        if code >= 6:
+            self.fullMoveNumber += 1
+
+        self.turn = COLOURS[code // 6 ^ 1]
+        self.hash ^= SIDE_KEY ^ self.enPassantKey()
+
+        if self.debugHash:
+            self.checkHash()
+        if self.debugEval:
+            self.checkEvaluation()
+
+
+    def undoPacked(self):
+        # Undoes the last packed move from the undo stack
+        packed, captured, self.castlingRights, self.epSquare, prevHash, self.halfMoveClock = self.undoStack.pop()
+        self.hashHistory.pop()
+        fromSq = packed & 63
+        toSq = (packed >> 6) & 63
+
+        code = self.mailbox[toSq]
+        self.removePiece(toSq, code)
+        self.turn = COLOURS[code // 6]
+        if code >= 6:
+            self.fullMoveNumber -= 1
+
+        if (packed >> 12) & 7:
+            code = (code // 6) * 6 + PAWN
+        self.putPiece(fromSq, code)
+
+        if packed & FLAG_EN_PASSANT:
+            self.putPiece((fromSq // DIMENSION) * DIMENSION + toSq % DIMENSION, (code // 6 ^ 1) * 6 + PAWN)
+        elif captured is not None:
+            self.putPiece(toSq, captured)
+
+        if packed & FLAG_CASTLE:
+            if toSq > fromSq:
+                rookFrom, rookTo = fromSq + 3, fromSq + 1
+            else:
+                rookFrom, rookTo = fromSq - 4, fromSq - 1
+            rook = self.mailbox[rookTo]
+            self.removePiece(rookTo, rook)
+            self.putPiece(rookFrom, rook)
+
+        self.hash = prevHash
+
+        if self.debugHash:
+            self.checkHash()
+        if self.debugEval:
+            self.checkEvaluation()
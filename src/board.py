@@ -1,6 +1,12 @@
 from piece import Piece
-from movegen import MoveGen
-from constants import DIMENSION
+from move import Move, PROMOTION_PIECES
+from movecache import LegalMoveCache
+from movegen import MoveGen, GEN_ALL
+from fen import parseFen, formatFen
+from perft import perft, divide
+from evaluation import evaluatePieces, sideToMoveScore, SCORES_MG, SCORES_EG, PHASE_WEIGHTS
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE, CASTLING_CHARS, FIFTY_MOVE_PLIES, countRepetitions
+from constants import DIMENSION, PIECE_TYPES, START_FEN
 
 class Board:
     """
@@ -8,21 +14,195 @@ class Board:
     - Stores and updates the board as well as history
     - Generates legal moves using movegen and detects check/insufficient material
     - Executes and undoes moves including: (normal, promotion, en Passant, castling)
+    - Tracks king squares, piece squares and material counts as moves are made/undone
+    - Keeps the state needed to undo a move on its own undo stack
+    - Keeps a Zobrist hash of the position updated incrementally, and the hashes of earlier positions for repetition checks
+    - Counts the halfmove clock (fifty move rule) and fullmove number like FEN
+    - Keeps the middlegame/endgame piece-square scores and game phase updated incrementally for evaluation
     """
-    def __init__(self):
-        self.grid = [
-            [Piece('b','R'), Piece('b','N'), Piece('b','B'), Piece('b','Q'), Piece('b','K'), Piece('b','B'), Piece('b','N'), Piece('b','R')],
-            [Piece('b','P') for _ in range(DIMENSION)],
-            [None]*DIMENSION,
-            [None]*DIMENSION,
-            [None]*DIMENSION,
-            [None]*DIMENSION,
-            [Piece('w','P') for _ in range(DIMENSION)],
-            [Piece('w','R'), Piece('w','N'), Piece('w','B'), Piece('w','Q'), Piece('w','K'), Piece('w','B'), Piece('w','N'), Piece('w','R')]
-        ]
+    # Recomputes the hash from scratch after every make/undo and raises on drift
+    debugHash = False
+
+    # Recomputes the evaluation from scratch after every make/undo and raises on drift
+    debugEval = False
+
+    # King and rook home squares: castling rights can only change when a move touches one
+    CASTLING_SQUARES = {(7, 4), (7, 7), (7, 0), (0, 4), (0, 7), (0, 0)}
+
+    def __init__(self, fen=START_FEN):
+        # Sets up the position from a FEN string (the starting position by default)
         self.moveGen = MoveGen(self)
+        self.setFen(fen)
+
+
+    @classmethod
+    def fromFen(cls, fen=START_FEN):
+        # Builds a board from a FEN string
+        return cls(fen)
+
+
+    def setFen(self, fen):
+        # Replaces the position with a FEN string
+        # - Castling rights are mapped onto the moved flag of the king and corner rooks
+        placement, turn, castling, enPassantSq, halfMoveClock, fullMoveNumber = parseFen(fen)
+
+        self.grid = [[None] * DIMENSION for _ in range(DIMENSION)]
+        for row, col, colour, pieceType in placement:
+            piece = Piece(colour, pieceType)
+            if pieceType == 'P':
+                piece.moved = row != (6 if colour == 'w' else 1)
+            elif pieceType in ('K', 'R'):
+                piece.moved = True
+            self.grid[row][col] = piece
+
+        for colour, homeRow in (('w', 7), ('b', 0)):
+            for right, rookCol in (('K', 7), ('Q', 0)):
+                if (right if colour == 'w' else right.lower()) not in castling:
+                    continue
+                king = self.grid[homeRow][4]
+                rook = self.grid[homeRow][rookCol]
+                if king and king.type == 'K' and king.colour == colour and rook and rook.type == 'R' and rook.colour == colour:
+                    king.moved = False
+                    rook.moved = False
+
         self.history = []
-        self.enPassantSq = None
+        self.hashHistory = []
+        self.undoStack = []
+        self.legalMoveCache = None
+        self.enPassantSq = enPassantSq
+        self.turn = turn
+        self.halfMoveClock = halfMoveClock
+        self.fullMoveNumber = fullMoveNumber
+        self.resetTracking()
+
+
+    def resetTracking(self):
+        # Rebuilds the tracked piece data from the grid
+        # - kingSq: colour -> king square
+        # - pieceSqs: colour -> set of occupied squares
+        # - material: colour -> piece type -> count
+        # - mg, eg, phase: summed piece-square scores (white positive) and game phase
+        self.kingSq = {'w': None, 'b': None}
+        self.pieceSqs = {'w': set(), 'b': set()}
+        self.material = {colour: {pieceType: 0 for pieceType in PIECE_TYPES} for colour in ('w', 'b')}
+        self.mg = self.eg = self.phase = 0
+
+        for row in range(DIMENSION):
+            for col in range(DIMENSION):
+                piece = self.grid[row][col]
+                if piece:
+                    self.trackPiece((row, col), piece)
+
+        self.castlingRights = self.computeCastlingRights()
+        self.hash = self.computeHash()
+
+
+    def trackPiece(self, square, piece):
+        # Adds a piece on a square to the tracked piece data
+        self.pieceSqs[piece.colour].add(square)
+        self.material[piece.colour][piece.type] += 1
+        sq = square[0] * DIMENSION + square[1]
+        self.mg += SCORES_MG[piece.colour][piece.type][sq]
+        self.eg += SCORES_EG[piece.colour][piece.type][sq]
+        self.phase += PHASE_WEIGHTS[piece.type]
+        if piece.type == 'K':
+            self.kingSq[piece.colour] = square
+
+
+    def computeCastlingRights(self):
+        # Derives the castling rights bits from the moved flags of the kings and corner rooks
+        rights = 0
+        for colour, row, kingSide, queenSide in (('w', 7, WHITE_KING_SIDE, WHITE_QUEEN_SIDE), ('b', 0, BLACK_KING_SIDE, BLACK_QUEEN_SIDE)):
+            king = self.grid[row][4]
+            if not king or king.type != 'K' or king.colour != colour or king.moved:
+                continue
+            for col, right in ((7, kingSide), (0, queenSide)):
+                rook = self.grid[row][col]
+                if rook and rook.type == 'R' and rook.colour == colour and not rook.moved:
+                    rights |= right
+        return rights
+
+
+    def enPassantKey(self):
+        # Key of the en Passant square, only if the side to move has a pawn that can capture on it
+        if self.enPassantSq is None:
+            return 0
+
+        row, col = self.enPassantSq
+        pawnRow = row + 1 if self.turn == 'w' else row - 1
+        for c in (col - 1, col + 1):
+            if 0 <= c < DIMENSION:
+                piece = self.grid[pawnRow][c]
+                if piece and piece.type == 'P' and piece.colour == self.turn:
+                    return EN_PASSANT_KEYS[col]
+        return 0
+
+
+    def computeHash(self):
+        # Computes the Zobrist hash from scratch
+        key = 0
+        for colour in ('w', 'b'):
+            for row, col in self.pieceSqs[colour]:
+                key ^= PIECE_KEYS[colour][self.grid[row][col].type][row * DIMENSION + col]
+
+        if self.turn == 'b':
+            key ^= SIDE_KEY
+
+        return key ^ CASTLING_KEYS[self.castlingRights] ^ self.enPassantKey()
+
+
+    def checkHash(self):
+        # Debug check: the incremental hash must match a full recompute
+        if self.computeCastlingRights() != self.castlingRights or self.computeHash() != self.hash:
+            raise RuntimeError(f"Zobrist hash drift after {self.history[-1] if self.history else 'undo'}")
+
+
+    def evaluate(self):
+        # Static evaluation from the side to move's point of view, from the incrementally updated scores
+        return sideToMoveScore(self.mg, self.eg, self.phase, self.turn)
+
+
+    def evaluateFromScratch(self):
+        # Static evaluation recomputed by walking every piece (checks evaluate)
+        return evaluatePieces(((colour, self.grid[row][col].type, row * DIMENSION + col) for colour in ('w', 'b') for row, col in self.pieceSqs[colour]), self.turn)
+
+
+    def checkEvaluation(self):
+        # Debug check: the incremental evaluation must match a full recompute
+        if self.evaluate() != self.evaluateFromScratch():
+            raise RuntimeError(f"Evaluation drift after {self.history[-1] if self.history else 'undo'}")
+
+
+    def toFen(self):
+        # Writes the position as a FEN string
+        castling = ''.join(char for char, right in CASTLING_CHARS if self.castlingRights & right)
+        return formatFen(self.grid, self.turn, castling, self.enPassantSq, self.halfMoveClock, self.fullMoveNumber)
+
+
+    def repetitionCount(self):
+        # Number of times the current position has occurred, counting this one
+        return 1 + countRepetitions(self.hashHistory, self.hash, self.halfMoveClock)
+
+
+    def isRepetition(self):
+        # Checks if the position occurred before since the last capture or pawn move (draw scoring in search)
+        return countRepetitions(self.hashHistory, self.hash, self.halfMoveClock, 1) > 0
+
+
+    def isFiftyMoveDraw(self):
+        # Checks if fifty moves have passed without a capture or pawn move
+        return self.halfMoveClock >= FIFTY_MOVE_PLIES
+
+
+    def perft(self, depth):
+        # Counts leaf nodes of the legal move tree (move generator check)
+        return perft(self, depth)
+
+
+    def divide(self, depth):
+        # Perft counts split by root move
+        return divide(self, depth)
+
 
     def getPiece(self, square):
         # Returns piece at square
@@ -35,70 +215,64 @@ class Board:
         return self.moveGen.generateLegalMoves(piece, square)
     
 
-    def generateAllLegalMoves(self, colour):
-        # Generates all legal moves for a player
-        moves = []
+    def generateAllLegalMoves(self, colour, mode=GEN_ALL):
+        # Generates all legal moves for a player (mode: GEN_CAPTURES, GEN_QUIETS, GEN_CHECKS or GEN_ALL)
+        return self.moveGen.generateAllLegalMoves(colour, mode)
+    
 
-        for row in range(DIMENSION):
-            for col in range(DIMENSION):
-                piece = self.grid[row][col]
-                if piece is None:
-                    continue
-                if piece.colour != colour:
-                    continue
+    def hasLegalMove(self, colour):
+        # Checks if a player has any legal move without generating them all
+        return self.moveGen.hasLegalMove(colour)
 
-                pieceMoves = self.generateLegalMoves(piece, (row, col))
 
-                moves.extend(pieceMoves)
+    def moveCache(self):
+        # The board's legal move cache (created on first use, so boards that never query it stay small)
+        if self.legalMoveCache is None:
+            self.legalMoveCache = LegalMoveCache()
+        return self.legalMoveCache
+
+
+    def legalMoves(self):
+        # The side to move's legal moves, generated once per position and cached by hash
+        return self.moveCache().moves(self)
+
+
+    def legalMovesFrom(self, square):
+        # The side to move's legal moves from a square, answered from the cached list
+        return self.moveCache().movesFrom(self, square)
 
-        return moves
-    
 
     def inCheck(self, colour):
         return self.moveGen.isKingInCheck(colour)
     
 
     def insufficientMaterial(self):
-        # Checks for Insufficient Material
-        pieces = []
+        # Checks for Insufficient Material using the tracked material counts
+        white = self.material['w']
+        black = self.material['b']
 
-        for row in range(DIMENSION):
-            for col in range(DIMENSION):
-                piece = self.grid[row][col]
+        for counts in (white, black):
+            if counts['P'] or counts['R'] or counts['Q']:
+                return False
 
-                if piece:
-                    pieces.append((piece, row , col))
-        
-        # King VS King
-        if len(pieces) == 2:
+        minorPieces = white['B'] + white['N'] + black['B'] + black['N']
+
+        # King VS King / King VS King + Minor Piece
+        if minorPieces <= 1:
             return True
-        
-        # King VS King + Minor Piece
-        if len(pieces) == 3:
-            minorPiece = None
-    
-            for piece, _, _ in pieces:
-                if piece.type != 'K':
-                    minorPiece = piece
-                    break
 
-            if minorPiece and minorPiece.type in ('B', 'N'):
-                return True
-        
         # King + Bishop VS King + Bishop (same colour)
-        if len(pieces) == 4:
+        if minorPieces == 2 and white['B'] == 1 and black['B'] == 1:
             bishops = []
 
-            for piece, row, col in pieces:
-                if piece.type == 'B':
-                    bishops.append((piece, row, col))
-
-            if len(bishops) == 2:
-                _, r1, c1 = bishops[0]
-                _, r2, c2 = bishops[1]
+            for colour in ('w', 'b'):
+                for row, col in self.pieceSqs[colour]:
+                    if self.grid[row][col].type == 'B':
+                        bishops.append((row, col))
 
-                if (r1 + c1) % 2 == (r2 + c2) % 2:
-                    return True
+            (r1, c1), (r2, c2) = bishops
+            if (r1 + c1) % 2 == (r2 + c2) % 2:
+                return True
 
         return False
     
@@ -111,86 +285,165 @@ class Board:
             self.enPassantSq = None
 
 
+    def placePiece(self, square, piece):
+        # Puts a piece on an empty square
+        row, col = square
+        self.grid[row][col] = piece
+        self.trackPiece(square, piece)
+        self.hash ^= PIECE_KEYS[piece.colour][piece.type][row * DIMENSION + col]
+
+
+    def removePiece(self, square):
+        # Takes the piece off a square and returns it
+        row, col = square
+        piece = self.grid[row][col]
+        self.grid[row][col] = None
+        self.pieceSqs[piece.colour].remove(square)
+        self.material[piece.colour][piece.type] -= 1
+        sq = row * DIMENSION + col
+        self.hash ^= PIECE_KEYS[piece.colour][piece.type][sq]
+        self.mg -= SCORES_MG[piece.colour][piece.type][sq]
+        self.eg -= SCORES_EG[piece.colour][piece.type][sq]
+        self.phase -= PHASE_WEIGHTS[piece.type]
+        return piece
+
+
+    def movePiece(self, startSq, endSq):
+        # Moves a piece to an empty square (material is unchanged)
+        startRow, startCol = startSq
+        endRow, endCol = endSq
+        piece = self.grid[startRow][startCol]
+        self.grid[startRow][startCol] = None
+        self.grid[endRow][endCol] = piece
+
+        squares = self.pieceSqs[piece.colour]
+        squares.remove(startSq)
+        squares.add(endSq)
+        if piece.type == 'K':
+            self.kingSq[piece.colour] = endSq
+
+        startIndex = startRow * DIMENSION + startCol
+        endIndex = endRow * DIMENSION + endCol
+        keys = PIECE_KEYS[piece.colour][piece.type]
+        self.hash ^= keys[startIndex] ^ keys[endIndex]
+        scores = SCORES_MG[piece.colour][piece.type]
+        self.mg += scores[endIndex] - scores[startIndex]
+        scores = SCORES_EG[piece.colour][piece.type]
+        self.eg += scores[endIndex] - scores[startIndex]
+        return piece
+
+
+    def decodeMove(self, packed):
+        # Builds the Move object for a packed move (or 15-bit move key) in the current position
+        # - En passant and castling are recognised from the position, so the flags are optional
+        startSq = divmod(packed & 63, DIMENSION)
+        endSq = divmod((packed >> 6) & 63, DIMENSION)
+        piece = self.getPiece(startSq)
+        captured = self.getPiece(endSq)
+
+        isEnPassant = piece.type == 'P' and startSq[1] != endSq[1] and captured is None
+        if isEnPassant:
+            captured = self.getPiece((startSq[0], endSq[1]))
+
+        isCastle = piece.type == 'K' and abs(startSq[1] - endSq[1]) == 2
+        return Move(startSq, endSq, piece, captured, PROMOTION_PIECES[(packed >> 12) & 7], isEnPassant, isCastle, isCastle and endSq[1] > startSq[1])
+
+
+    def castlingRookSquares(self, move):
+        # Returns the rook's (start, end) squares for a castling move
+        row = move.startSq[0]
+        if move.kingSide:
+            return (row, 7), (row, 5)
+        return (row, 0), (row, 3)
+
+
     def makeMove(self, move):
         # Executes a move object on the board and pushes it to history
         startRow, startCol = move.startSq
         endRow, endCol = move.endSq
 
         # Stores previous states for undo
-        move.prevPieceMoved = move.piece.moved
-        move.prevEnPassantSq = self.enPassantSq
+        prevCastlingRights = self.castlingRights
+        self.undoStack.append((move.piece.moved, self.enPassantSq, prevCastlingRights, self.hash, self.halfMoveClock))
+        self.hashHistory.append(self.hash)
 
-        self.grid[startRow][startCol] = None
+        self.hash ^= self.enPassantKey()
+
+        if move.isEnPassant:
+            self.removePiece((startRow, endCol))
+        elif self.grid[endRow][endCol] is not None:
+            self.removePiece(move.endSq)
 
         if move.promotionType:
-            piece = Piece(move.piece.colour, move.promotionType)
-            self.grid[endRow][endCol] = piece
-        elif move.isEnPassant:
-            self.grid[startRow][endCol] = None
-            self.grid[endRow][endCol] = move.piece
-        elif move.isCastle:
-            self.grid[endRow][endCol] = move.piece
-            if move.piece.colour == 'w':
-                if move.kingSide == True:
-                    self.grid[7][5] = self.grid[7][7]
-                    self.grid[7][7] = None
-                    self.grid[7][5].moved = True
-                else:
-                    self.grid[7][3] = self.grid[7][0]
-                    self.grid[7][0] = None
-                    self.grid[7][3].moved = True
-            else:
-                if move.kingSide == True:
-                    self.grid[0][5] = self.grid[0][7]
-                    self.grid[0][7] = None
-                    self.grid[0][5].moved = True
-                else:
-                    self.grid[0][3] = self.grid[0][0]
-                    self.grid[0][0] = None
-                    self.grid[0][3].moved = True
+            self.removePiece(move.startSq)
+            self.placePiece(move.endSq, Piece(move.piece.colour, move.promotionType))
         else:
-            self.grid[endRow][endCol] = move.piece
+            self.movePiece(move.startSq, move.endSq)
+
+        if move.isCastle:
+            rookStart, rookEnd = self.castlingRookSquares(move)
+            self.movePiece(rookStart, rookEnd).moved = True
 
         self.history.append(move)
 
         move.piece.moved = True
         self.setEnPassantSq(move, startRow, endRow, endCol)
 
+        # Pawn moves and captures reset the fifty move clock, Black's moves complete a full move
+        if move.piece.type == 'P' or move.pieceCaptured:
+            self.halfMoveClock = 0
+        else:
+            self.halfMoveClock += 1
+        if self.turn == 'b':
+            self.fullMoveNumber += 1
+        self.turn = 'b' if self.turn == 'w' else 'w'
+
+        if move.startSq in self.CASTLING_SQUARES or move.endSq in self.CASTLING_SQUARES:
+            self.castlingRights = self.computeCastlingRights()
+            self.hash ^= CASTLING_KEYS[prevCastlingRights] ^ CASTLING_KEYS[self.castlingRights]
+
+        self.hash ^= SIDE_KEY ^ self.enPassantKey()
+
+        if self.debugHash:
+            self.checkHash()
+        if self.debugEval:
+            self.checkEvaluation()
+
 
     def undoMove(self):
-        # Undoes a move using history
+        # Undoes a move using history and the undo stack
         move = self.history.pop()
+        prevPieceMoved, prevEnPassantSq, prevCastlingRights, prevHash, prevHalfMoveClock = self.undoStack.pop()
+        self.hashHistory.pop()
 
         startRow, startCol = move.startSq
         endRow, endCol = move.endSq
 
-        self.grid[startRow][startCol] = move.piece
+        if move.promotionType:
+            self.removePiece(move.endSq)
+            self.placePiece(move.startSq, move.piece)
+        else:
+            self.movePiece(move.endSq, move.startSq)
 
         if move.isEnPassant:
-            self.grid[endRow][endCol] = None
-            self.grid[startRow][endCol] = move.pieceCaptured
-        elif move.isCastle:
-            self.grid[endRow][endCol] = None
-            if move.piece.colour == 'w':
-                if move.kingSide == True:
-                    self.grid[7][7] = self.grid[7][5]
-                    self.grid[7][5] = None
-                    self.grid[7][7].moved = False
-                else:
-                    self.grid[7][0] = self.grid[7][3]
-                    self.grid[7][3] = None
-                    self.grid[7][0].moved = False
-            else:
-                if move.kingSide == True:
-                    self.grid[0][7] = self.grid[0][5]
-                    self.grid[0][5] = None
-                    self.grid[0][7].moved = False
-                else:
-                    self.grid[0][0] = self.grid[0][3]
-                    self.grid[0][3] = None
-                    self.grid[0][0].moved = False
-        else:
-            self.grid[endRow][endCol] = move.pieceCaptured
+            self.placePiece((startRow, endCol), move.pieceCaptured)
+        elif move.pieceCaptured:
+            self.placePiece(move.endSq, move.pieceCaptured)
+
+        if move.isCastle:
+            rookStart, rookEnd = self.castlingRookSquares(move)
+            self.movePiece(rookEnd, rookStart).moved = False
+
+        move.piece.moved = prevPieceMoved
+        self.enPassantSq = prevEnPassantSq
+        self.turn = 'b' if self.turn == 'w' else 'w'
+        if self.turn == 'b':
+            self.fullMoveNumber -= 1
+        self.halfMoveClock = prevHalfMoveClock
+        self.castlingRights = prevCastlingRights
+        self.hash = prevHash
 
-        move.piece.moved = move.prevPieceMoved
-        self.enPassantSq = move.prevEnPassantSq
+        if self.debugHash:
+            self.checkHash()
+        if self.debugEval:
+            self.checkEvaluation()
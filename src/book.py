@@ -0,0 +1,229 @@
+import argparse
+import heapq
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from board import Board
+from move import moveKey
+from notation import parseSan
+from pgn import readPgn
+from constants import START_FEN
+
+# Book entry (Polyglot layout, big-endian so the file sorts the same bytewise and by key):
+# position hash, 15-bit move key, weight, learn (unused, kept for the layout)
+ENTRY = struct.Struct('>QHHI')
+MAX_WEIGHT = 0xFFFF
+
+# Weight a move gets for each game it was played in, by the game's result for the side that played it
+RESULT_WEIGHTS = {'win': 2, 'draw': 1, 'loss': 0}
+
+# Distinct (position, move) pairs held in memory before the builder spills a sorted run to disk
+# - Run records: position hash, move key, summed weight, games
+RUN_ENTRIES = 500000
+RUN_RECORD = struct.Struct('>QHII')
+
+
+class OpeningBook:
+    """
+    Opening book on disk
+    - A sorted array of fixed-width (hash, move, weight) entries, searched by bisection over an mmap
+    - Nothing is read up front: a lookup touches about log2(entries) entries
+    - Moves are picked at random in proportion to their weight
+    """
+    def __init__(self, path, rng=None):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size % ENTRY.size:
+            self.file.close()
+            raise ValueError(f"Not a book file: {path}")
+        self.count = self.size // ENTRY.size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.rng = rng or random.Random()
+
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+    def keyAt(self, index):
+        return ENTRY.unpack_from(self.map, index * ENTRY.size)[0]
+
+
+    def findFirst(self, key):
+        # Index of the first entry with a hash >= key
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.keyAt(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+    def entries(self, key):
+        # (move key, weight) of every book move of a position hash
+        result = []
+        index = self.findFirst(key)
+        while index < self.count:
+            entryKey, move, weight, _ = ENTRY.unpack_from(self.map, index * ENTRY.size)
+            if entryKey != key:
+                break
+            result.append((move, weight))
+            index += 1
+        return result
+
+
+    def bookMoves(self, board):
+        # (Move, weight) of the legal book moves of a position (hash collisions give moves that are not legal here)
+        entries = self.entries(board.hash)
+        if not entries:
+            return []
+        legal = {moveKey(move): move for move in board.generateAllLegalMoves(board.turn)}
+        return [(legal[key], weight) for key, weight in entries if key in legal]
+
+
+    def chooseMove(self, board, best=False):
+        # A book move picked in proportion to its weight (the heaviest with best=True), or None if out of book
+        moves = [(move, weight) for move, weight in self.bookMoves(board) if weight]
+        if not moves:
+            return None
+        if best:
+            return max(moves, key=lambda entry: entry[1])[0]
+        return self.rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+
+def gameWeights(result):
+    # Weight earned by white's and black's moves in a game with a PGN result (None for unfinished games)
+    if result == '1-0':
+        return {'w': RESULT_WEIGHTS['win'], 'b': RESULT_WEIGHTS['loss']}
+    if result == '0-1':
+        return {'w': RESULT_WEIGHTS['loss'], 'b': RESULT_WEIGHTS['win']}
+    if result == '1/2-1/2':
+        return {'w': RESULT_WEIGHTS['draw'], 'b': RESULT_WEIGHTS['draw']}
+    return None
+
+
+def bookEntries(games, maxPlies):
+    # Streams (hash, move key, weight) for the first maxPlies moves of each game
+    for headers, sanMoves in games:
+        weights = gameWeights(headers.get('Result'))
+        if weights is None:
+            continue
+        try:
+            board = Board.fromFen(headers.get('FEN', START_FEN))
+        except ValueError:
+            continue
+        for san in sanMoves[:maxPlies]:
+            try:
+                move = parseSan(board, san)
+            except ValueError:
+                break
+            yield board.hash, moveKey(move), weights[board.turn]
+            board.makeMove(move)
+
+
+def writeRun(counts, directory):
+    # Writes the counted entries sorted to a temporary run file and returns its path
+    file = tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.run', delete=False)
+    with file:
+        for (key, move), (weight, games) in sorted(counts.items()):
+            file.write(RUN_RECORD.pack(key, move, weight, games))
+    return file.name
+
+
+def readRun(path):
+    # Streams the ((hash, move), weight, games) entries of a run file
+    with open(path, 'rb') as file:
+        while True:
+            data = file.read(RUN_RECORD.size * 4096)
+            if not data:
+                break
+            for key, move, weight, games in RUN_RECORD.iter_unpack(data):
+                yield (key, move), weight, games
+
+
+def buildBook(games, path, maxPlies=20, minGames=1, runEntries=RUN_ENTRIES):
+    # Builds a book file from (headers, sanMoves) games (e.g. readPgn) without holding the whole archive in memory
+    # - Entries are counted in a dict, spilled to sorted run files when it grows past runEntries,
+    #   and the runs are merged into the book
+    # - Moves seen in fewer than minGames games are left out
+    # - Returns the number of entries written
+    directory = os.path.dirname(os.path.abspath(path))
+    runs = []
+    counts = {}
+
+    try:
+        for key, move, weight in bookEntries(games, maxPlies):
+            entry = counts.get((key, move))
+            counts[key, move] = (weight, 1) if entry is None else (entry[0] + weight, entry[1] + 1)
+            if len(counts) >= runEntries:
+                runs.append(writeRun(counts, directory))
+                counts = {}
+
+        merged = heapq.merge(*(readRun(run) for run in runs), ((entry, weight, count) for entry, (weight, count) in sorted(counts.items())))
+
+        written = 0
+        with open(path, 'wb') as out:
+            current = None
+            weight = games = 0
+            for entry, entryWeight, entryGames in merged:
+                if entry != current:
+                    if current is not None and games >= minGames:
+                        out.write(ENTRY.pack(*current, min(weight, MAX_WEIGHT), 0))
+                        written += 1
+                    current = entry
+                    weight = games = 0
+                weight += entryWeight
+                games += entryGames
+            if current is not None and games >= minGames:
+                out.write(ENTRY.pack(*current, min(weight, MAX_WEIGHT), 0))
+                written += 1
+    finally:
+        for run in runs:
+            os.remove(run)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Opening book builder and prober")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    buildParser = subparsers.add_parser("build", help="build a book from a PGN archive")
+    buildParser.add_argument("pgn", help="PGN file")
+    buildParser.add_argument("book", help="output book file")
+    buildParser.add_argument("--plies", type=int, default=20, help="plies of each game to include")
+    buildParser.add_argument("--min-games", type=int, default=1, help="games a move must appear in")
+
+    probeParser = subparsers.add_parser("probe", help="list the book moves of a position")
+    probeParser.add_argument("book", help="book file")
+    probeParser.add_argument("fen", nargs="?", default=START_FEN, help="position (default: start position)")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        written = buildBook(readPgn(args.pgn), args.book, args.plies, args.min_games)
+        print(f"{written} entries in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    book = OpeningBook(args.book)
+    board = Board.fromFen(args.fen)
+    moves = book.bookMoves(board)
+    total = sum(weight for _, weight in moves)
+    for move, weight in sorted(moves, key=lambda entry: -entry[1]):
+        print(f"{move.toUci()} {weight} ({weight / total if total else 0:.1%})")
+    book.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ DIMENSION = 8
 SQ_SIZE = SIZE[0] // DIMENSION
 FPS = 15
 
+# ENGINE
+ENGINE_TIME = 2.0   # Seconds per engine move
+
 # GRID AND HIGHLIGHT COLOURS
 LIGHT_COL = (238, 238, 210) # Beige
 DARK_COL = (118, 150, 86)   # Dark Green
@@ -40,4 +43,10 @@ KING_OFFSETS = [
     (-1, -1), (-1, 0), (-1, +1),
     ( 0, -1),          ( 0, +1),
     (+1, -1), (+1, 0), (+1, +1)
-]
\ No newline at end of file
+]
+
+# PIECES AND POSITIONS
+PIECE_TYPES = ('P', 'N', 'B', 'R', 'Q', 'K')
+PROMOTION_TYPES = ('Q', 'R', 'B', 'N')
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
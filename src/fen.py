@@ -0,0 +1,120 @@
+from move import parseSquare, squareName
+from constants import DIMENSION
+
+# Placement characters: piece letters map to (colour, type), digits to the number of empty squares
+PLACEMENT_CHARS = {char: ('w' if char.isupper() else 'b', char.upper()) for char in 'PNBRQKpnbrqk'}
+PLACEMENT_CHARS.update({str(empty): empty for empty in range(1, DIMENSION + 1)})
+
+# Letter written for each (colour, type)
+PIECE_CHARS = {piece: char for char, piece in PLACEMENT_CHARS.items() if isinstance(piece, tuple)}
+
+
+def parseFen(fen):
+    # Splits a FEN string into its fields
+    # - Returns (placement, turn, castling, enPassantSq, halfMoveClock, fullMoveNumber)
+    # - placement is a list of (row, col, colour, type) for every piece
+    # - The move counters are optional (EPD records stop after the en Passant square)
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError(f"Invalid FEN: {fen!r}")
+
+    placement = []
+    row = 0
+    col = 0
+    try:
+        for char in fields[0]:
+            if char == '/':
+                if col != DIMENSION:
+                    raise ValueError
+                row += 1
+                col = 0
+                continue
+            piece = PLACEMENT_CHARS[char]
+            if piece.__class__ is int:
+                col += piece
+            else:
+                placement.append((row, col, piece[0], piece[1]))
+                col += 1
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid FEN placement: {fields[0]!r}") from None
+    if row != DIMENSION - 1 or col != DIMENSION:
+        raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+
+    turn = fields[1]
+    if turn not in ('w', 'b'):
+        raise ValueError(f"Invalid FEN side to move: {turn!r}")
+
+    castling = '' if fields[2] == '-' else fields[2]
+    enPassantSq = None if fields[3] == '-' else parseSquare(fields[3])
+
+    try:
+        halfMoveClock = int(fields[4]) if len(fields) > 4 else 0
+        fullMoveNumber = int(fields[5]) if len(fields) > 5 else 1
+    except ValueError:
+        raise ValueError(f"Invalid FEN move counters: {fen!r}") from None
+
+    return placement, turn, castling, enPassantSq, halfMoveClock, fullMoveNumber
+
+
+def formatFen(grid, turn, castling, enPassantSq, halfMoveClock=0, fullMoveNumber=1):
+    # Builds a FEN string from an 8x8 grid of pieces and the position fields
+    # - castling is a string such as 'KQkq' ('' for none)
+    rows = []
+    for gridRow in grid:
+        rowText = ''
+        empty = 0
+        for piece in gridRow:
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rowText += str(empty)
+                empty = 0
+            rowText += PIECE_CHARS[piece.colour, piece.type]
+        if empty:
+            rowText += str(empty)
+        rows.append(rowText)
+
+    enPassant = '-' if enPassantSq is None else squareName(enPassantSq)
+    return f"{'/'.join(rows)} {turn} {castling or '-'} {enPassant} {halfMoveClock} {fullMoveNumber}"
+
+
+def parseEpd(line):
+    # Splits an EPD record into (fen, operations), e.g. 'bm' -> 'Nf3'
+    # - A plain FEN line (with move counters) is accepted and has no operations
+    # - The hmvc/fmvn operations become the FEN move counters
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"Invalid EPD: {line!r}")
+    fen = ' '.join(fields[:4])
+    rest = fields[4].strip() if len(fields) > 4 else ''
+
+    counters = rest.rstrip(';').split()
+    if len(counters) == 2 and counters[0].isdigit() and counters[1].isdigit():
+        return f"{fen} {counters[0]} {counters[1]}", {}
+
+    operations = {}
+    for operation in rest.split(';'):
+        opcode, _, operand = operation.strip().partition(' ')
+        if opcode:
+            operations[opcode] = operand.strip().strip('"')
+
+    if 'hmvc' in operations or 'fmvn' in operations:
+        fen += f" {operations.get('hmvc', 0)} {operations.get('fmvn', 1)}"
+    return fen, operations
+
+
+def readEpd(path):
+    # Streams (fen, operations) for each record of a FEN or EPD file
+    # - Blank lines and '#' comments are skipped
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and line[0] != '#':
+                yield parseEpd(line)
+
+
+def readFens(path):
+    # Streams the positions of a FEN or EPD file, one per line
+    for fen, _ in readEpd(path):
+        yield fen
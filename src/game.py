@@ -1,7 +1,11 @@
-import pygame
 from board import Board
-from gui import Gui
-from constants import FPS, SQ_SIZE
+from search import Search
+from moveorder import moveIdentity
+from worker import Worker, boardSnapshot, gameEndCheck
+from constants import FPS, SQ_SIZE, ENGINE_TIME, START_FEN
+
+GAME_OVER_DELAY_MS = 5000
+
 class Game:
     """
     Main class
@@ -9,41 +13,112 @@ class Game:
     - Draws board through Gui
     - Handles player inputs
     - Executes moves using board and updates turn
+    - Lets the search engine play either colour, from an opening book while in book
+    - Engine search and game end checks run on a worker thread on a copy of the board, and their results
+      come back through the pygame event queue, so the window keeps responding while the engine thinks
+    - Promotions are chosen by clicking a piece in the window
+    - On a player's turn the game end check generates the legal moves once and they are cached on the board,
+      so selecting pieces costs no generation
+    - pygame (and Gui) are only imported when a Game is created (kept as self.pygame), so importing this module needs no display
     """
-    def __init__(self):
+    def __init__(self, boardType=Board, engineColours=(), engineTime=ENGINE_TIME, fen=START_FEN, tablebase=None, book=None):
         # Initialises pygame, objects and game data
+        # - boardType selects the board backend (Board or BitBoard)
+        # - fen is the position to start (or resume) from
+        # - engineColours lists the colours played by the engine, engineTime is its time per move
+        # - tablebase is an endgame Tablebase for the engine (None plays endgames by search)
+        # - book is an OpeningBook the engine plays from while the position is in it
+        import pygame
+        from gui import Gui
+        self.pygame = pygame
         pygame.init()
         self.running = True
         self.gameEnd = False
         self.clock = pygame.time.Clock()
         self.gui = Gui()
-        self.board = Board()
-        self.turn = 'w'
+        self.board = boardType.fromFen(fen)
+        self.turn = self.board.turn
         self.pieceSq = ()
         self.targetSq = ()
         self.legalMoves = []
         self.targetSqs = []
-        self.halfMoveCount = 0
+        self.promotionMoves = []
+        self.engine = Search(tablebase=tablebase)
+        self.engineColours = engineColours
+        self.engineTime = engineTime
+        self.book = book
+
+        # Events for worker results (kind, result, ticket) and for closing once the game over message was shown
+        self.workerEvent = pygame.event.custom_type()
+        self.closeEvent = pygame.event.custom_type()
+
+        # Ticket of the worker job the game is waiting for (None when it waits for the player)
+        self.worker = Worker(self.postResult)
+        self.pending = None
 
 
     def run(self):
         # Main game loop: handles events, updates Gui and ticks clock
+        # - Only the squares that changed are redrawn and pushed to the display
+        # - The loop sleeps until an event arrives (player input or a worker result) instead of polling at FPS
+        self.requestGameEndCheck()
         while self.running:
-            self.handleEvents()
-            self.gui.draw(self.board, self.pieceSq, self.targetSqs)
-            pygame.display.flip()
-            if self.gameEnd:
-                self.endGame()
+            self.render()
+            self.handleEvents(wait=True)
             self.clock.tick(FPS)
+        self.engine.stop()
+        self.worker.close()
+
 
+    def render(self):
+        # Draws the changed squares and updates only their part of the display
+        promotion = (self.targetSq, self.turn) if self.promotionMoves else None
+        dirty = self.gui.draw(self.board, self.pieceSq, self.targetSqs, promotion)
+        if dirty:
+            self.pygame.display.update(dirty)
 
-    def handleEvents(self):
-        # Handles pygame events: quit, mouse click
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+
+    def handleEvents(self, wait=False):
+        # Handles pygame events: quit, mouse click, window exposed, worker results
+        # - wait blocks until at least one event arrives
+        events = self.pygame.event.get()
+        if wait and not events:
+            events = [self.pygame.event.wait()]
+
+        for event in events:
+            if event.type in (self.pygame.QUIT, self.closeEvent):
                 self.running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                self.handleClick(pygame.mouse.get_pos())
+            elif event.type == self.pygame.MOUSEBUTTONDOWN:
+                self.handleClick(event.pos)
+            elif event.type in (self.pygame.VIDEOEXPOSE, self.pygame.WINDOWEXPOSED):
+                self.gui.invalidate()
+            elif event.type == self.workerEvent:
+                self.handleResult(event.kind, event.result, event.ticket)
+
+
+    def postResult(self, kind, result, ticket):
+        # Called on the worker thread: hands a job's result to the main loop (pygame.event.post is thread safe)
+        self.pygame.event.post(self.pygame.event.Event(self.workerEvent, kind=kind, result=result, ticket=ticket))
+
+
+    def handleResult(self, kind, result, ticket):
+        # Handles the result of the worker job the game is waiting for
+        if ticket != self.pending:
+            return
+        self.pending = None
+
+        if kind == 'error':
+            raise result
+        if kind == 'gameEnd':
+            message, legalMoves = result
+            if legalMoves is not None:
+                self.board.moveCache().adopt(self.board, legalMoves)
+            if message:
+                self.endGame(message)
+            elif self.turn in self.engineColours:
+                self.requestEngineMove()
+        elif kind == 'engineMove' and result:
+            self.applyMove(self.findMove(result))
 
 
     def handleClick(self, pos):
@@ -51,18 +126,28 @@ class Game:
         square = self.getSquareFromPos(pos)
         piece = self.board.getPiece(square)
 
+        # Ignore clicks while the engine is to move or a worker job is running
+        if self.gameEnd or self.pending is not None or self.turn in self.engineColours:
+            return
+
+        # Promotion choice
+        # - A click on one of the offered pieces promotes to it, any other click cancels the move
+        if self.promotionMoves:
+            self.choosePromotion(square)
+            return
+
         # 1st click
         # - Must be a piece of the current player's colour (allows re-selection)
         # - Checks if piece is not None (None has no .colour attribute)
         if piece and piece.colour == self.turn:
             self.firstClick(square, piece)
             return
-        
+
         # 2nd click
         # - If no valid first click, return
         if not self.pieceSq:
             return
-        
+
         # - Assign 2nd click because it must be empty/opponent square
         self.targetSq = square
 
@@ -72,29 +157,68 @@ class Game:
     def firstClick(self, square, piece):
         # 1st click
         self.pieceSq = square
-        self.legalMoves = self.board.generateLegalMoves(piece, square)
+        self.legalMoves = self.board.legalMovesFrom(square)
         self.targetSqs = [move.endSq for move in self.legalMoves]
 
 
     def makePlayerMove(self):
         # - If click is in the list of legal moves, make the move
-        for move in self.legalMoves: 
-            if self.targetSq == move.endSq:
+        # - A promotion has one legal move per piece type, so the player picks one in the window
+        moves = [move for move in self.legalMoves if move.endSq == self.targetSq]
+        if not moves:
+            return
+
+        if moves[0].promotionType:
+            self.promotionMoves = moves
+            return
+        self.applyMove(moves[0])
+
+
+    def choosePromotion(self, square):
+        # Plays the promotion to the piece clicked, or cancels the move
+        promotionType = self.gui.promotionSquares(self.targetSq).get(square)
+        moves = [move for move in self.promotionMoves if move.promotionType == promotionType]
+        self.promotionMoves = []
+        if moves:
+            self.applyMove(moves[0])
+        else:
+            self.resetMoveData()
+
+
+    def requestEngineMove(self):
+        # Lets the engine pick a move on the worker thread (a book move if there is one, otherwise a search)
+        self.pending = self.worker.submit('engineMove', self.chooseEngineMove, boardSnapshot(self.board))
+
+
+    def chooseEngineMove(self, board):
+        # Runs on the worker thread
+        move = self.book.chooseMove(board) if self.book else None
+        if move is None:
+            move = self.engine.search(board, timeLimit=self.engineTime)
+        return move
 
-                self.checkPawnPromotion(move)
 
-                self.board.makeMove(move)
+    def findMove(self, move):
+        # The move on this board matching a move found on a copy of it
+        start = move.startSq
+        for legalMove in self.board.legalMovesFrom(start):
+            if moveIdentity(legalMove) == moveIdentity(move):
+                return legalMove
+        raise ValueError(f"Illegal move {move.toUci()} in {self.board.toFen()}")
 
-                if move.piece.type == 'P' or move.pieceCaptured:
-                    self.halfMoveCount = 0
-                else:
-                    self.halfMoveCount += 1
 
-                self.switchTurn()
-                self.resetMoveData()
-                self.gameEnd = self.checkGameEnd()
+    def applyMove(self, move):
+        # Makes a move and updates the turn (the board keeps the move counters)
+        # - The game end check runs on the worker, input waits for its result
+        self.board.makeMove(move)
+        self.switchTurn()
+        self.resetMoveData()
+        self.requestGameEndCheck()
 
-                return
+
+    def requestGameEndCheck(self):
+        # The player's legal moves come back with the result; the engine's turn only needs to know if there is one
+        self.pending = self.worker.submit('gameEnd', gameEndCheck, boardSnapshot(self.board), self.turn not in self.engineColours)
 
 
     def getSquareFromPos(self, pos):
@@ -104,61 +228,22 @@ class Game:
         return (row, col)
 
 
-    def checkPawnPromotion(self, move):
-        # Checks if the move is a pawn attempting to promote
-        # Adds promotion type to the move
-
-        # Check for pawn move
-        if move.piece.type != 'P':
-            return
-
-        if (move.piece.colour == 'w' and move.endSq[0] == 0) or (move.piece.colour == 'b' and move.endSq[0] == 7):
-            while True:
-                promotionType = input("Promotion! (Q, R, B, N): ").upper()
-                if promotionType in ('Q', 'R', 'B', 'N'):
-                    move.promotionType = promotionType
-                    return
-                else:
-                    print("Invalid Piece")
-
-
     def switchTurn(self):
         # Switches turns
         self.turn = 'b' if self.turn == 'w' else 'w'
 
 
-    def checkGameEnd(self):
-        # Checks for game end
-        if self.board.insufficientMaterial():
-            print("Draw: Insufficient material!")
-            return True
-        
-        if self.halfMoveCount == 150:
-            print("Draw: 75 move rule!")
-            return True
-
-        if self.board.generateAllLegalMoves(self.turn):
-            return False
-        
-        if self.board.inCheck(self.turn):
-            if self.turn == 'w':
-                print("Checkmate: Black won!")
-            else:
-                print("Checkmate: White won!")
-        else:
-            print("Stalemate!")
-        
-        return True
-
-
     def resetMoveData(self):
         # Resets move data
         self.pieceSq = ()
         self.targetSq = ()
         self.legalMoves = []
         self.targetSqs = []
+        self.promotionMoves = []
 
 
-    def endGame(self):
-        pygame.time.delay(5000)
-        self.running = False
+    def endGame(self, message):
+        # Shows the result, then closes the window after a delay without blocking it
+        print(message)
+        self.gameEnd = True
+        self.pygame.time.set_timer(self.closeEvent, GAME_OVER_DELAY_MS, loops=1)
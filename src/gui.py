@@ -1,13 +1,44 @@
+import os
 import pygame
 from constants import SIZE, CAPTION, DIMENSION, SQ_SIZE, LIGHT_COL, DARK_COL, SELECTION_HIGHLIGHT_COL, TARGET_HIGHLIGHT_COL
 
+# Square highlight states
+NO_HIGHLIGHT, SELECTION_HIGHLIGHT, TARGET_HIGHLIGHT = 0, 1, 2
+
+# Piece images, found next to the source tree whatever the working directory
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "images")
+PIECE_IMAGES = ('wP', 'wR', 'wN', 'wB', 'wQ', 'wK', 'bP', 'bR', 'bN', 'bB', 'bQ', 'bK')
+
+# Piece images scaled to a square size, by size (loaded once per process)
+SPRITES = {}
+
+# Pieces offered when a pawn promotes, from the promotion square towards the centre
+PROMOTION_CHOICES = ('Q', 'R', 'B', 'N')
+
+
+def loadSprites(size):
+    # The piece images scaled to a square size, loaded from the image folder on first use
+    sprites = SPRITES.get(size)
+    if sprites is None:
+        sprites = {}
+        for piece in PIECE_IMAGES:
+            image = pygame.transform.scale(pygame.image.load(os.path.join(IMAGES_DIR, piece + ".png")), (size, size))
+            # Matching the display's pixel format makes every blit a straight copy
+            sprites[piece] = image.convert_alpha() if pygame.display.get_surface() is not None else image
+        SPRITES[size] = sprites
+    return sprites
+
+
 class Gui:
     """
     User interface for the chess game
     - Creates and manages pygame display
-    - Loads and stores piece images
+    - Loads and stores piece images (scaled once per square size and shared by every Gui)
     - Draws chessboard and pieces
     - Highlights selected square and target squares
+    - The empty board is rendered once to a cached surface
+    - Only squares whose piece or highlight changed since the last frame are redrawn
+    - Shows the promotion choices over the board when a pawn promotes
     """
     def __init__(self):
         # Initialises screen, loads piece images and board colours
@@ -16,33 +47,85 @@ class Gui:
         self.colours = [pygame.Color(LIGHT_COL), pygame.Color(DARK_COL), pygame.Color(SELECTION_HIGHLIGHT_COL), pygame.Color(TARGET_HIGHLIGHT_COL)]
         self.images = {}
         self.loadImages()
+        self.boardSurface = self.renderBoard()
+        self.rects = [[pygame.Rect(col * SQ_SIZE, row * SQ_SIZE, SQ_SIZE, SQ_SIZE) for col in range(DIMENSION)] for row in range(DIMENSION)]
+
+        # (piece image key, highlight) of each square as last drawn (None forces a redraw)
+        self.drawn = [[None] * DIMENSION for _ in range(DIMENSION)]
 
 
     def loadImages(self):
-        # Loads piece images from folder and scales them to square size
-        pieces = ['wP', 'wR', 'wN', 'wB', 'wQ', 'wK', 'bP', 'bR', 'bN', 'bB', 'bQ', 'bK']
-        for piece in pieces:
-            self.images[piece] = pygame.transform.scale(pygame.image.load("images/" + piece  + ".png"), (SQ_SIZE, SQ_SIZE))
-    
-    
-    def draw(self, board, highlightSq, targetSqs):
-        # Draws chess board
+        # Piece images scaled to square size
+        self.images = loadSprites(SQ_SIZE)
+
+
+    def renderBoard(self):
+        # Renders the empty board once
+        surface = pygame.Surface(SIZE).convert()
         for row in range(DIMENSION):
             for col in range(DIMENSION):
-                rect = pygame.Rect(col * SQ_SIZE, row * SQ_SIZE, SQ_SIZE, SQ_SIZE)
-                colour = self.colours[(row + col) % 2]
+                pygame.draw.rect(surface, self.colours[(row + col) % 2], (col * SQ_SIZE, row * SQ_SIZE, SQ_SIZE, SQ_SIZE))
+        return surface
+
 
-                # Higlights Square
-                if (row, col) == highlightSq:
-                    colour = self.colours[2]
-                
-                # Highlights Target squares
-                if (row, col) in targetSqs:
-                    colour = self.colours[3]
+    def invalidate(self):
+        # Forces the next draw to redraw every square (e.g. after the window was covered)
+        self.drawn = [[None] * DIMENSION for _ in range(DIMENSION)]
 
-                pygame.draw.rect(self.screen, colour, rect)
+
+    @staticmethod
+    def promotionSquares(square):
+        # Squares of the promotion choices: a column from the promotion square towards the centre
+        # - Returns {square: promotion type}
+        row, col = square
+        step = 1 if row == 0 else -1
+        return {(row + step * index, col): pieceType for index, pieceType in enumerate(PROMOTION_CHOICES)}
+
+
+    def draw(self, board, highlightSq, targetSqs, promotion=None):
+        # Draws the squares that changed since the last frame
+        # - promotion: (square, colour) of a promotion waiting for the player's choice
+        # - Returns the rects drawn, for pygame.display.update
+        choices = {}
+        if promotion:
+            square, colour = promotion
+            choices = {sq: colour + pieceType for sq, pieceType in self.promotionSquares(square).items()}
+
+        dirty = []
+        grid = board.grid
+        for row in range(DIMENSION):
+            gridRow = grid[row]
+            drawnRow = self.drawn[row]
+            for col in range(DIMENSION):
+                piece = gridRow[col]
+                image = piece.colour + piece.type if piece is not None else None
+
+                # Promotion choices cover the board, highlighted like the selection
+                if (row, col) in choices:
+                    image = choices[row, col]
+                    highlight = SELECTION_HIGHLIGHT
+                # Highlights Square / Target squares
+                elif (row, col) in targetSqs:
+                    highlight = TARGET_HIGHLIGHT
+                elif (row, col) == highlightSq:
+                    highlight = SELECTION_HIGHLIGHT
+                else:
+                    highlight = NO_HIGHLIGHT
+
+                state = (image, highlight)
+                if drawnRow[col] == state:
+                    continue
+                drawnRow[col] = state
+
+                rect = self.rects[row][col]
+                if highlight == NO_HIGHLIGHT:
+                    self.screen.blit(self.boardSurface, rect, rect)
+                else:
+                    pygame.draw.rect(self.screen, self.colours[1 + highlight], rect)
 
                 # Draws Pieces onto correct square
-                piece = board.grid[row][col]
-                if piece is not None:
-                    self.screen.blit(self.images[piece.colour + piece.type], rect)
+                if image is not None:
+                    self.screen.blit(self.images[image], rect)
+                dirty.append(rect)
+
+        return dirty
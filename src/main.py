@@ -1,7 +1,29 @@
-from game import Game
+import argparse
+from tablebase import Tablebase
+from book import OpeningBook
+from constants import ENGINE_TIME, START_FEN
 
 def main():
-    game = Game()
+    parser = argparse.ArgumentParser(description="Chess")
+    parser.add_argument("--engine", choices=['w', 'b'], action="append", default=[], help="colour played by the engine (can be given twice)")
+    parser.add_argument("--time", type=float, default=ENGINE_TIME, help="engine seconds per move")
+    parser.add_argument("--fen", default=START_FEN, help="position to start from")
+    parser.add_argument("--tablebases", help="endgame tablebase directory (built by tablebase.py generate)")
+    parser.add_argument("--book", help="opening book file (built by book.py build)")
+    parser.add_argument("--uci", action="store_true", help="run as a UCI engine on stdin/stdout (no window)")
+    args = parser.parse_args()
+
+    tablebase = Tablebase(args.tablebases) if args.tablebases else None
+    book = OpeningBook(args.book) if args.book else None
+
+    # The UCI path never imports pygame, so it runs without a display
+    if args.uci:
+        from uci import UciEngine
+        UciEngine(tablebase=tablebase, book=book).run()
+        return
+
+    from game import Game
+    game = Game(engineColours=tuple(args.engine), engineTime=args.time, fen=args.fen, tablebase=tablebase, book=book)
     game.run()
 
 if __name__ == "__main__":
@@ -1,9 +1,67 @@
+from constants import DIMENSION
+
+FILES = 'abcdefgh'
+
+# Packed move encoding (one int per move): compact to store, hash and compare
+# - bits 0-5: start square, bits 6-11: end square (row * 8 + col)
+# - bits 12-14: promotion code, bits 15-17: flags
+PROMOTION_CODES = {None: 0, 'Q': 1, 'R': 2, 'B': 3, 'N': 4}
+PROMOTION_PIECES = (None, 'Q', 'R', 'B', 'N')
+
+FLAG_CAPTURE = 1 << 15
+FLAG_EN_PASSANT = 2 << 15
+FLAG_CASTLE = 4 << 15
+
+# Start square, end square and promotion: enough to identify a move in a position
+KEY_MASK = 0x7FFF
+
+
+def squareName(square):
+    # Converts (row, col) to algebraic notation, e.g. (6, 4) -> 'e2'
+    row, col = square
+    return FILES[col] + str(DIMENSION - row)
+
+
+def parseSquare(name):
+    # Converts algebraic notation to (row, col), e.g. 'e2' -> (6, 4)
+    return (DIMENSION - int(name[1]), FILES.index(name[0]))
+
+
+def encodeMove(move):
+    # Packs a Move into an int
+    startRow, startCol = move.startSq
+    endRow, endCol = move.endSq
+    packed = (startRow * DIMENSION + startCol) | (endRow * DIMENSION + endCol) << 6 | PROMOTION_CODES[move.promotionType] << 12
+
+    if move.pieceCaptured:
+        packed |= FLAG_CAPTURE
+    if move.isEnPassant:
+        packed |= FLAG_EN_PASSANT
+    if move.isCastle:
+        packed |= FLAG_CASTLE
+    return packed
+
+
+def moveKey(move):
+    # Compact 15-bit identity of a move in a position: from | to << 6 | promotion << 12
+    return encodeMove(move) & KEY_MASK
+
+
+def packedToUci(packed):
+    # Long algebraic notation of a packed move
+    promotion = PROMOTION_PIECES[(packed >> 12) & 7]
+    return squareName(divmod(packed & 63, DIMENSION)) + squareName(divmod((packed >> 6) & 63, DIMENSION)) + (promotion.lower() if promotion else '')
+
+
 class Move:
     """
     Represents a single chess move
-    - Includes all information required to make/undo a move
+    - Includes all information required to make a move (undo state is kept by the board)
+    - Can be packed into an int with encodeMove (move keys, transposition table, BitBoard's packed path)
     """
-    def __init__(self, startSq, endSq, piece, pieceCaptured=None, prevPieceMoved=False, promotionType=None, isEnPassant=False, prevEnPassantSq=None, isCastle=False, kingSide=False):
+    __slots__ = ('startSq', 'endSq', 'piece', 'pieceCaptured', 'promotionType', 'isEnPassant', 'isCastle', 'kingSide')
+
+    def __init__(self, startSq, endSq, piece, pieceCaptured=None, promotionType=None, isEnPassant=False, isCastle=False, kingSide=False):
     
         self.startSq = startSq
         self.endSq = endSq
@@ -11,17 +69,20 @@ class Move:
         self.piece = piece
         self.pieceCaptured = pieceCaptured
 
-        self.prevPieceMoved = prevPieceMoved
-
         self.promotionType = promotionType
         
         self.isEnPassant = isEnPassant
-        self.prevEnPassantSq = prevEnPassantSq
 
         self.isCastle = isCastle
         self.kingSide = kingSide
 
 
+    def toUci(self):
+        # Long algebraic notation, e.g. 'e2e4' or 'e7e8q'
+        promotion = self.promotionType.lower() if self.promotionType else ''
+        return squareName(self.startSq) + squareName(self.endSq) + promotion
+
+
     def __repr__(self):
         return f"Move({self.startSq}->{self.endSq}, {self.piece.type})"
     
\ No newline at end of file
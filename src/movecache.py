@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+from move import Move
+
+# Positions kept per board
+LEGAL_MOVE_CACHE_POSITIONS = 64
+
+
+class LegalMoveCache:
+    """
+    Legal moves of a board's recent positions, keyed by position hash, least recently used evicted first
+    - Moves are generated once per position and indexed by start square, so selecting pieces, showing
+      hints and checking for the end of the game reuse one generation
+    - make/undo change the hash, so each position's entry is found again only for that position
+    - Moves refer to the board's piece objects, so an entry whose pieces are no longer on their squares
+      (e.g. a promoted piece made again) is generated afresh
+    """
+    def __init__(self, positions=LEGAL_MOVE_CACHE_POSITIONS):
+        self.positions = positions
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def entry(self, board):
+        # (moves, moves by start square) of the board's side to move
+        key = board.hash
+        entry = self.entries.get(key)
+        if entry is not None and self.matches(board, entry[0]):
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        return self.store(board, board.generateAllLegalMoves(board.turn))
+
+
+    def store(self, board, moves):
+        # Caches the legal moves of the board's position
+        bySquare = {}
+        for move in moves:
+            bySquare.setdefault(move.startSq, []).append(move)
+        entry = (moves, bySquare)
+        self.entries[board.hash] = entry
+        self.entries.move_to_end(board.hash)
+        if len(self.entries) > self.positions:
+            self.entries.popitem(last=False)
+        return entry
+
+
+    def adopt(self, board, moves):
+        # Caches moves generated on a copy of the board's position (e.g. by a worker thread),
+        # rebound to this board's pieces so no generation is needed here
+        getPiece = board.getPiece
+        rebound = []
+        for move in moves:
+            captured = None
+            if move.isEnPassant:
+                captured = getPiece((move.startSq[0], move.endSq[1]))
+            elif move.pieceCaptured:
+                captured = getPiece(move.endSq)
+            rebound.append(Move(move.startSq, move.endSq, getPiece(move.startSq), captured, move.promotionType, move.isEnPassant, move.isCastle, move.kingSide))
+        self.store(board, rebound)
+
+
+    @staticmethod
+    def matches(board, moves):
+        # Checks the cached moves still refer to the pieces on the board
+        getPiece = board.getPiece
+        for move in moves:
+            if getPiece(move.startSq) is not move.piece:
+                return False
+            if move.pieceCaptured and not move.isEnPassant and getPiece(move.endSq) is not move.pieceCaptured:
+                return False
+        return True
+
+
+    def moves(self, board):
+        # A copy of the side to move's legal moves
+        return list(self.entry(board)[0])
+
+
+    def movesFrom(self, board, square):
+        # The side to move's legal moves starting on a square
+        return list(self.entry(board)[1].get(square, ()))
+
+
+    def hasMoves(self, board):
+        return bool(self.entry(board)[0])
+
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'positions': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+        }
@@ -1,45 +1,304 @@
 from move import Move
-from constants import DIMENSION, KNIGHT_OFFSETS, BISHOP_DIRECTIONS, ROOK_DIRECTIONS, QUEEN_DIRECTIONS, KING_OFFSETS
+from constants import DIMENSION, PROMOTION_TYPES, KNIGHT_OFFSETS, BISHOP_DIRECTIONS, ROOK_DIRECTIONS, QUEEN_DIRECTIONS, KING_OFFSETS
+
+# Generation modes (bit flags)
+# - GEN_CAPTURES: captures, en Passant and promotions
+# - GEN_QUIETS: every other move, including castling
+# - GEN_CHECKS: moves that give check
+GEN_CAPTURES = 1
+GEN_QUIETS = 2
+GEN_ALL = GEN_CAPTURES | GEN_QUIETS
+GEN_CHECKS = 4
 
 class MoveGen:
     """
     Move Generation Engine
     - Produces pseudo-legal moves and legal moves for every piece type
     - Detects checks, attacks and validates moves for king safety
+    - Finds checkers and pinned pieces once per position so only legal moves are emitted
     - Supports special moves such as promotion, en passant and castling
+    - Can generate only captures/promotions, only quiet moves or only checking moves
     """
     def __init__(self, board):
         self.board = board
 
-    def generateLegalMoves(self, piece, square):
-        # Generates the list of legal Moves
-        pseudoLegalMoves = self.generatePseudoLegalMoves(piece, square)
-        legalMoves = []
 
-        for move in pseudoLegalMoves:
+    def generateAllLegalMoves(self, colour, mode=GEN_ALL):
+        # Generates all legal moves for a player (or only those of one generation mode)
+        # - Checkers and pins are found once and shared by every piece
+        if mode == GEN_CHECKS:
+            checkInfo = self.checkInfo(colour)
+            return [move for move in self.generateAllLegalMoves(colour) if self.givesCheck(move, checkInfo)]
+
+        kingState = self.analyseKing(colour)
+        moves = []
+
+        # Copied because en passant checks make/undo moves while iterating
+        for square in list(self.board.pieceSqs[colour]):
+            piece = self.board.getPiece(square)
+            moves.extend(self.generateLegalMoves(piece, square, kingState, mode))
+
+        return moves
+
+
+    def checkInfo(self, colour):
+        # What a player needs to find its checking moves without making them
+        # - Returns (enemy king square, discovered)
+        # - discovered: square of our piece that alone blocks one of our sliders from the enemy king -> squares on that line
+        enemy = 'b' if colour == 'w' else 'w'
+        kingSq = self.findKing(enemy)
+        row, col = kingSq
+        discovered = {}
+
+        for directions, sliderType in ((ROOK_DIRECTIONS, 'R'), (BISHOP_DIRECTIONS, 'B')):
+            for rowDir, colDir in directions:
+                r = row + rowDir
+                c = col + colDir
+                ray = []
+                blockerSq = None
+
+                while self.inBounds(r, c):
+                    ray.append((r, c))
+                    piece = self.board.getPiece((r, c))
+
+                    if piece:
+                        if piece.colour != colour or blockerSq is not None:
+                            if blockerSq is not None and piece.colour == colour and piece.type in (sliderType, 'Q'):
+                                discovered[blockerSq] = set(ray)
+                            break
+                        blockerSq = (r, c)
+
+                    r += rowDir
+                    c += colDir
+
+        return kingSq, discovered
+
+
+    def givesCheck(self, move, checkInfo):
+        # Checks if a legal move puts the opponent in check, from checkInfo of the position it is made in
+        # - Direct checks: the piece lands on a square attacking the king; discovered checks: it leaves a slider's line
+        # - Castling and en Passant move two pieces, so they are made and tested instead
+        enemy = 'b' if move.piece.colour == 'w' else 'w'
+        if move.isCastle or move.isEnPassant:
             self.board.makeMove(move)
+            check = self.isKingInCheck(enemy)
+            self.board.undoMove()
+            return check
+
+        kingSq, discovered = checkInfo
+        if move.startSq in discovered and move.endSq not in discovered[move.startSq]:
+            return True
+        return self.attacksFrom(move.promotionType or move.piece.type, move.piece.colour, move.endSq, kingSq, move.startSq)
+
+
+    def attacksFrom(self, pieceType, colour, square, target, emptySq):
+        # Checks if a piece of a type on a square attacks a target square, with emptySq treated as empty
+        rowDiff = target[0] - square[0]
+        colDiff = target[1] - square[1]
+
+        match pieceType:
+            case 'P': return rowDiff == (-1 if colour == 'w' else 1) and abs(colDiff) == 1
+            case 'N': return (rowDiff, colDiff) in KNIGHT_OFFSETS
+            case 'K': return False
+            case 'B': aligned = abs(rowDiff) == abs(colDiff)
+            case 'R': aligned = rowDiff == 0 or colDiff == 0
+            case 'Q': aligned = abs(rowDiff) == abs(colDiff) or rowDiff == 0 or colDiff == 0
+
+        if not aligned or (rowDiff == 0 and colDiff == 0):
+            return False
+
+        # Every square between must be empty
+        rowDir = (rowDiff > 0) - (rowDiff < 0)
+        colDir = (colDiff > 0) - (colDiff < 0)
+        r = square[0] + rowDir
+        c = square[1] + colDir
+        while (r, c) != target:
+            if (r, c) != emptySq and self.board.grid[r][c] is not None:
+                return False
+            r += rowDir
+            c += colDir
+        return True
+
+
+    def hasLegalMove(self, colour):
+        # Checks if a player has any legal move, stopping at the first one found
+        # - King steps first (the only option in double check), then unpinned pieces, then pinned ones
+        kingState = self.analyseKing(colour)
+        kingSq, checkers, blockSqs, pins = kingState
+
+        if self.hasLegalKingStep(kingSq, colour):
+            return True
+        if len(checkers) > 1:
+            return False
+
+        squares = sorted(self.board.pieceSqs[colour], key=lambda square: square in pins)
+        for square in squares:
+            if square == kingSq:
+                continue
+            if self.generateLegalMoves(self.board.getPiece(square), square, kingState):
+                return True
+
+        return False
+
+
+    def hasLegalKingStep(self, kingSq, colour):
+        # Checks for a king step to a safe square (castling never needs checking: it needs a safe step too)
+        enemy = 'b' if colour == 'w' else 'w'
+        row, col = kingSq
+        king = self.board.grid[row][col]
+        self.board.grid[row][col] = None
+
+        try:
+            for rowOffset, colOffset in KING_OFFSETS:
+                r = row + rowOffset
+                c = col + colOffset
+                if self.inBounds(r, c):
+                    target = self.board.grid[r][c]
+                    if (target is None or target.colour != colour) and not self.squareAttacked((r, c), enemy):
+                        return True
+            return False
+        finally:
+            self.board.grid[row][col] = king
+
+
+    def generateLegalMoves(self, piece, square, kingState=None, mode=GEN_ALL):
+        # Generates the list of legal Moves (mode: GEN_CAPTURES, GEN_QUIETS or GEN_ALL)
+        # - In check: only king moves, captures of the checker and blocks
+        # - Pinned pieces: only moves along the pin ray
+        if kingState is None:
+            kingState = self.analyseKing(piece.colour)
+        kingSq, checkers, blockSqs, pins = kingState
+
+        if piece.type == 'K':
+            return self.generateLegalKingMoves(piece, square, kingSq, bool(checkers), mode)
+
+        # Double check: only the king can move
+        if len(checkers) > 1:
+            return []
+
+        pinRay = pins.get(square)
+        legalMoves = []
+
+        for move in self.generatePseudoLegalMoves(piece, square, mode):
+            if move.isEnPassant:
+                # Removes two pawns from one row, so verify directly
+                if self.isLegalByMakeMove(move, piece.colour):
+                    legalMoves.append(move)
+                continue
+
+            if pinRay is not None and move.endSq not in pinRay:
+                continue
+            if blockSqs is not None and move.endSq not in blockSqs:
+                continue
+
+            legalMoves.append(move)
+
+        return legalMoves
+
+
+    def generateLegalKingMoves(self, piece, square, kingSq, inCheck, mode=GEN_ALL):
+        # King moves are legal if the target is not attacked once the king has left its square
+        enemy = 'b' if piece.colour == 'w' else 'w'
+        legalMoves = []
 
-            if not self.isKingInCheck(piece.colour):
+        row, col = kingSq
+        self.board.grid[row][col] = None
+
+        for move in self.generateKingMoves(piece, square, inCheck, mode):
+            if move.isCastle or not self.squareAttacked(move.endSq, enemy):
                 legalMoves.append(move)
 
-            self.board.undoMove()
+        self.board.grid[row][col] = piece
 
         return legalMoves
 
 
-    def generatePseudoLegalMoves(self, piece, square):
+    def isLegalByMakeMove(self, move, colour):
+        # Checks a move's legality by making it and testing for check
+        self.board.makeMove(move)
+        legal = not self.isKingInCheck(colour)
+        self.board.undoMove()
+        return legal
+
+
+    def analyseKing(self, colour):
+        # Finds the king, its checkers and the pinned pieces of a colour
+        # - Returns (kingSq, checkers, blockSqs, pins)
+        # - blockSqs: squares that resolve a single check (None if not in check)
+        # - pins: pinned square -> squares on the pin ray it may move to
+        kingSq = self.findKing(colour)
+        enemy = 'b' if colour == 'w' else 'w'
+        row, col = kingSq
+        checkers = []
+        blockSqs = None
+        pins = {}
+
+        # Pawn and Knight checks
+        rowOffset = 1 if enemy == 'w' else -1
+        for colOffset in (-1, 1):
+            r = row + rowOffset
+            c = col + colOffset
+            if self.inBounds(r, c):
+                piece = self.board.getPiece((r, c))
+                if piece and piece.colour == enemy and piece.type == 'P':
+                    checkers.append((r, c))
+                    blockSqs = {(r, c)}
+
+        for rowOffset, colOffset in KNIGHT_OFFSETS:
+            r = row + rowOffset
+            c = col + colOffset
+            if self.inBounds(r, c):
+                piece = self.board.getPiece((r, c))
+                if piece and piece.colour == enemy and piece.type == 'N':
+                    checkers.append((r, c))
+                    blockSqs = {(r, c)}
+
+        # Sliding checks and pins
+        for directions, sliderType in ((ROOK_DIRECTIONS, 'R'), (BISHOP_DIRECTIONS, 'B')):
+            for rowDir, colDir in directions:
+                r = row + rowDir
+                c = col + colDir
+                ray = []
+                pinnedSq = None
+
+                while self.inBounds(r, c):
+                    ray.append((r, c))
+                    piece = self.board.getPiece((r, c))
+
+                    if piece:
+                        if piece.colour == colour:
+                            if pinnedSq is not None:
+                                break
+                            pinnedSq = (r, c)
+                        else:
+                            if piece.type == sliderType or piece.type == 'Q':
+                                if pinnedSq is None:
+                                    checkers.append((r, c))
+                                    blockSqs = set(ray)
+                                else:
+                                    pins[pinnedSq] = set(ray)
+                            break
+
+                    r += rowDir
+                    c += colDir
+
+        return kingSq, checkers, blockSqs, pins
+
+
+    def generatePseudoLegalMoves(self, piece, square, mode=GEN_ALL):
         # Calls appropriate move generator function
         match piece.type:
-            case 'P': return self.generatePawnMoves(piece, square)
-            case 'N': return self.generateKnightMoves(piece, square)
-            case 'B': return self.generateSlidingMoves(piece, square, BISHOP_DIRECTIONS)
-            case 'R': return self.generateSlidingMoves(piece, square, ROOK_DIRECTIONS)
-            case 'Q': return self.generateSlidingMoves(piece, square, QUEEN_DIRECTIONS)
-            case 'K': return self.generateKingMoves(piece, square)
+            case 'P': return self.generatePawnMoves(piece, square, mode)
+            case 'N': return self.generateKnightMoves(piece, square, mode)
+            case 'B': return self.generateSlidingMoves(piece, square, BISHOP_DIRECTIONS, mode)
+            case 'R': return self.generateSlidingMoves(piece, square, ROOK_DIRECTIONS, mode)
+            case 'Q': return self.generateSlidingMoves(piece, square, QUEEN_DIRECTIONS, mode)
+            case 'K': return self.generateKingMoves(piece, square, None, mode)
 
 
-    def generatePawnMoves(self, piece, square):
+    def generatePawnMoves(self, piece, square, mode=GEN_ALL):
         # Generates the list of legal pawn moves
+        # - Pushes to the last row are promotions, so they count as captures for the generation modes
         row, col = square
         moves = []
 
@@ -47,65 +306,81 @@ class MoveGen:
             
         r = row + rowOffset
         c = col
+        promoting = r in (0, DIMENSION - 1)
 
         # Forward one square
         if self.inBounds(r, c):
             target = self.board.getPiece((r, c))
             if target is None:
-                move = Move(square, (r, c), piece, target, piece.moved)
-                moves.append(move)
+                if mode & (GEN_CAPTURES if promoting else GEN_QUIETS):
+                    self.addPawnMove(moves, piece, square, (r, c), target)
                 
                 r2 = row + (rowOffset * 2)
 
                 # Forward two squares (only if pawn has not moved)
-                if self.inBounds(r2, c):
+                if self.inBounds(r2, c) and mode & GEN_QUIETS:
                     if not piece.moved:
                         target = self.board.getPiece((r2, c))
                         if target is None:
-                            move = Move(square, (r2, c), piece, target, piece.moved)
+                            move = Move(square, (r2, c), piece, target)
                             moves.append(move)
 
 
+        if not mode & GEN_CAPTURES:
+            return moves
+
         # Diagonal Captures
         for colOffset in (-1, 1):
             c = col + colOffset
             if self.inBounds(r, c):
                 target = self.board.getPiece((r, c))
                 if target and target.colour != piece.colour:
-                    move = Move(square, (r, c), piece, target, piece.moved)
-                    moves.append(move)
+                    self.addPawnMove(moves, piece, square, (r, c), target)
 
                 # Checks for en Passant
                 if (r, c) == self.board.enPassantSq:
                     target = self.board.getPiece((row, c))
                     if target and target.type == 'P' and target.colour != piece.colour:
-                        move = Move(square, (r, c), piece, target, piece.moved, isEnPassant=True)
+                        move = Move(square, (r, c), piece, target, isEnPassant=True)
                         moves.append(move)
 
         return moves
 
 
-    def generateKnightMoves(self, piece, square):
+    def addPawnMove(self, moves, piece, square, endSq, target):
+        # Adds a pawn move, expanding it into one move per piece type when it reaches the last row
+        if endSq[0] in (0, DIMENSION - 1):
+            for promotionType in PROMOTION_TYPES:
+                moves.append(Move(square, endSq, piece, target, promotionType))
+        else:
+            moves.append(Move(square, endSq, piece, target))
+
+
+    def generateKnightMoves(self, piece, square, mode=GEN_ALL):
         # Generates the list of legal Knight moves
         row, col = square
         moves = []
+        quiets = mode & GEN_QUIETS
+        captures = mode & GEN_CAPTURES
 
         for rowOffset, colOffset in KNIGHT_OFFSETS:
             r = row + rowOffset
             c = col + colOffset
             if self.inBounds(r, c):
                 target = self.board.getPiece((r, c))
-                if target is None or target.colour != piece.colour:
-                    move = Move(square, (r, c), piece, target, piece.moved)
+                if (quiets if target is None else captures and target.colour != piece.colour):
+                    move = Move(square, (r, c), piece, target)
                     moves.append(move)
 
         return moves
 
 
-    def generateSlidingMoves(self, piece, square, directions):
+    def generateSlidingMoves(self, piece, square, directions, mode=GEN_ALL):
         # Generates the list of sliding moves given a list of directions
         row, col = square
         moves = []
+        quiets = mode & GEN_QUIETS
+        captures = mode & GEN_CAPTURES
 
         # Check for each direction the piece can slide
         for rowDir, colDir in directions:
@@ -117,11 +392,12 @@ class MoveGen:
                 target = self.board.getPiece((r, c))
                 
                 if target is None:          # Empty Square
-                    move = Move(square, (r, c), piece, target, piece.moved)
-                    moves.append(move)
+                    if quiets:
+                        move = Move(square, (r, c), piece, target)
+                        moves.append(move)
                 else:
-                    if target.colour != piece.colour:   # Opponent Piece
-                        move = Move(square, (r, c), piece, target, piece.moved)
+                    if captures and target.colour != piece.colour:   # Opponent Piece
+                        move = Move(square, (r, c), piece, target)
                         moves.append(move)
                     break                               # Blocked by Friendly Piece
                 
@@ -132,35 +408,45 @@ class MoveGen:
         return moves
     
 
-    def generateKingMoves(self, piece, square):
+    def generateKingMoves(self, piece, square, inCheck=None, mode=GEN_ALL):
         # Generate the list of legal King Moves
+        # - inCheck can be passed in when already known to skip the check test
         row, col = square
         moves = []
+        quiets = mode & GEN_QUIETS
+        captures = mode & GEN_CAPTURES
 
         for rowOffset, colOffset in KING_OFFSETS:
             r = row + rowOffset
             c = col + colOffset
             if self.inBounds(r, c):
                 target = self.board.getPiece((r, c))
-                if target is None or target.colour != piece.colour:
-                    move = Move(square, (r, c), piece, target, piece.moved)
+                if (quiets if target is None else captures and target.colour != piece.colour):
+                    move = Move(square, (r, c), piece, target)
                     moves.append(move)
 
-        if piece.moved == False and not self.isKingInCheck(piece.colour):
+        # Castling is a quiet move
+        if not quiets:
+            return moves
+
+        if inCheck is None:
+            inCheck = self.isKingInCheck(piece.colour)
+
+        if piece.moved == False and not inCheck:
             if piece.colour == 'w':
 
                 cornerPiece = self.board.getPiece((7, 7))
                 if cornerPiece and cornerPiece.type == 'R' and cornerPiece.colour == piece.colour and cornerPiece.moved == False:
                     if self.board.getPiece((7, 5)) is None and self.board.getPiece((7, 6)) is None:
                         if not self.squareAttacked((7, 5), 'b') and not self.squareAttacked((7, 6), 'b'):
-                            move = Move(square, (7, 6), piece, None, piece.moved, isCastle=True, kingSide=True)
+                            move = Move(square, (7, 6), piece, isCastle=True, kingSide=True)
                             moves.append(move)
 
                 cornerPiece = self.board.getPiece((7, 0))
                 if cornerPiece and cornerPiece.type == 'R' and cornerPiece.colour == piece.colour and cornerPiece.moved == False:
                     if self.board.getPiece((7, 3)) is None and self.board.getPiece((7, 2)) is None and self.board.getPiece((7, 1)) is None:
                         if not self.squareAttacked((7, 3), 'b') and not self.squareAttacked((7, 2), 'b'):
-                            move = Move(square, (7, 2), piece, None, piece.moved, isCastle=True)
+                            move = Move(square, (7, 2), piece, isCastle=True)
                             moves.append(move)
             else:
                 
@@ -168,14 +454,14 @@ class MoveGen:
                 if cornerPiece and cornerPiece.type == 'R' and cornerPiece.colour == piece.colour and cornerPiece.moved == False:
                     if self.board.getPiece((0, 5)) is None and self.board.getPiece((0, 6)) is None:
                         if not self.squareAttacked((0, 5), 'w') and not self.squareAttacked((0, 6), 'w'):
-                            move = Move(square, (0, 6), piece, None, piece.moved, isCastle=True, kingSide=True)
+                            move = Move(square, (0, 6), piece, isCastle=True, kingSide=True)
                             moves.append(move)
 
                 cornerPiece = self.board.getPiece((0, 0))
                 if cornerPiece and cornerPiece.type == 'R' and cornerPiece.colour == piece.colour and cornerPiece.moved == False:
                     if self.board.getPiece((0, 3)) is None and self.board.getPiece((0, 2)) is None and self.board.getPiece((0, 1)) is None:
                         if not self.squareAttacked((0, 3), 'w') and not self.squareAttacked((0, 2), 'w'):
-                            move = Move(square, (0, 2), piece, None, piece.moved, isCastle=True)
+                            move = Move(square, (0, 2), piece, isCastle=True)
                             moves.append(move)
 
         return moves
@@ -194,12 +480,8 @@ class MoveGen:
             
 
     def findKing(self, colour):
-    # Iterates through the board to find the player's king
-        for row in range(DIMENSION):
-            for col in range(DIMENSION):
-                piece = self.board.getPiece((row, col))
-                if piece and piece.type == 'K' and piece.colour == colour:
-                    return (row, col)
+        # Returns the player's king square (tracked by the board)
+        return self.board.kingSq[colour]
 
 
     def squareAttacked(self, square, enemy):
@@ -0,0 +1,245 @@
+from constants import DIMENSION, KNIGHT_OFFSETS, BISHOP_DIRECTIONS, ROOK_DIRECTIONS, KING_OFFSETS
+from move import PROMOTION_PIECES
+from movegen import GEN_CAPTURES, GEN_QUIETS
+
+# Piece values for capture ordering and static exchange evaluation (the king is never really captured)
+SEE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000}
+
+# Best moves picked by scanning before the rest of a stage is sorted (most cutoffs come from the first few moves)
+LAZY_PICKS = 3
+
+
+def moveIdentity(move):
+    # (start, end, promotion) identifies a move within a position
+    return move.startSq, move.endSq, move.promotionType
+
+
+def keyIdentity(key):
+    # (start, end, promotion) of a 15-bit move key (e.g. the transposition table move)
+    return divmod(key & 63, DIMENSION), divmod((key >> 6) & 63, DIMENSION), PROMOTION_PIECES[(key >> 12) & 7]
+
+
+def historyIndex(move):
+    # Index of a move's start and end squares in a history table
+    (startRow, startCol), (endRow, endCol) = move.startSq, move.endSq
+    return (startRow * DIMENSION + startCol) << 6 | (endRow * DIMENSION + endCol)
+
+
+def leastValuableAttacker(board, square, colour, removed):
+    # Finds the cheapest piece of a colour attacking a square, ignoring pieces on removed squares
+    # - Returns (square, type) or None
+    row, col = square
+
+    def pieceAt(r, c):
+        if (r, c) in removed:
+            return None
+        return board.getPiece((r, c))
+
+    # Pawns attack towards the enemy side
+    pawnRow = row + 1 if colour == 'w' else row - 1
+    if 0 <= pawnRow < DIMENSION:
+        for c in (col - 1, col + 1):
+            if 0 <= c < DIMENSION:
+                piece = pieceAt(pawnRow, c)
+                if piece and piece.colour == colour and piece.type == 'P':
+                    return (pawnRow, c), 'P'
+
+    for rowOffset, colOffset in KNIGHT_OFFSETS:
+        r = row + rowOffset
+        c = col + colOffset
+        if 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+            piece = pieceAt(r, c)
+            if piece and piece.colour == colour and piece.type == 'N':
+                return (r, c), 'N'
+
+    # Sliders: the first piece on each ray, cheapest wins
+    best = None
+    for directions, sliderType in ((BISHOP_DIRECTIONS, 'B'), (ROOK_DIRECTIONS, 'R')):
+        for rowDir, colDir in directions:
+            r = row + rowDir
+            c = col + colDir
+            while 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+                piece = pieceAt(r, c)
+                if piece:
+                    if piece.colour == colour and piece.type in (sliderType, 'Q'):
+                        if best is None or SEE_VALUES[piece.type] < SEE_VALUES[best[1]]:
+                            best = ((r, c), piece.type)
+                    break
+                r += rowDir
+                c += colDir
+    if best:
+        return best
+
+    for rowOffset, colOffset in KING_OFFSETS:
+        r = row + rowOffset
+        c = col + colOffset
+        if 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+            piece = pieceAt(r, c)
+            if piece and piece.colour == colour and piece.type == 'K':
+                return (r, c), 'K'
+
+    return None
+
+
+def see(board, move):
+    # Static exchange evaluation: material won or lost by the sequence of captures on the move's target square
+    # - Both sides always recapture with their cheapest piece and may stop when it stops paying
+    target = move.endSq
+    removed = {move.startSq}
+    if move.isEnPassant:
+        removed.add((move.startSq[0], move.endSq[1]))
+
+    gains = [SEE_VALUES[move.pieceCaptured.type] if move.pieceCaptured else 0]
+    onSquare = SEE_VALUES[move.piece.type]
+    if move.promotionType:
+        gains[0] += SEE_VALUES[move.promotionType] - SEE_VALUES['P']
+        onSquare = SEE_VALUES[move.promotionType]
+
+    side = 'b' if move.piece.colour == 'w' else 'w'
+    while True:
+        attacker = leastValuableAttacker(board, target, side, removed)
+        if attacker is None:
+            break
+        gains.append(onSquare - gains[-1])
+        # Neither side can gain by continuing
+        if max(-gains[-2], gains[-1]) < 0:
+            break
+        attackerSq, attackerType = attacker
+        removed.add(attackerSq)
+        onSquare = SEE_VALUES[attackerType]
+        side = 'b' if side == 'w' else 'w'
+
+    for index in range(len(gains) - 1, 0, -1):
+        gains[index - 1] = -max(-gains[index - 1], gains[index])
+    return gains[0]
+
+
+class MovePicker:
+    """
+    Hands out a node's moves best first, in stages
+    - Transposition table move
+    - Captures and promotions by MVV-LVA (most valuable victim, least valuable attacker), losing ones (SEE < 0) held back
+    - Killer moves (quiet moves that caused a cutoff at the same ply)
+    - Quiet moves by history score
+    - Losing captures last (or dropped, e.g. in quiescence)
+    - Stages are scored only when they are reached, so a cutoff in an early stage skips the later ones;
+      within a stage every move is scored up front, then the best few are picked by scanning and the rest
+      is only sorted if the search gets past them
+    - Without a move list, generation is staged too: the TT move is checked on its own, and captures
+      and quiet moves are generated separately, only when their stage is reached
+    """
+    def __init__(self, board, moves=None, ttMove=0, killers=(), history=None, skipBadCaptures=False):
+        # moves: legal Moves of the position (None generates them stage by stage)
+        # ttMove: move key from the transposition table (0 = none)
+        # killers: (start, end, promotion) identities, history: table indexed by historyIndex
+        self.board = board
+        self.moves = moves
+        self.ttMove = keyIdentity(ttMove) if ttMove else None
+        self.killers = killers
+        self.history = history
+        self.skipBadCaptures = skipBadCaptures
+
+
+    def __iter__(self):
+        ttMove = self.ttMove
+
+        if self.moves is None:
+            # The TT move can come from another position (hash collision), so it is only played if legal here
+            ttMove = self.legalTtMove()
+            if ttMove:
+                yield ttMove
+                ttMove = moveIdentity(ttMove)
+            captures = self.withoutMove(self.board.generateAllLegalMoves(self.board.turn, GEN_CAPTURES), ttMove)
+            quiets = None
+        else:
+            captures = []
+            quiets = []
+            for move in self.moves:
+                if ttMove and moveIdentity(move) == ttMove:
+                    yield move
+                    continue
+                if move.pieceCaptured or move.promotionType:
+                    captures.append(move)
+                else:
+                    quiets.append(move)
+
+        # Captures: MVV-LVA first, SEE only when the attacker is worth more than the victim
+        badCaptures = []
+        for move in self.pick(captures, self.captureScore):
+            if move.pieceCaptured and SEE_VALUES[move.piece.type] > SEE_VALUES[move.pieceCaptured.type] and see(self.board, move) < 0:
+                badCaptures.append(move)
+            else:
+                yield move
+
+        if quiets is None:
+            quiets = self.withoutMove(self.board.generateAllLegalMoves(self.board.turn, GEN_QUIETS), ttMove)
+
+        if self.killers:
+            killerMoves = []
+            for killer in self.killers:
+                for move in quiets:
+                    if moveIdentity(move) == killer:
+                        killerMoves.append(move)
+                        break
+            for move in killerMoves:
+                quiets.remove(move)
+                yield move
+
+        if self.history is not None:
+            history = self.history
+            yield from self.pick(quiets, lambda move: history[historyIndex(move)])
+        else:
+            yield from quiets
+
+        if not self.skipBadCaptures:
+            yield from badCaptures
+
+
+    def legalTtMove(self):
+        # The legal Move matching the TT move in this position, or None
+        if not self.ttMove:
+            return None
+        startSq = self.ttMove[0]
+        piece = self.board.getPiece(startSq)
+        if piece is None or piece.colour != self.board.turn:
+            return None
+        for move in self.board.generateLegalMoves(piece, startSq):
+            if moveIdentity(move) == self.ttMove:
+                return move
+        return None
+
+
+    @staticmethod
+    def withoutMove(moves, identity):
+        # Drops an already played move from a generated list
+        if identity:
+            moves = [move for move in moves if moveIdentity(move) != identity]
+        return moves
+
+
+    def pick(self, moves, score):
+        # Yields moves by descending score
+        # - Every move is scored first (the best one needs all the scores), then the best few are scanned
+        #   for and the rest is sorted only when those did not cause a cutoff
+        if not moves:
+            return
+        scored = [(score(move), index, move) for index, move in enumerate(moves)]
+
+        for _ in range(min(LAZY_PICKS, len(scored))):
+            best = max(scored)
+            scored.remove(best)
+            yield best[2]
+
+        scored.sort(reverse=True)
+        for _, _, move in scored:
+            yield move
+
+
+    @staticmethod
+    def captureScore(move):
+        score = 0
+        if move.pieceCaptured:
+            score += 10 * SEE_VALUES[move.pieceCaptured.type] - SEE_VALUES[move.piece.type] // 100
+        if move.promotionType:
+            score += SEE_VALUES[move.promotionType]
+        return score
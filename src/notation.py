@@ -0,0 +1,100 @@
+from move import squareName, parseSquare, FILES
+from constants import DIMENSION
+
+# Characters that annotate a SAN move without changing it
+SAN_ANNOTATIONS = '+#!?'
+
+
+def parseSan(board, san, legalMoves=None):
+    # Finds the legal Move written in standard algebraic notation (e.g. 'Nbd7', 'exd8=Q+', 'O-O')
+    # - legalMoves can be passed in if they were already generated for the position
+    # - Raises ValueError if the move is illegal or ambiguous
+    if legalMoves is None:
+        legalMoves = board.generateAllLegalMoves(board.turn)
+
+    text = san.rstrip(SAN_ANNOTATIONS)
+
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        kingSide = len(text) == 3
+        for move in legalMoves:
+            if move.isCastle and move.kingSide == kingSide:
+                return move
+        raise ValueError(f"Illegal move {san!r} in {board.toFen()}")
+
+    promotionType = None
+    if '=' in text:
+        text, promotionType = text.split('=', 1)
+    elif len(text) > 2 and text[-1] in 'QRBN' and text[-2] in '18':
+        text, promotionType = text[:-1], text[-1]
+
+    pieceType = 'P'
+    if text and text[0] in 'NBRQK':
+        pieceType = text[0]
+        text = text[1:]
+
+    text = text.replace('x', '').replace('-', '')
+    if len(text) < 2 or text[-2] not in FILES or text[-1] not in '12345678':
+        raise ValueError(f"Invalid SAN move {san!r}")
+    endSq = parseSquare(text[-2:])
+
+    # Optional disambiguation: file, rank or both
+    fromFile = fromRank = None
+    for char in text[:-2]:
+        if char in FILES:
+            fromFile = FILES.index(char)
+        elif char in '12345678':
+            fromRank = DIMENSION - int(char)
+        else:
+            raise ValueError(f"Invalid SAN move {san!r}")
+
+    matches = [
+        move for move in legalMoves
+        if move.endSq == endSq
+        and move.piece.type == pieceType
+        and move.promotionType == promotionType
+        and (fromFile is None or move.startSq[1] == fromFile)
+        and (fromRank is None or move.startSq[0] == fromRank)
+    ]
+
+    if not matches:
+        raise ValueError(f"Illegal move {san!r} in {board.toFen()}")
+    if len(matches) > 1:
+        raise ValueError(f"Ambiguous move {san!r} in {board.toFen()}")
+    return matches[0]
+
+
+def toSan(board, move, legalMoves=None):
+    # Writes a legal Move in standard algebraic notation, including check and mate suffixes
+    if legalMoves is None:
+        legalMoves = board.generateAllLegalMoves(board.turn)
+
+    if move.isCastle:
+        san = 'O-O' if move.kingSide else 'O-O-O'
+    else:
+        pieceType = move.piece.type
+        capture = 'x' if move.pieceCaptured else ''
+
+        if pieceType == 'P':
+            san = (FILES[move.startSq[1]] if capture else '') + capture + squareName(move.endSq)
+            if move.promotionType:
+                san += '=' + move.promotionType
+        else:
+            # Disambiguate between pieces of the same type that can reach the same square
+            others = [other.startSq for other in legalMoves if other.piece.type == pieceType and other.endSq == move.endSq and other.startSq != move.startSq]
+            prefix = ''
+            if others:
+                name = squareName(move.startSq)
+                if all(square[1] != move.startSq[1] for square in others):
+                    prefix = name[0]
+                elif all(square[0] != move.startSq[0] for square in others):
+                    prefix = name[1]
+                else:
+                    prefix = name
+            san = pieceType + prefix + capture + squareName(move.endSq)
+
+    board.makeMove(move)
+    if board.inCheck(board.turn):
+        san += '+' if board.generateAllLegalMoves(board.turn) else '#'
+    board.undoMove()
+
+    return san
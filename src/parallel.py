@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from search import Search
+from transposition import TranspositionTable, tableBytes
+
+
+def defaultWorkers():
+    # One worker per available core
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+
+def findMove(board, uci):
+    # Finds the legal move with the given long algebraic notation
+    for move in board.generateAllLegalMoves(board.turn):
+        if move.toUci() == uci:
+            return move
+    raise ValueError(f"Illegal move {uci!r} in {board.toFen()}")
+
+
+def perftWorker(task):
+    # Rebuilds the position from FEN, plays one root move and counts the subtree
+    boardType, fen, uci, depth = task
+    board = boardType.fromFen(fen)
+    board.makeMove(findMove(board, uci))
+    return uci, board.perft(depth)
+
+
+def parallelDivide(board, depth, workers=None):
+    # Splits the perft count by root move, counting each root move's subtree in a worker process
+    fen = board.toFen()
+    tasks = [(type(board), fen, move.toUci(), depth - 1) for move in board.generateAllLegalMoves(board.turn)]
+
+    with ProcessPoolExecutor(workers or defaultWorkers()) as pool:
+        return dict(pool.map(perftWorker, tasks))
+
+
+def parallelPerft(board, depth, workers=None):
+    # Counts the leaf nodes of the legal move tree using a pool of worker processes
+    if depth <= 1:
+        return board.perft(depth)
+    return sum(parallelDivide(board, depth, workers).values())
+
+
+def searchWorker(task):
+    # Lazy SMP helper: searches the whole position against the shared transposition table
+    # - Returns (completed depth, best move uci, score, nodes)
+    boardType, shmName, hashSizeMb, age, fen, hashHistory, depth, timeLimit, nodeLimit, startDepth = task
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        tt = TranspositionTable(hashSizeMb, shm.buf)
+        tt.age = age
+        search = Search(tt=tt)
+        board = boardType.fromFen(fen)
+        board.hashHistory = hashHistory
+        move = search.search(board, depth, timeLimit, nodeLimit, startDepth)
+        result = (search.completedDepth, move.toUci() if move else None, search.bestScore, search.nodes)
+        tt.words.release()
+        return result
+    finally:
+        shm.close()
+
+
+class ParallelSearch:
+    """
+    Lazy SMP search over worker processes
+    - Every worker searches the same root position, rebuilt from FEN plus the hashes needed for repetition checks
+    - Workers share one transposition table in shared memory, so they skip each other's work
+    - Half the workers start one ply deeper so they spread over different depths
+    - Plays the move from the worker that completed the deepest search
+    """
+    def __init__(self, workers=None, hashSizeMb=64):
+        self.workers = workers or defaultWorkers()
+        self.hashSizeMb = hashSizeMb
+        self.age = 0
+        self.nodes = 0
+        self.completedDepth = 0
+        self.bestScore = 0
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.shm = shared_memory.SharedMemory(create=True, size=tableBytes(hashSizeMb))
+
+
+    def search(self, board, depth=None, timeLimit=None, nodeLimit=None):
+        # Returns the best Move for the board's side to move (None if there are no legal moves)
+        # - nodeLimit is per worker
+        # Only positions since the last irreversible move can repeat, so only their hashes are sent
+        fen = board.toFen()
+        hashHistory = board.hashHistory[len(board.hashHistory) - min(board.halfMoveClock, len(board.hashHistory)):]
+        tasks = [(type(board), self.shm.name, self.hashSizeMb, self.age, fen, hashHistory, depth, timeLimit, nodeLimit, 1 + i % 2) for i in range(self.workers)]
+        self.age = (self.age + 1) % 64
+
+        results = list(self.pool.map(searchWorker, tasks))
+        self.nodes = sum(result[3] for result in results)
+
+        # Deepest completed search wins; ties go to the earliest worker
+        completedDepth, uci, score, _ = max(results, key=lambda result: result[0])
+        self.completedDepth = completedDepth
+        self.bestScore = score
+        return findMove(board, uci) if uci else None
+
+
+    def close(self):
+        # Shuts the workers down and frees the shared table
+        self.pool.shutdown()
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,46 @@
+def perft(board, depth):
+    # Counts the leaf nodes of the legal move tree from the board's side to move
+    if depth == 0:
+        return 1
+
+    moves = board.generateAllLegalMoves(board.turn)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        board.makeMove(move)
+        nodes += perft(board, depth - 1)
+        board.undoMove()
+
+    return nodes
+
+
+def perftPacked(board, depth):
+    # perft over a board's packed move path (generateLegalPackedMoves/makePacked/undoPacked)
+    if depth == 0:
+        return 1
+
+    moves = board.generateLegalPackedMoves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for packed in moves:
+        board.makePacked(packed)
+        nodes += perftPacked(board, depth - 1)
+        board.undoPacked()
+
+    return nodes
+
+
+def divide(board, depth):
+    # Splits the perft count by root move (e.g. {'e2e4': 600}) to locate move generator bugs
+    counts = {}
+
+    for move in board.generateAllLegalMoves(board.turn):
+        board.makeMove(move)
+        counts[move.toUci()] = perft(board, depth - 1)
+        board.undoMove()
+
+    return counts
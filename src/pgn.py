@@ -0,0 +1,58 @@
+import re
+
+# Movetext tokens: comments, variations, NAGs, move numbers and results are skipped, the rest are SAN moves
+MOVETEXT_TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s{}();]+")
+HEADER_LINE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def parseMovetext(text):
+    # Returns the SAN moves of the main line of a game's movetext (variations are dropped)
+    moves = []
+    variationDepth = 0
+
+    for token in MOVETEXT_TOKEN.findall(text):
+        if token == '(':
+            variationDepth += 1
+        elif token == ')':
+            variationDepth -= 1
+        elif variationDepth or token[0] in '{;$' or token in RESULTS or token[0].isdigit() and token[-1] == '.':
+            continue
+        else:
+            moves.append(token)
+
+    return moves
+
+
+def readGames(lines):
+    # Streams (headers, sanMoves) for each game in PGN text, one game in memory at a time
+    # - lines is any iterable of lines, e.g. an open file
+    headers = {}
+    movetext = []
+
+    for line in lines:
+        stripped = line.strip()
+
+        if stripped.startswith('['):
+            # A header after movetext starts the next game
+            if movetext:
+                yield headers, parseMovetext(''.join(movetext))
+                headers = {}
+                movetext = []
+            match = HEADER_LINE.match(stripped)
+            if match:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+        elif stripped.startswith('%'):
+            # Escape line
+            continue
+        elif stripped:
+            movetext.append(line if line.endswith('\n') else line + '\n')
+
+    if headers or movetext:
+        yield headers, parseMovetext(''.join(movetext))
+
+
+def readPgn(path):
+    # Streams the games of a PGN file
+    with open(path, encoding='utf-8', errors='replace') as file:
+        yield from readGames(file)
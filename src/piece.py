@@ -3,6 +3,8 @@ class Piece:
     Chess Piece
     - Stores a piece's colour, type and moved flag
     """
+    __slots__ = ('colour', 'type', 'moved')
+
     def __init__(self, colour, type):
         self.colour = colour
         self.type = type
@@ -0,0 +1,326 @@
+import time
+
+from move import moveKey
+from moveorder import MovePicker, moveIdentity, historyIndex
+from movegen import GEN_CAPTURES
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+MATE_SCORE = 100000
+INFINITY = 1000000
+MAX_DEPTH = 64
+
+# Tablebase wins score below every mate score, so they never pass for a mate in the transposition table
+TB_WIN_SCORE = MATE_SCORE - 2 * MAX_DEPTH
+
+# Nodes between clock checks
+CHECK_INTERVAL = 1024
+
+# Killer moves kept per ply
+KILLER_SLOTS = 2
+
+
+def scoreToTable(score, ply):
+    # Mate scores are stored relative to the node so they stay valid at any ply
+    if score >= MATE_SCORE - MAX_DEPTH:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_DEPTH:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    if score >= MATE_SCORE - MAX_DEPTH:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_DEPTH:
+        return score + ply
+    return score
+
+
+class SearchStopped(Exception):
+    # Raised inside the tree when the time or node budget runs out
+    pass
+
+
+class Search:
+    """
+    Alpha-beta search engine
+    - Negamax with alpha-beta pruning and a capture-only quiescence search
+    - Searches the Move objects of the board's legal move generator (packed ints are only used for the
+      transposition table's move keys)
+    - Transposition table cutoffs, and move ordering by MovePicker (captures, killers, history)
+    - Counts beta cutoffs and how many came from the first move tried, to measure ordering
+    - Scores repetitions, the fifty move rule and insufficient material as draws
+    - Scores positions found in the endgame tablebases (if given) without searching them, and plays
+      tablebase moves at the root
+    - Iterative deepening under a depth, wall-clock or node budget
+    - Returns the best move of the deepest search that finished (or partly finished)
+    - Reports the principal variation after each depth through an info callback
+    """
+    def __init__(self, onInfo=None, hashSizeMb=16, tt=None, tablebase=None):
+        # onInfo(depth, score, nodes, elapsed, pv) is called after each completed depth
+        # hashSizeMb caps the transposition table memory, or tt passes in a (shared) table
+        # tablebase: a Tablebase to probe (None searches every position)
+        self.onInfo = onInfo
+        self.tt = tt if tt is not None else TranspositionTable(hashSizeMb)
+        self.tablebase = tablebase
+        self.tbHits = 0
+        self.stopped = False
+        self.nodes = 0
+        self.bestMove = None
+        self.bestScore = 0
+        self.pv = []
+        self.completedDepth = 0
+        self.killers = [[] for _ in range(MAX_DEPTH + 1)]
+        self.history = {'w': [0] * 4096, 'b': [0] * 4096}
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+
+
+    def stop(self):
+        # Asks a running search to return as soon as possible (safe from another thread)
+        # - Stays set until clearStop, so a stop that arrives before the search starts is not lost
+        self.stopped = True
+
+
+    def clearStop(self):
+        # Lets searches run again after stop (call before handing a search to another thread)
+        self.stopped = False
+
+
+    def search(self, board, depth=None, timeLimit=None, nodeLimit=None, startDepth=1):
+        # Searches the board's side to move and returns the best move (None if there are no legal moves)
+        # - depth: maximum iteration depth, timeLimit: seconds, nodeLimit: nodes
+        # - startDepth: first iteration depth (parallel helpers start deeper to diverge)
+        self.board = board
+        self.nodes = 0
+        self.nodeLimit = nodeLimit
+        self.startTime = time.perf_counter()
+        self.deadline = None if timeLimit is None else self.startTime + timeLimit
+        self.bestMove = None
+        self.bestScore = 0
+        self.pv = []
+        self.completedDepth = 0
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.tbHits = 0
+        self.tt.newSearch()
+        self.newSearchOrdering()
+
+        rootMoves = board.generateAllLegalMoves(board.turn)
+        if not rootMoves:
+            return None
+
+        # Always have a move to play, even if the first iteration is cut short
+        self.bestMove = rootMoves[0]
+
+        # A tablebase position needs no search: play the move that keeps the result
+        if self.tablebase is not None:
+            probe = self.tablebase.bestMove(board)
+            if probe and probe[0]:
+                self.tbHits += 1
+                self.bestMove, result = probe
+                self.bestScore = result * TB_WIN_SCORE
+                self.pv = [self.bestMove]
+                return self.bestMove
+
+        for iterationDepth in range(min(startDepth, depth or MAX_DEPTH), (depth or MAX_DEPTH) + 1):
+            self.orderRootMoves(rootMoves)
+
+            try:
+                score, pv = self.searchRoot(rootMoves, iterationDepth)
+            except SearchStopped:
+                break
+
+            self.bestMove = pv[0]
+            self.bestScore = score
+            self.pv = pv
+            self.completedDepth = iterationDepth
+
+            if self.onInfo:
+                self.onInfo(iterationDepth, score, self.nodes, time.perf_counter() - self.startTime, pv)
+
+            # A forced mate will not change with more depth
+            if abs(score) >= MATE_SCORE - MAX_DEPTH or len(rootMoves) == 1:
+                break
+
+        return self.bestMove
+
+
+    def newSearchOrdering(self):
+        # Clears the killers and halves the history scores so older searches count for less
+        self.killers = [[] for _ in range(MAX_DEPTH + 1)]
+        for table in self.history.values():
+            for index, value in enumerate(table):
+                if value:
+                    table[index] = value >> 1
+
+
+    def stats(self):
+        # Move ordering statistics of the last search
+        return {
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'firstMoveCutoffs': self.firstMoveCutoffs,
+            'firstMoveCutoffRate': self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'tbHits': self.tbHits,
+        }
+
+
+    def orderRootMoves(self, rootMoves):
+        # Puts the previous iteration's best move first
+        if self.bestMove in rootMoves:
+            rootMoves.remove(self.bestMove)
+            rootMoves.insert(0, self.bestMove)
+
+
+    def searchRoot(self, rootMoves, depth):
+        # Searches every root move and returns (score, pv)
+        # - If stopped part way, keeps the best move found so far once the first move is searched
+        alpha = -INFINITY
+        bestPv = None
+
+        for move in rootMoves:
+            self.board.makeMove(move)
+            try:
+                score, childPv = self.negamax(depth - 1, -INFINITY, -alpha, 1)
+                score = -score
+            except SearchStopped:
+                self.board.undoMove()
+                if bestPv is not None:
+                    self.bestMove = bestPv[0]
+                    self.bestScore = alpha
+                    self.pv = bestPv
+                raise
+            self.board.undoMove()
+
+            if score > alpha:
+                alpha = score
+                bestPv = [move] + childPv
+
+        return alpha, bestPv
+
+
+    def negamax(self, depth, alpha, beta, ply):
+        # Returns (score, pv) for the side to move
+        self.countNode()
+        board = self.board
+
+        # Draws: repetition since the last irreversible move counts as a draw inside the tree
+        if board.insufficientMaterial() or board.isRepetition() or board.isFiftyMoveDraw():
+            return 0, []
+
+        # Tablebase positions are scored exactly (wins closer to the root score higher)
+        if self.tablebase is not None:
+            result = self.tablebase.probeWdl(board)
+            if result is not None:
+                self.tbHits += 1
+                return result * (TB_WIN_SCORE - ply), []
+
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply), []
+
+        ttMove = 0
+        entry = self.tt.probe(board.hash)
+        if entry:
+            ttMove, ttScore, ttDepth, ttBound = entry
+            if ttDepth >= depth:
+                ttScore = scoreFromTable(ttScore, ply)
+                if ttBound == EXACT:
+                    return ttScore, []
+                if ttBound == LOWER and ttScore >= beta:
+                    return beta, []
+                if ttBound == UPPER and ttScore <= alpha:
+                    return alpha, []
+
+        # Moves are generated stage by stage, so a cutoff on the TT move or a capture skips generating quiet moves
+        picker = MovePicker(board, None, ttMove, self.killers[ply], self.history[board.turn])
+        originalAlpha = alpha
+        bestPv = []
+        index = -1
+
+        for index, move in enumerate(picker):
+            board.makeMove(move)
+            try:
+                score, childPv = self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.undoMove()
+            score = -score
+
+            if score >= beta:
+                self.cutoffs += 1
+                if index == 0:
+                    self.firstMoveCutoffs += 1
+                if not move.pieceCaptured and not move.promotionType:
+                    self.storeQuietCutoff(move, depth, ply)
+                self.tt.store(board.hash, moveKey(move), scoreToTable(beta, ply), depth, LOWER)
+                return beta, []
+            if score > alpha:
+                alpha = score
+                bestPv = [move] + childPv
+
+        # No legal moves: checkmate or stalemate
+        if index < 0:
+            if board.inCheck(board.turn):
+                return -MATE_SCORE + ply, []
+            return 0, []
+
+        if alpha > originalAlpha:
+            self.tt.store(board.hash, moveKey(bestPv[0]), scoreToTable(alpha, ply), depth, EXACT)
+        else:
+            self.tt.store(board.hash, 0, scoreToTable(alpha, ply), depth, UPPER)
+
+        return alpha, bestPv
+
+
+    def quiescence(self, alpha, beta, ply):
+        # Searches captures and promotions until the position is quiet
+        self.countNode()
+        board = self.board
+
+        standPat = board.evaluate()
+        if standPat >= beta:
+            return beta
+        if standPat > alpha:
+            alpha = standPat
+
+        # Only captures and promotions are generated; those that lose material (SEE < 0) are not searched
+        moves = board.generateAllLegalMoves(board.turn, GEN_CAPTURES)
+
+        for move in MovePicker(board, moves, skipBadCaptures=True):
+            board.makeMove(move)
+            try:
+                score = -self.quiescence(-beta, -alpha, ply + 1)
+            finally:
+                board.undoMove()
+
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+
+        return alpha
+
+
+    def storeQuietCutoff(self, move, depth, ply):
+        # Remembers a quiet move that caused a cutoff as a killer for this ply and in the history table
+        killers = self.killers[ply]
+        identity = moveIdentity(move)
+        if identity not in killers:
+            killers.insert(0, identity)
+            del killers[KILLER_SLOTS:]
+        self.history[move.piece.colour][historyIndex(move)] += depth * depth
+
+
+    def countNode(self):
+        # Counts a node and stops the search when the budget is spent
+        self.nodes += 1
+
+        if self.stopped:
+            raise SearchStopped()
+
+        # Budgets only end this search, so they leave the stop flag alone
+        if self.nodeLimit is not None and self.nodes >= self.nodeLimit:
+            raise SearchStopped()
+
+        if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline:
+            raise SearchStopped()
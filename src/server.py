@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import count
+
+from bitboard import BitBoard
+from move import packedToUci, parseSquare, PROMOTION_CODES, KEY_MASK
+from worker import gameStatus
+from constants import DIMENSION, START_FEN
+
+DEFAULT_PORT = 8765
+
+# Positions whose legal moves are kept, shared by every game (openings repeat across games)
+# - Each is an array of packed moves: about 200 bytes a position
+MOVE_CACHE_POSITIONS = 65536
+
+
+def uciKey(uci):
+    # 15-bit move key of a move in long algebraic notation, or None if it is malformed
+    try:
+        (startRow, startCol), (endRow, endCol) = parseSquare(uci[0:2]), parseSquare(uci[2:4])
+        promotion = PROMOTION_CODES[uci[4:].upper() or None]
+    except (ValueError, KeyError, IndexError):
+        return None
+    if len(uci) > 5 or not all(0 <= index < DIMENSION for index in (startRow, startCol, endRow, endCol)):
+        return None
+    return (startRow * DIMENSION + startCol) | (endRow * DIMENSION + endCol) << 6 | promotion << 12
+
+
+def checkPlayable(board):
+    # Raises ValueError for a position that cannot come up in a game (move generation assumes it cannot)
+    # - Each side has one king, no pawn stands on the first or last rank, the side not to move is not in check
+    kings = {'w': 0, 'b': 0}
+    for row in range(DIMENSION):
+        for col in range(DIMENSION):
+            piece = board.getPiece((row, col))
+            if piece is None:
+                continue
+            if piece.type == 'K':
+                kings[piece.colour] += 1
+            elif piece.type == 'P' and row in (0, DIMENSION - 1):
+                raise ValueError("Invalid position: pawn on the first or last rank")
+
+    if kings != {'w': 1, 'b': 1}:
+        raise ValueError("Invalid position: each side needs exactly one king")
+    if board.inCheck('b' if board.turn == 'w' else 'w'):
+        raise ValueError("Invalid position: the side not to move is in check")
+
+
+class Session:
+    """
+    One hosted game
+    - Kept small: a BitBoard (flat mailbox and bitboards) played with packed ints, so no Move objects
+      or undo records pile up, and only the repetition history since the last capture or pawn move is kept
+    """
+    __slots__ = ('board',)
+
+    def __init__(self, fen=START_FEN):
+        # Raises ValueError for a malformed FEN or an unplayable position
+        self.board = BitBoard.fromFen(fen)
+        checkPlayable(self.board)
+
+
+    def play(self, packed):
+        # Plays a packed legal move (sessions never take moves back)
+        board = self.board
+        board.makePacked(packed)
+        board.undoStack.clear()
+        # No earlier position can repeat after an irreversible move
+        if board.halfMoveClock == 0:
+            board.hashHistory.clear()
+
+
+class GameServer:
+    """
+    Hosts many games at once behind an asyncio service
+    - Requests and replies are JSON objects, one per line: new, moves, move, state, close, stats
+    - Moves are validated against a shared LRU cache of legal move lists keyed by position hash,
+      so each position's moves are generated once however many games reach it
+    - All games live on one event loop; every request is short, so none blocks the others for long
+    """
+    def __init__(self, cachePositions=MOVE_CACHE_POSITIONS):
+        self.sessions = {}
+        self.ids = count(1)
+        self.cachePositions = cachePositions
+        self.moveCache = OrderedDict()
+        self.cacheHits = 0
+        self.cacheMisses = 0
+        self.movesPlayed = 0
+
+
+    def legalMoves(self, board):
+        # Packed legal moves of the position, through the cache
+        key = board.hash
+        moves = self.moveCache.get(key)
+        if moves is None:
+            self.cacheMisses += 1
+            moves = array('I', board.generateLegalPackedMoves())
+            self.moveCache[key] = moves
+            if len(self.moveCache) > self.cachePositions:
+                self.moveCache.popitem(last=False)
+        else:
+            self.cacheHits += 1
+            self.moveCache.move_to_end(key)
+        return moves
+
+
+    def state(self, gameId, session):
+        board = session.board
+        return {'game': gameId, 'fen': board.toFen(), 'turn': board.turn, 'status': gameStatus(board, self.legalMoves(board))}
+
+
+    def handleRequest(self, request):
+        # Handles one request dict and returns the reply dict (errors are replies with an 'error' field)
+        op = request.get('op')
+
+        if op == 'new':
+            fen = request.get('fen', START_FEN)
+            if not isinstance(fen, str):
+                return {'error': "FEN must be a string"}
+            try:
+                session = Session(fen)
+            except ValueError as error:
+                return {'error': str(error)}
+            gameId = next(self.ids)
+            self.sessions[gameId] = session
+            return self.state(gameId, session)
+
+        if op == 'stats':
+            return self.stats()
+
+        if op not in ('moves', 'move', 'state', 'close'):
+            return {'error': f"Unknown op {op!r}"}
+
+        gameId = request.get('game')
+        if type(gameId) not in (int, str):
+            return {'error': f"Unknown game {gameId!r}"}
+        session = self.sessions.get(gameId)
+        if session is None:
+            return {'error': f"Unknown game {gameId!r}"}
+
+        if op == 'moves':
+            return {'game': gameId, 'moves': [packedToUci(packed) for packed in self.legalMoves(session.board)]}
+
+        if op == 'move':
+            board = session.board
+            legalMoves = self.legalMoves(board)
+            if gameStatus(board, legalMoves):
+                return {'error': "Game is over", 'game': gameId}
+            key = uciKey(request.get('move')) if isinstance(request.get('move'), str) else None
+            packed = next((packed for packed in legalMoves if packed & KEY_MASK == key), None)
+            if packed is None:
+                return {'error': f"Illegal move {request.get('move')!r}", 'game': gameId}
+            session.play(packed)
+            self.movesPlayed += 1
+            return self.state(gameId, session)
+
+        if op == 'state':
+            return self.state(gameId, session)
+
+        del self.sessions[gameId]
+        return {'game': gameId, 'closed': True}
+
+
+    def handleLine(self, line):
+        # Decodes a request line and encodes the reply
+        # - A request that still raises is answered with an error, so it cannot end the connection
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return json.dumps({'error': "Invalid JSON"})
+        if not isinstance(request, dict):
+            return json.dumps({'error': "Request must be an object"})
+        try:
+            reply = self.handleRequest(request)
+        except Exception as error:
+            reply = {'error': f"Bad request: {error}"}
+        return json.dumps(reply)
+
+
+    def stats(self):
+        lookups = self.cacheHits + self.cacheMisses
+        return {
+            'games': len(self.sessions),
+            'movesPlayed': self.movesPlayed,
+            'cachedPositions': len(self.moveCache),
+            'cacheHitRate': self.cacheHits / lookups if lookups else 0.0,
+        }
+
+
+    async def handleConnection(self, reader, writer):
+        # Serves one client connection until it closes
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as error:
+                    line = error.partial
+                except asyncio.LimitOverrunError:
+                    await self.skipLine(reader)
+                    writer.write(json.dumps({'error': "Request too long"}).encode() + b'\n')
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                writer.write(self.handleLine(line).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    @staticmethod
+    async def skipLine(reader):
+        # Discards the rest of a line longer than the stream limit, up to and including its newline
+        while True:
+            try:
+                await reader.readuntil(b'\n')
+                return
+            except asyncio.IncompleteReadError:
+                return
+            except asyncio.LimitOverrunError as error:
+                await reader.readexactly(error.consumed)
+
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handleConnection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class LocalClient:
+    """
+    In-process stand-in for a network client
+    - Sends the same JSON lines as a socket client, straight to the server's line handler
+    - Yields to the event loop on every request, so many clients interleave like real connections
+    """
+    def __init__(self, server):
+        self.server = server
+
+
+    async def request(self, op, **fields):
+        await asyncio.sleep(0)
+        return json.loads(self.server.handleLine(json.dumps({'op': op, **fields})))
+
+
+class Client:
+    """
+    Socket client for a running GameServer (same interface as LocalClient)
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=DEFAULT_PORT):
+        return cls(*await asyncio.open_connection(host, port))
+
+
+    async def request(self, op, **fields):
+        self.writer.write(json.dumps({'op': op, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-game chess server (JSON lines over TCP)")
+    parser.add_argument("--host", default='127.0.0.1', help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    args = parser.parse_args()
+
+    print(f"Serving on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(GameServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
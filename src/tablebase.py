@@ -0,0 +1,549 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict
+
+from constants import DIMENSION
+
+# Results from the side to move's point of view
+LOSS, DRAW, WIN = -1, 0, 1
+
+# Stored WDL bytes (side to move's point of view); ILLEGAL marks unreachable indices
+WDL_LOSS, WDL_DRAW, WDL_WIN, WDL_ILLEGAL = 0, 1, 2, 3
+WDL_RESULTS = {WDL_LOSS: LOSS, WDL_DRAW: DRAW, WDL_WIN: WIN}
+
+# Stored DTZ byte for draws and illegal indices
+DTZ_NONE = 255
+
+# Table file layout
+# - header: magic, table name, entry count, entries per block, block count
+# - block offsets: block count + 1 little-endian uint64, relative to the end of the offsets
+# - blocks: zlib-compressed runs of one byte per entry
+MAGIC = b'CTB1'
+HEADER = struct.Struct('<4s8sIII')
+OFFSET = struct.Struct('<Q')
+BLOCK_ENTRIES = 8192
+
+# Tables the generator can build, in build order (KPK looks up KQK and KRK after promotion)
+# - Each is white king + one white piece against the black king
+TABLES = ('KQK', 'KRK', 'KPK')
+
+# Index of a position: ((sideToMove * 64 + strongKing) * 64 + weakKing) * 64 + piece, side to move 0 = strong side
+ENTRY_COUNT = 2 * 64 * 64 * 64
+
+SQUARE_COUNT = DIMENSION * DIMENSION
+ROWS = [sq // DIMENSION for sq in range(SQUARE_COUNT)]
+COLS = [sq % DIMENSION for sq in range(SQUARE_COUNT)]
+
+
+def positionIndex(stm, strongKing, weakKing, piece):
+    return ((stm * 64 + strongKing) * 64 + weakKing) * 64 + piece
+
+
+def buildKingMoves():
+    moves = []
+    for sq in range(SQUARE_COUNT):
+        targets = []
+        for rowOffset in (-1, 0, 1):
+            for colOffset in (-1, 0, 1):
+                r = ROWS[sq] + rowOffset
+                c = COLS[sq] + colOffset
+                if (rowOffset or colOffset) and 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+                    targets.append(r * DIMENSION + c)
+        moves.append(targets)
+    return moves
+
+
+def buildRays(directions):
+    # rays[sq] = list of rays, each the squares in order from sq outwards
+    rays = []
+    for sq in range(SQUARE_COUNT):
+        squareRays = []
+        for rowDir, colDir in directions:
+            ray = []
+            r = ROWS[sq] + rowDir
+            c = COLS[sq] + colDir
+            while 0 <= r < DIMENSION and 0 <= c < DIMENSION:
+                ray.append(r * DIMENSION + c)
+                r += rowDir
+                c += colDir
+            if ray:
+                squareRays.append(ray)
+        rays.append(squareRays)
+    return rays
+
+
+KING_MOVES = buildKingMoves()
+KING_MASKS = [sum(1 << target for target in targets) for targets in KING_MOVES]
+ROOK_RAYS = buildRays(((-1, 0), (1, 0), (0, -1), (0, 1)))
+BISHOP_RAYS = buildRays(((-1, -1), (-1, 1), (1, -1), (1, 1)))
+PIECE_RAYS = {'Q': [a + b for a, b in zip(ROOK_RAYS, BISHOP_RAYS)], 'R': ROOK_RAYS}
+
+
+def adjacent(a, b):
+    return KING_MASKS[a] >> b & 1
+
+
+def pieceAttacks(pieceType, piece, target, blocker):
+    # Checks if the strong side's piece attacks a square, with one other piece (the strong king) able to block
+    if pieceType == 'P':
+        return ROWS[target] == ROWS[piece] - 1 and abs(COLS[target] - COLS[piece]) == 1
+    for ray in PIECE_RAYS[pieceType][piece]:
+        for sq in ray:
+            if sq == target:
+                return True
+            if sq == blocker:
+                break
+    return False
+
+
+def isLegal(pieceType, stm, strongKing, weakKing, piece):
+    # Distinct squares, kings apart, pawns off the back rows and the side not to move not in check
+    if strongKing == weakKing or piece == strongKing or piece == weakKing or adjacent(strongKing, weakKing):
+        return False
+    if pieceType == 'P' and ROWS[piece] in (0, DIMENSION - 1):
+        return False
+    return stm == 1 or not pieceAttacks(pieceType, piece, weakKing, strongKing)
+
+
+def weakMoves(pieceType, strongKing, weakKing, piece):
+    # Legal weak king moves: (target, capturesPiece)
+    moves = []
+    for target in KING_MOVES[weakKing]:
+        if adjacent(target, strongKing):
+            continue
+        if target == piece:
+            moves.append((target, True))
+        elif not pieceAttacks(pieceType, piece, target, strongKing):
+            moves.append((target, False))
+    return moves
+
+
+def strongPieceMoves(pieceType, strongKing, weakKing, piece):
+    # Target squares of the strong side's piece (pawn pushes stop short of promotion)
+    # - Returns (targets, promotionSquares)
+    if pieceType == 'P':
+        targets = []
+        promotions = []
+        push = piece - DIMENSION
+        if push not in (strongKing, weakKing):
+            if ROWS[push] == 0:
+                promotions.append(push)
+            else:
+                targets.append(push)
+                double = push - DIMENSION
+                if ROWS[piece] == DIMENSION - 2 and double not in (strongKing, weakKing):
+                    targets.append(double)
+        return targets, promotions
+
+    targets = []
+    for ray in PIECE_RAYS[pieceType][piece]:
+        for sq in ray:
+            if sq == strongKing or sq == weakKing:
+                break
+            targets.append(sq)
+    return targets, []
+
+
+def strongPieceUnmoves(pieceType, strongKing, weakKing, piece):
+    # Squares the strong side's piece could have come from (reverse pawn pushes, reverse slides)
+    if pieceType == 'P':
+        origins = []
+        back = piece + DIMENSION
+        if ROWS[back] < DIMENSION - 1 and back not in (strongKing, weakKing):
+            origins.append(back)
+            double = back + DIMENSION
+            if ROWS[piece] == DIMENSION - 4 and double not in (strongKing, weakKing):
+                origins.append(double)
+        return origins
+    return strongPieceMoves(pieceType, strongKing, weakKing, piece)[0]
+
+
+def generateTable(pieceType, lookup=None):
+    # Retrograde analysis of king + piece vs king
+    # - lookup(promotionType, strongKing, weakKing, square) gives the WDL byte of a position after promotion
+    #   (weak side to move), needed for pawn tables
+    # - Returns (wdl, dtz) bytearrays of ENTRY_COUNT entries
+    wdl = bytearray([WDL_ILLEGAL]) * ENTRY_COUNT
+    remaining = [0] * ENTRY_COUNT
+    lost = []
+    winSeeds = []
+    zeroingWins = set()
+
+    # Weak side to move: count the moves that must all lose, find mates and stalemates
+    for strongKing in range(SQUARE_COUNT):
+        for weakKing in range(SQUARE_COUNT):
+            for piece in range(SQUARE_COUNT):
+                if not isLegal(pieceType, 1, strongKing, weakKing, piece):
+                    continue
+                index = positionIndex(1, strongKing, weakKing, piece)
+                wdl[index] = WDL_DRAW
+                moves = weakMoves(pieceType, strongKing, weakKing, piece)
+                if any(capture for _, capture in moves):
+                    remaining[index] = -1       # Can always take the piece: never lost
+                elif moves:
+                    remaining[index] = len(moves)
+                elif pieceAttacks(pieceType, piece, weakKing, strongKing):
+                    lost.append(index)          # Checkmate
+                    wdl[index] = WDL_LOSS
+
+    # Strong side to move: promotions that win straight away
+    for strongKing in range(SQUARE_COUNT):
+        for weakKing in range(SQUARE_COUNT):
+            for piece in range(SQUARE_COUNT):
+                if not isLegal(pieceType, 0, strongKing, weakKing, piece):
+                    continue
+                index = positionIndex(0, strongKing, weakKing, piece)
+                wdl[index] = WDL_DRAW
+                if pieceType != 'P':
+                    continue
+                _, promotions = strongPieceMoves(pieceType, strongKing, weakKing, piece)
+                for square in promotions:
+                    if any(lookup(promotionType, strongKing, weakKing, square) == WDL_LOSS for promotionType in ('Q', 'R')):
+                        winSeeds.append(index)
+                        zeroingWins.add(index)
+                        break
+
+    def propagate(lostLevel, winLevel, kingOnly, inWinSet, counts):
+        # Level by level retrograde from lost weak positions and won strong positions
+        # - kingOnly: strong side un-moves are king moves only (pawn moves are zeroing, counted as seeds)
+        # - Returns the distance in plies of every resolved position
+        distance = {}
+        level = 0
+        current = lostLevel
+        seeds = {1: winLevel}
+        for index in current:
+            distance[index] = 0
+
+        while current or any(seeds.values()):
+            nextLevel = []
+            for index in seeds.pop(level + 1, []):
+                if index not in distance:
+                    distance[index] = level + 1
+                    nextLevel.append(index)
+
+            for index in current:
+                stm, rest = divmod(index, 64 * 64 * 64)
+                strongKing, rest = divmod(rest, 64 * 64)
+                weakKing, piece = divmod(rest, 64)
+
+                if stm == 1:
+                    # Lost weak position: every strong move into it wins
+                    predecessors = [positionIndex(0, origin, weakKing, piece) for origin in KING_MOVES[strongKing]
+                                    if origin != piece and origin != weakKing and isLegal(pieceType, 0, origin, weakKing, piece)]
+                    if not kingOnly:
+                        predecessors += [positionIndex(0, strongKing, weakKing, origin) for origin in strongPieceUnmoves(pieceType, strongKing, weakKing, piece)
+                                         if isLegal(pieceType, 0, strongKing, weakKing, origin)]
+                    for predecessor in predecessors:
+                        if predecessor not in distance and inWinSet(predecessor):
+                            distance[predecessor] = level + 1
+                            nextLevel.append(predecessor)
+                else:
+                    # Won strong position: weak positions whose last escape this was become lost
+                    for origin in KING_MOVES[weakKing]:
+                        if origin == strongKing or origin == piece or adjacent(origin, strongKing):
+                            continue
+                        predecessor = positionIndex(1, strongKing, origin, piece)
+                        if counts[predecessor] > 0:
+                            counts[predecessor] -= 1
+                            if counts[predecessor] == 0:
+                                distance[predecessor] = level + 1
+                                nextLevel.append(predecessor)
+
+            current = nextLevel
+            level += 1
+
+        return distance
+
+    # WDL: every strong move counts
+    distance = propagate(lost, winSeeds, False, lambda index: wdl[index] != WDL_ILLEGAL, list(remaining))
+    for index in distance:
+        wdl[index] = WDL_WIN if index < ENTRY_COUNT // 2 else WDL_LOSS
+
+    # DTZ: plies to mate or to a zeroing (pawn) move, so pawn pushes that keep the win restart the count
+    if pieceType == 'P':
+        for index in range(ENTRY_COUNT // 2):
+            if wdl[index] != WDL_WIN or index in zeroingWins:
+                continue
+            strongKing, rest = divmod(index, 64 * 64)
+            weakKing, piece = divmod(rest, 64)
+            targets, _ = strongPieceMoves(pieceType, strongKing, weakKing, piece)
+            if any(wdl[positionIndex(1, strongKing, weakKing, target)] == WDL_LOSS for target in targets):
+                zeroingWins.add(index)
+
+        counts = [0] * ENTRY_COUNT
+        for index in range(ENTRY_COUNT // 2, ENTRY_COUNT):
+            if wdl[index] == WDL_LOSS:
+                counts[index] = remaining[index]
+        distance = propagate(list(lost), list(zeroingWins), True, lambda index: wdl[index] == WDL_WIN, counts)
+
+    dtz = bytearray([DTZ_NONE]) * ENTRY_COUNT
+    for index, plies in distance.items():
+        dtz[index] = min(plies, DTZ_NONE - 1)
+
+    return wdl, dtz
+
+
+def writeTable(path, name, data):
+    # Writes one byte per entry as zlib-compressed blocks behind a block offset table
+    blocks = [zlib.compress(bytes(data[start:start + BLOCK_ENTRIES]), 9) for start in range(0, len(data), BLOCK_ENTRIES)]
+    offsets = [0]
+    for block in blocks:
+        offsets.append(offsets[-1] + len(block))
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, name.encode('ascii'), len(data), BLOCK_ENTRIES, len(blocks)))
+        for offset in offsets:
+            file.write(OFFSET.pack(offset))
+        for block in blocks:
+            file.write(block)
+
+
+def generate(directory, names=TABLES, out=sys.stdout):
+    # Builds the tables into a directory (KQK and KRK first: KPK needs them for promotions)
+    os.makedirs(directory, exist_ok=True)
+    built = {}
+
+    def lookup(promotionType, strongKing, weakKing, square):
+        table = built.get(f"K{promotionType}K")
+        if table is None:
+            raise ValueError(f"K{promotionType}K must be generated before KPK")
+        return table[positionIndex(1, strongKing, weakKing, square)]
+
+    for name in TABLES:
+        if name not in names and not (name in ('KQK', 'KRK') and 'KPK' in names):
+            continue
+        start = time.perf_counter()
+        wdl, dtz = generateTable(name[1], lookup)
+        built[name] = wdl
+        if name in names:
+            writeTable(os.path.join(directory, f"{name}.wdl"), name, wdl)
+            writeTable(os.path.join(directory, f"{name}.dtz"), name, dtz)
+        wins = sum(1 for value in wdl[:ENTRY_COUNT // 2] if value == WDL_WIN)
+        longest = max((value for value in dtz if value != DTZ_NONE), default=0)
+        print(f"{name}: {wins} wins for the side to move with the piece, longest DTZ {longest} plies, {time.perf_counter() - start:.1f}s", file=out)
+
+
+class TableFile:
+    """
+    One memory-mapped table file
+    - Only the header is read up front; block offsets and blocks are read from the map on demand
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, name, self.entryCount, self.blockEntries, self.blockCount = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a table file: {path}")
+        self.name = name.rstrip(b'\0').decode('ascii')
+        self.dataStart = HEADER.size + OFFSET.size * (self.blockCount + 1)
+
+
+    def readBlock(self, block):
+        # Decompresses one block straight from the map
+        start = OFFSET.unpack_from(self.map, HEADER.size + OFFSET.size * block)[0]
+        end = OFFSET.unpack_from(self.map, HEADER.size + OFFSET.size * (block + 1))[0]
+        return zlib.decompress(self.map[self.dataStart + start:self.dataStart + end])
+
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class Tablebase:
+    """
+    Endgame tablebase prober
+    - Reads WDL (win/draw/loss) and DTZ (plies to mate or the next pawn move) tables from a directory
+    - Files are memory-mapped, so only the blocks that are probed are read from disk
+    - Decompressed blocks are kept in an LRU cache shared by every table
+    - Positions with the piece on the black side are probed through the colour-flipped position
+    """
+    def __init__(self, directory, cacheBlocks=64):
+        self.tables = {}
+        for fileName in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(fileName)
+            if extension in ('.wdl', '.dtz'):
+                self.tables[name, extension[1:]] = TableFile(os.path.join(directory, fileName))
+        self.maxPieces = 3 if self.tables else 0
+        self.cacheBlocks = cacheBlocks
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+        self.cache.clear()
+
+
+    def readEntry(self, table, index):
+        # Reads one entry through the block cache
+        key = (table.path, index // table.blockEntries)
+        block = self.cache.get(key)
+        if block is None:
+            self.misses += 1
+            block = table.readBlock(key[1])
+            self.cache[key] = block
+            if len(self.cache) > self.cacheBlocks:
+                self.cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return block[index % table.blockEntries]
+
+
+    def locate(self, board):
+        # Finds the table name and index of a position, or None if no table covers it
+        if board.castlingRights:
+            return None
+
+        pieces = pieceList(board)
+        if len(pieces) != 3:
+            return None
+
+        kings = {}
+        strong = None
+        for sq, colour, pieceType in pieces:
+            if pieceType == 'K':
+                kings[colour] = sq
+            elif strong is None:
+                strong = (sq, colour, pieceType)
+            else:
+                return None
+        if strong is None:
+            return None
+
+        sq, colour, pieceType = strong
+        name = f"K{pieceType}K"
+        if (name, 'wdl') not in self.tables:
+            return None
+
+        # Flip the board so the piece belongs to white
+        weakColour = 'b' if colour == 'w' else 'w'
+        flip = 56 if colour == 'b' else 0
+        stm = 0 if board.turn == colour else 1
+        return name, positionIndex(stm, kings[colour] ^ flip, kings[weakColour] ^ flip, sq ^ flip)
+
+
+    def probeWdl(self, board):
+        # WIN, DRAW or LOSS for the side to move, or None if the position is not in a table
+        located = self.locate(board)
+        if located is None:
+            return None
+        name, index = located
+        return WDL_RESULTS.get(self.readEntry(self.tables[name, 'wdl'], index))
+
+
+    def probeDtz(self, board):
+        # Plies to mate or the next pawn move for a won or lost position (0 for drawn), or None
+        located = self.locate(board)
+        if located is None or (located[0], 'dtz') not in self.tables:
+            return None
+        name, index = located
+        value = self.readEntry(self.tables[name, 'dtz'], index)
+        return 0 if value == DTZ_NONE else value
+
+
+    def bestMove(self, board):
+        # Picks a move that keeps the best result: fastest to zero when winning, slowest when losing
+        # - Returns (move, result), with no move if the game is over, or None if the position is not in a table
+        wdl = self.probeWdl(board)
+        if wdl is None:
+            return None
+
+        best = None
+        bestKey = (wdl,)
+        for move in board.generateAllLegalMoves(board.turn):
+            board.makeMove(move)
+            try:
+                # Captures leave the tables: only kings remain, a draw
+                childWdl = self.probeWdl(board)
+                childDtz = self.probeDtz(board) if childWdl is not None else 0
+                if childWdl is None:
+                    childWdl = LOSS if not board.hasLegalMove(board.turn) and board.inCheck(board.turn) else DRAW
+            finally:
+                board.undoMove()
+
+            result = -childWdl
+            zeroing = move.piece.type == 'P' or move.pieceCaptured
+            # Winning: prefer zeroing moves, then the shortest DTZ; losing: the longest
+            key = (result, zeroing if result == WIN else False, -childDtz if result == WIN else childDtz)
+            if best is None or key > bestKey:
+                best = move
+                bestKey = key
+
+        return best, bestKey[0]
+
+
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'tables': sorted({name for name, _ in self.tables}),
+            'cachedBlocks': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / probes if probes else 0.0,
+        }
+
+
+def pieceList(board):
+    # (sq, colour, type) of every piece on a Board or BitBoard, or [] if there are more than three
+    mailbox = getattr(board, 'mailbox', None)
+    if mailbox is not None:
+        occupied = board.occupancy[0] | board.occupancy[1]
+        if bin(occupied).count('1') > 3:
+            return []
+        pieces = []
+        while occupied:
+            bit = occupied & -occupied
+            sq = bit.bit_length() - 1
+            piece = board.getPiece(divmod(sq, DIMENSION))
+            pieces.append((sq, piece.colour, piece.type))
+            occupied ^= bit
+        return pieces
+
+    if len(board.pieceSqs['w']) + len(board.pieceSqs['b']) > 3:
+        return []
+    return [(row * DIMENSION + col, colour, board.grid[row][col].type) for colour in ('w', 'b') for row, col in board.pieceSqs[colour]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endgame tablebase generator and prober")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generateParser = subparsers.add_parser("generate", help="build tables by retrograde analysis")
+    generateParser.add_argument("directory", help="output directory")
+    generateParser.add_argument("--table", choices=TABLES, action="append", help="table to build (default: all)")
+
+    probeParser = subparsers.add_parser("probe", help="probe a position")
+    probeParser.add_argument("directory", help="table directory")
+    probeParser.add_argument("fen", help="position")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args.directory, tuple(args.table or TABLES))
+        return
+
+    from board import Board
+
+    tablebase = Tablebase(args.directory)
+    board = Board.fromFen(args.fen)
+    wdl = tablebase.probeWdl(board)
+    if wdl is None:
+        print("Position not in the tables")
+        return
+    move, _ = tablebase.bestMove(board)
+    print(f"wdl {wdl}  dtz {tablebase.probeDtz(board)}  best {move.toUci() if move else '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch import encodePositions, evaluateBatch, networkInput
+from bench import BACKENDS, randomPositions
+
+
+def test_batch_matches_board_evaluation():
+    fens = randomPositions(100, seed=12)
+    expected = [BACKENDS['grid'].fromFen(fen).evaluate() for fen in fens]
+    assert evaluateBatch(fens).tolist() == expected
+    assert evaluateBatch(BACKENDS['bitboard'].fromFen(fen) for fen in fens).tolist() == expected
+    mixed = [fen if index % 2 else BACKENDS['grid'].fromFen(fen) for index, fen in enumerate(fens)]
+    assert evaluateBatch(mixed).tolist() == expected
+
+
+def test_boards_and_fens_encode_alike():
+    fens = randomPositions(20, seed=13)
+    planes, turns = encodePositions(fens)
+    boardPlanes, boardTurns = encodePositions([BACKENDS['bitboard'].fromFen(fen) for fen in fens])
+    assert planes.shape == (20, 12, 64)
+    assert (planes == boardPlanes).all() and (turns == boardTurns).all()
+    assert (planes.sum(axis=1) <= 1).all()
+
+
+def test_network_input_mirrors_black_to_move():
+    white = networkInput(["4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"])
+    black = networkInput(["4k3/4p3/8/8/8/8/8/4K3 b - - 0 1"])
+    assert white.shape == (1, 12, 8, 8)
+    assert (white == black).all()
+
+
+def test_invalid_placement_raises_value_error():
+    with pytest.raises(ValueError):
+        evaluateBatch(["4k3/8/8/8/8/8/8/4K2X w - - 0 1"])
+    with pytest.raises(ValueError):
+        evaluateBatch(["4k3/8/8/8/8/8/4K3 w - - 0 1"])
@@ -0,0 +1,45 @@
+from bitboard import BitBoard
+from board import Board
+from constants import START_FEN
+
+# White to move with an en Passant square on f6: only White may capture en Passant
+EN_PASSANT_FEN = "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3"
+
+
+def test_other_side_gets_no_en_passant_capture():
+    board = BitBoard.fromFen(EN_PASSANT_FEN)
+    moves = board.generateAllLegalMoves('b')
+    expected = Board.fromFen(EN_PASSANT_FEN).generateAllLegalMoves('b')
+    assert sorted(move.toUci() for move in moves) == sorted(move.toUci() for move in expected)
+    assert board.toFen() == EN_PASSANT_FEN
+    assert board.hash == BitBoard.fromFen(EN_PASSANT_FEN).hash
+
+
+def test_other_side_piece_and_has_legal_move():
+    board = BitBoard.fromFen(EN_PASSANT_FEN)
+    pawn = board.getPiece((3, 3))
+    assert [move.toUci() for move in board.generateLegalMoves(pawn, (3, 3))] == ['d5d4']
+    assert board.hasLegalMove('b')
+    assert board.toFen() == EN_PASSANT_FEN
+
+
+def test_side_to_move_keeps_en_passant_capture():
+    board = BitBoard.fromFen(EN_PASSANT_FEN)
+    assert 'e5f6' in [move.toUci() for move in board.generateAllLegalMoves('w')]
+
+
+def test_matches_board_on_fen_positions():
+    for fen in (START_FEN, "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"):
+        board = BitBoard.fromFen(fen)
+        grid = Board.fromFen(fen).grid
+        assert all((piece and (piece.colour, piece.type)) == (other and (other.colour, other.type))
+                   for row, otherRow in zip(board.grid, grid) for piece, other in zip(row, otherRow))
+        assert board.toFen() == fen
+
+
+def test_castling_rights_without_king_or_rook_are_dropped():
+    # No rook on a1, and Black's king is not on e8
+    fen = "r5kr/8/8/8/8/8/8/4K2R w KQkq - 0 1"
+    board = BitBoard.fromFen(fen)
+    assert board.toFen() == Board.fromFen(fen).toFen() == "r5kr/8/8/8/8/8/8/4K2R w K - 0 1"
+    assert board.perft(3) == Board.fromFen(fen).perft(3)
@@ -0,0 +1,48 @@
+import random
+
+from board import Board
+from bench import POSITIONS
+
+
+def trackedState(board):
+    return board.kingSq, board.pieceSqs, board.material
+
+
+def playRandomGame(board, plies, seed):
+    # Plays random legal moves, yielding after each one
+    rng = random.Random(seed)
+    for _ in range(plies):
+        moves = board.generateAllLegalMoves(board.turn)
+        if not moves:
+            break
+        board.makeMove(rng.choice(moves))
+        yield
+
+
+def test_tracking_matches_grid_after_make_and_undo():
+    for _, fen, _ in POSITIONS:
+        board = Board.fromFen(fen)
+        for _ in playRandomGame(board, 60, seed=4):
+            assert trackedState(board) == trackedState(Board.fromFen(board.toFen()))
+        while board.history:
+            board.undoMove()
+        assert trackedState(board) == trackedState(Board.fromFen(fen))
+
+
+def test_king_square_follows_castling():
+    board = Board.fromFen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    castle = next(move for move in board.generateAllLegalMoves('w') if move.toUci() == 'e1g1')
+    board.makeMove(castle)
+    assert board.kingSq['w'] == (7, 6)
+    assert (7, 5) in board.pieceSqs['w'] and (7, 7) not in board.pieceSqs['w']
+    board.undoMove()
+    assert board.kingSq['w'] == (7, 4)
+
+
+def test_promotion_updates_material():
+    board = Board.fromFen("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+    promotion = next(move for move in board.generateAllLegalMoves('w') if move.toUci() == 'a7a8q')
+    board.makeMove(promotion)
+    assert board.material['w']['P'] == 0 and board.material['w']['Q'] == 1
+    board.undoMove()
+    assert board.material['w']['P'] == 1 and board.material['w']['Q'] == 0
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from bench import BACKENDS
+from book import OpeningBook, buildBook
+from notation import parseSan
+from pgn import readGames
+
+GAMES = '''[Result "1-0"]
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Result "1/2-1/2"]
+1. e4 c5 1/2-1/2
+
+[Result "0-1"]
+1. e4 e5 2. Bc4 0-1
+
+[Result "1-0"]
+1. d4 d5 1-0
+
+[Result "*"]
+1. c4 *
+'''
+
+
+def games():
+    return readGames(GAMES.splitlines(True))
+
+
+def sanWeights(book, board):
+    return {move.toUci(): weight for move, weight in book.bookMoves(board)}
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "test.bin"
+    buildBook(games(), str(path))
+    book = OpeningBook(str(path), random.Random(19))
+    yield book
+    book.close()
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_weights_follow_results(book, backend):
+    # Unfinished games are left out; wins count 2, draws 1, losses 0
+    board = BACKENDS[backend].fromFen()
+    assert sanWeights(book, board) == {'e2e4': 3, 'd2d4': 2}
+    board.makeMove(parseSan(board, 'e4'))
+    assert sanWeights(book, board) == {'e7e5': 2, 'c7c5': 1}
+
+
+def test_choose_move(book):
+    board = BACKENDS['grid'].fromFen()
+    assert book.chooseMove(board, best=True).toUci() == 'e2e4'
+    assert {book.chooseMove(board).toUci() for _ in range(50)} == {'e2e4', 'd2d4'}
+    board.makeMove(parseSan(board, 'a3'))
+    assert book.chooseMove(board) is None
+
+
+def test_zero_weight_moves_are_not_played(book):
+    board = BACKENDS['grid'].fromFen()
+    for san in ('e4', 'e5'):
+        board.makeMove(parseSan(board, san))
+    assert sanWeights(book, board) == {'g1f3': 2, 'f1c4': 0}
+    assert all(book.chooseMove(board).toUci() == 'g1f3' for _ in range(20))
+
+
+def test_spilled_runs_build_the_same_book(tmp_path):
+    assert buildBook(games(), str(tmp_path / "memory.bin")) == buildBook(games(), str(tmp_path / "runs.bin"), runEntries=2)
+    assert (tmp_path / "memory.bin").read_bytes() == (tmp_path / "runs.bin").read_bytes()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["memory.bin", "runs.bin"]
+
+
+def test_min_games_and_max_plies(tmp_path):
+    path = str(tmp_path / "small.bin")
+    assert buildBook(games(), path, maxPlies=1, minGames=2) == 1
+    book = OpeningBook(path)
+    assert sanWeights(book, BACKENDS['grid'].fromFen()) == {'e2e4': 3}
+    book.close()
+
+
+def test_invalid_book_file(tmp_path):
+    path = tmp_path / "broken.bin"
+    path.write_bytes(b'\0' * 7)
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
+    path.write_bytes(b'')
+    book = OpeningBook(str(path))
+    assert book.chooseMove(BACKENDS['grid'].fromFen()) is None
+    book.close()
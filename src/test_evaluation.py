@@ -0,0 +1,32 @@
+import pytest
+
+from bench import BACKENDS, POSITIONS
+from constants import START_FEN
+from evaluation import MAX_PHASE
+from test_board import playRandomGame
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_incremental_evaluation_matches_recompute(backend):
+    for _, fen, _ in POSITIONS:
+        board = BACKENDS[backend].fromFen(fen)
+        start = board.evaluate()
+        for _ in playRandomGame(board, 60, seed=13):
+            assert board.evaluate() == board.evaluateFromScratch()
+        while board.history:
+            board.undoMove()
+        assert board.evaluate() == start
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_start_position_is_symmetric(backend):
+    board = BACKENDS[backend].fromFen(START_FEN)
+    assert board.evaluate() == 0
+    assert board.phase == MAX_PHASE
+
+
+def test_scores_are_from_side_to_move():
+    white = BACKENDS['grid'].fromFen("4k3/8/8/8/8/8/8/Q3K3 w - - 0 1").evaluate()
+    black = BACKENDS['grid'].fromFen("4k3/8/8/8/8/8/8/Q3K3 b - - 0 1").evaluate()
+    assert white > 0 and black == -white
+
@@ -0,0 +1,52 @@
+import pytest
+
+from bench import BACKENDS, POSITIONS, randomPositions
+from fen import parseEpd, parseFen, readEpd, readFens
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_round_trip(backend):
+    fens = [fen for name, fen, _ in POSITIONS if name != 'bad rights'] + randomPositions(100, seed=10)
+    for fen in fens:
+        assert BACKENDS[backend].fromFen(fen).toFen() == fen
+
+
+def test_round_trip_after_moves():
+    for backend in BACKENDS.values():
+        board = backend.fromFen()
+        for uci in ('e2e4', 'c7c5', 'g1f3'):
+            board.makeMove(next(move for move in board.generateAllLegalMoves(board.turn) if move.toUci() == uci))
+        assert board.toFen() == "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"
+        assert backend.fromFen(board.toFen()).toFen() == board.toFen()
+
+
+def test_move_counters_are_optional():
+    assert parseFen("8/8/8/8/8/8/8/K6k w - -")[4:] == (0, 1)
+
+
+@pytest.mark.parametrize("fen", [
+    "",
+    "8/8/8/8/8/8/8/K6k w -",
+    "8/8/8/8/8/8/8/K6k x - - 0 1",
+    "8/8/8/8/8/8/8/K5k w - - 0 1",
+    "8/8/8/8/8/8/8/K6k/8 w - - 0 1",
+    "8/8/8/8/8/8/8/K6X w - - 0 1",
+    "8/8/8/8/8/8/8/K6k w - - x 1",
+])
+def test_invalid_fen_raises_value_error(fen):
+    with pytest.raises(ValueError):
+        parseFen(fen)
+
+
+
+def test_parse_epd_operations():
+    fen, operations = parseEpd('r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - bm Bb5; id "ruy"; hmvc 2; fmvn 3;')
+    assert fen == "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+    assert operations == {'bm': 'Bb5', 'id': 'ruy', 'hmvc': '2', 'fmvn': '3'}
+
+
+def test_read_epd_skips_blank_lines_and_comments(tmp_path):
+    path = tmp_path / "positions.epd"
+    path.write_text(f"# test positions\n\n{POSITIONS[0][1]}\n4k3/8/8/8/8/8/8/4K3 w - - bm Kd2;\n")
+    assert list(readFens(path)) == [POSITIONS[0][1], "4k3/8/8/8/8/8/8/4K3 w - -"]
+    assert [operations for _, operations in readEpd(path)] == [{}, {'bm': 'Kd2'}]
@@ -0,0 +1,74 @@
+import os
+import time
+
+import pytest
+
+# A window-less display, so the tests run without a screen
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from constants import SQ_SIZE
+from game import Game
+
+
+def click(game, square):
+    row, col = square
+    game.handleClick((col * SQ_SIZE + 1, row * SQ_SIZE + 1))
+
+
+def waitForWorker(game, timeout=10):
+    # Runs the event loop until the game stops waiting for a worker job
+    end = time.monotonic() + timeout
+    while game.pending is not None and time.monotonic() < end:
+        game.handleEvents(wait=True)
+    assert game.pending is None
+
+
+@pytest.fixture
+def makeGame():
+    games = []
+
+    def make(**options):
+        game = Game(**options)
+        games.append(game)
+        game.requestGameEndCheck()
+        waitForWorker(game)
+        return game
+
+    yield make
+    for game in games:
+        game.worker.close()
+    pygame.quit()
+
+
+def test_player_move_waits_for_game_end_check(makeGame):
+    game = makeGame()
+    click(game, (6, 4))
+    assert sorted(game.targetSqs) == [(4, 4), (5, 4)]
+    click(game, (4, 4))
+    assert game.board.toFen().startswith("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b")
+    assert game.pending is not None
+
+    # Clicks are ignored until the check comes back
+    click(game, (1, 4))
+    assert game.pieceSq == ()
+    waitForWorker(game)
+    click(game, (1, 4))
+    assert game.pieceSq == (1, 4)
+
+
+def test_promotion_is_chosen_by_click(makeGame):
+    game = makeGame(fen="4k3/1P6/8/8/8/8/8/4K3 w - - 0 1")
+    click(game, (1, 1))
+    click(game, (0, 1))
+    assert game.promotionMoves and game.board.history == []
+    click(game, (3, 1))
+    assert game.board.getPiece((0, 1)).type == 'N'
+
+
+def test_engine_moves_on_the_worker_and_game_ends(makeGame):
+    game = makeGame(fen="6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", engineColours=('w',), engineTime=0.2)
+    waitForWorker(game)
+    assert [move.toUci() for move in game.board.history] == ['a1a8']
+    waitForWorker(game)
+    assert game.gameEnd
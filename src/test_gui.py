@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+# A window-less display, so the tests run without a screen
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from bench import BACKENDS
+from constants import DIMENSION
+from gui import Gui, SPRITES, loadSprites
+from notation import parseSan
+
+
+@pytest.fixture
+def gui():
+    pygame.init()
+    yield Gui()
+    pygame.quit()
+
+
+def test_first_draw_covers_every_square(gui):
+    board = BACKENDS['grid'].fromFen()
+    assert len(gui.draw(board, (), [])) == DIMENSION * DIMENSION
+    assert gui.draw(board, (), []) == []
+
+
+def test_only_changed_squares_are_redrawn(gui):
+    board = BACKENDS['grid'].fromFen()
+    gui.draw(board, (), [])
+    assert {tuple(rect) for rect in gui.draw(board, (6, 4), [(5, 4), (4, 4)])} == {tuple(gui.rects[row][col]) for row, col in ((6, 4), (5, 4), (4, 4))}
+
+    board.makeMove(parseSan(board, 'e4'))
+    assert len(gui.draw(board, (), [])) == 3
+    gui.invalidate()
+    assert len(gui.draw(board, (), [])) == DIMENSION * DIMENSION
+
+
+def test_promotion_choices(gui):
+    assert Gui.promotionSquares((0, 3)) == {(0, 3): 'Q', (1, 3): 'R', (2, 3): 'B', (3, 3): 'N'}
+    assert Gui.promotionSquares((7, 3)) == {(7, 3): 'Q', (6, 3): 'R', (5, 3): 'B', (4, 3): 'N'}
+    board = BACKENDS['grid'].fromFen("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1")
+    gui.draw(board, (), [])
+    assert len(gui.draw(board, (1, 1), [], ((0, 1), 'w'))) == 4
+
+
+
+def test_sprites_are_loaded_once(gui):
+    assert loadSprites(gui.images['wK'].get_width()) is gui.images
+    assert Gui().images is gui.images
+    assert len(SPRITES) == 1
@@ -0,0 +1,42 @@
+from bench import POSITIONS
+from bitboard import BitBoard
+from board import Board
+from move import encodeMove, moveKey, packedToUci, parseSquare, squareName, FLAG_CAPTURE, FLAG_CASTLE, FLAG_EN_PASSANT
+
+
+def test_square_names():
+    assert squareName((6, 4)) == 'e2'
+    assert parseSquare('a8') == (0, 0)
+    assert all(parseSquare(squareName(divmod(sq, 8))) == divmod(sq, 8) for sq in range(64))
+
+
+def test_encode_and_decode_round_trip():
+    for _, fen, _ in POSITIONS:
+        board = Board.fromFen(fen)
+        for move in board.generateAllLegalMoves(board.turn):
+            packed = encodeMove(move)
+            assert packedToUci(packed) == move.toUci()
+            assert moveKey(move) == packed & 0x7FFF
+            decoded = board.decodeMove(moveKey(move))
+            assert encodeMove(decoded) == packed
+            assert decoded.piece is move.piece
+
+
+def test_flags():
+    board = Board.fromFen("r3k2r/8/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1")
+    packed = {move.toUci(): encodeMove(move) for move in board.generateAllLegalMoves('w')}
+    assert packed['e5d6'] & (FLAG_CAPTURE | FLAG_EN_PASSANT) == FLAG_CAPTURE | FLAG_EN_PASSANT
+    assert packed['e1g1'] & FLAG_CASTLE and packed['e1c1'] & FLAG_CASTLE
+    assert packed['a1a8'] & FLAG_CAPTURE and not packed['a1a8'] & (FLAG_EN_PASSANT | FLAG_CASTLE)
+    assert not packed['e5e6'] & (FLAG_CAPTURE | FLAG_EN_PASSANT | FLAG_CASTLE)
+
+
+def test_bitboard_packed_moves_match_move_objects():
+    for _, fen, _ in POSITIONS:
+        board = BitBoard.fromFen(fen)
+        packed = board.generateLegalPackedMoves()
+        assert sorted(packed) == sorted(encodeMove(move) for move in board.generateAllLegalMoves(board.turn))
+        for move in packed:
+            board.makePacked(move)
+            board.undoPacked()
+        assert board.toFen() == BitBoard.fromFen(fen).toFen()
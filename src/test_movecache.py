@@ -0,0 +1,67 @@
+import pytest
+
+from bench import BACKENDS
+from movecache import LegalMoveCache
+from notation import parseSan
+from worker import boardSnapshot
+
+
+def ucis(moves):
+    return sorted(move.toUci() for move in moves)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_moves_are_generated_once_per_position(backend):
+    board = BACKENDS[backend].fromFen()
+    assert len(board.legalMoves()) == 20
+    assert ucis(board.legalMovesFrom((7, 6))) == ['g1f3', 'g1h3']
+    assert board.legalMovesFrom((4, 4)) == []
+    board.makeMove(parseSan(board, 'e4'))
+    assert len(board.legalMoves()) == 20
+    board.undoMove()
+    board.legalMoves()
+    assert board.moveCache().stats() == {'positions': 2, 'hits': 3, 'misses': 2, 'hitRate': 0.6}
+
+
+def test_copies_are_returned():
+    board = BACKENDS['grid'].fromFen()
+    board.legalMoves().clear()
+    board.legalMovesFrom((6, 4)).clear()
+    assert len(board.legalMoves()) == 20 and len(board.legalMovesFrom((6, 4))) == 2
+
+
+def test_moves_for_replaced_pieces_are_generated_again():
+    # Promoting, undoing and promoting again puts a new queen object on the same square in the same position
+    board = BACKENDS['grid'].fromFen("8/Pk6/8/8/8/8/8/4K3 w - - 0 1")
+    board.makeMove(parseSan(board, 'a8=Q+'))
+    board.legalMoves()
+    board.undoMove()
+    board.makeMove(parseSan(board, 'a8=Q+'))
+    capture = parseSan(board, 'Kxa8', board.legalMoves())
+    assert capture.pieceCaptured is board.getPiece((0, 0))
+    assert board.moveCache().misses == 2
+
+
+def test_adopted_moves_are_rebound_to_the_board():
+    board = BACKENDS['grid'].fromFen("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3")
+    snapshot = boardSnapshot(board)
+    board.moveCache().adopt(board, snapshot.legalMoves())
+    moves = board.legalMoves()
+    assert board.moveCache().misses == 0
+    assert ucis(moves) == ucis(snapshot.legalMoves())
+    assert all(board.getPiece(move.startSq) is move.piece for move in moves)
+    enPassant = next(move for move in moves if move.isEnPassant)
+    assert enPassant.pieceCaptured is board.getPiece((3, 5))
+
+
+def test_least_recently_used_position_is_evicted():
+    cache = LegalMoveCache(positions=2)
+    board = BACKENDS['grid'].fromFen()
+    cache.moves(board)
+    for san in ('e4', 'e5'):
+        board.makeMove(parseSan(board, san))
+        cache.moves(board)
+    board.undoMove()
+    board.undoMove()
+    cache.moves(board)
+    assert cache.stats()['misses'] == 4 and cache.stats()['positions'] == 2
@@ -0,0 +1,118 @@
+import pytest
+
+from board import Board
+from bench import BACKENDS, randomPositions
+from movegen import GEN_CAPTURES, GEN_CHECKS, GEN_QUIETS
+
+# Pins, checks, en Passant discovered along a rank, and castling through attacked squares
+POSITIONS = [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "8/8/8/KPp4r/8/8/8/7k w - c6 0 1",
+    "4k3/8/8/8/1b6/8/3N4/4K3 w - - 0 1",
+    "4k3/4r3/8/8/8/8/3PPP2/3QK2R w K - 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+]
+
+
+def bruteForceMoves(board):
+    # Pseudo-legal moves kept only if they do not leave the king attacked (the old make/undo filter)
+    moveGen = board.moveGen
+    moves = []
+    for square in list(board.pieceSqs[board.turn]):
+        piece = board.getPiece(square)
+        for move in moveGen.generatePseudoLegalMoves(piece, square):
+            if moveGen.isLegalByMakeMove(move, board.turn):
+                moves.append(move.toUci())
+    return sorted(moves)
+
+
+def test_legal_moves_match_make_undo_filter():
+    for fen in POSITIONS + randomPositions(300, seed=3):
+        board = Board.fromFen(fen)
+        assert sorted(move.toUci() for move in board.generateAllLegalMoves(board.turn)) == bruteForceMoves(board), fen
+
+
+def test_pinned_piece_stays_on_pin_ray():
+    # The knight on d2 is pinned by the bishop on b4
+    board = Board.fromFen(POSITIONS[3])
+    assert board.generateLegalMoves(board.getPiece((6, 3)), (6, 3)) == []
+
+
+def test_double_check_allows_only_king_moves():
+    board = Board.fromFen("4k3/8/8/8/8/5n2/8/r3K3 w - - 0 1")
+    assert {move.piece.type for move in board.generateAllLegalMoves('w')} == {'K'}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("fen, expected", [
+    ("R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1", False),
+    ("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1", False),
+    ("k7/8/1K6/8/8/8/8/8 b - - 0 1", True),
+    ("7k/5Q2/8/8/8/8/6Pp/6K1 b - - 0 1", True),
+])
+def test_has_legal_move_on_game_ends(backend, fen, expected):
+    board = BACKENDS[backend].fromFen(fen)
+    assert board.hasLegalMove(board.turn) == expected == bool(board.generateAllLegalMoves(board.turn))
+    assert board.toFen() == fen
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_has_legal_move_matches_move_list(backend):
+    for fen in randomPositions(300, seed=15):
+        board = BACKENDS[backend].fromFen(fen)
+        for colour in ('w', 'b'):
+            assert board.hasLegalMove(colour) == bool(board.generateAllLegalMoves(colour)), fen
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("fen, expected", [
+    ("4k3/8/8/8/8/8/8/4K3 w - - 0 1", True),
+    ("4k3/8/8/8/8/8/8/4KN2 w - - 0 1", True),
+    ("2b1k3/8/8/8/8/8/8/4KB2 w - - 0 1", True),
+    ("4k3/8/8/8/8/8/8/4KNN1 w - - 0 1", False),
+    ("4k3/8/8/8/8/8/8/3BKB2 w - - 0 1", False),
+    ("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", False),
+])
+def test_insufficient_material(backend, fen, expected):
+    assert BACKENDS[backend].fromFen(fen).insufficientMaterial() == expected
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_generation_modes_split_legal_moves(backend):
+    for fen in POSITIONS + randomPositions(200, seed=17):
+        board = BACKENDS[backend].fromFen(fen)
+        colour = board.turn
+        moves = sorted(move.toUci() for move in board.generateAllLegalMoves(colour))
+        captures = board.generateAllLegalMoves(colour, GEN_CAPTURES)
+        quiets = board.generateAllLegalMoves(colour, GEN_QUIETS)
+        assert all(move.pieceCaptured or move.promotionType for move in captures)
+        assert not any(move.pieceCaptured or move.promotionType for move in quiets)
+        assert sorted(move.toUci() for move in captures + quiets) == moves, fen
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_checking_moves_match_make_undo(backend):
+    for fen in POSITIONS + randomPositions(200, seed=18):
+        board = BACKENDS[backend].fromFen(fen)
+        colour = board.turn
+        expected = []
+        for move in board.generateAllLegalMoves(colour):
+            board.makeMove(move)
+            if board.inCheck(board.turn):
+                expected.append(move.toUci())
+            board.undoMove()
+        assert sorted(move.toUci() for move in board.generateAllLegalMoves(colour, GEN_CHECKS)) == sorted(expected), fen
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("fen, uci", [
+    ("5k2/8/8/8/8/8/8/4K2R w K - 0 1", 'e1g1'),
+    ("8/8/8/R2pP2k/8/8/8/4K3 w - d6 0 1", 'e5d6'),
+    ("4k3/8/8/8/8/8/4N3/4R1K1 w - - 0 1", 'e2c3'),
+    ("4k3/1P6/8/8/8/8/8/6K1 w - - 0 1", 'b7b8r'),
+])
+def test_special_checking_moves(backend, fen, uci):
+    # Castling rook, en Passant discovery, discovered check and promotion
+    board = BACKENDS[backend].fromFen(fen)
+    assert uci in [move.toUci() for move in board.generateAllLegalMoves(board.turn, GEN_CHECKS)]
@@ -0,0 +1,66 @@
+import pytest
+
+from bench import BACKENDS, POSITIONS
+from move import moveKey
+from movegen import GEN_CAPTURES
+from moveorder import MovePicker, historyIndex, moveIdentity, see
+
+
+def findMove(board, uci):
+    return next(move for move in board.generateAllLegalMoves(board.turn) if move.toUci() == uci)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("staged", [False, True])
+def test_every_move_yielded_once(backend, staged):
+    for _, fen, _ in POSITIONS:
+        board = BACKENDS[backend].fromFen(fen)
+        moves = board.generateAllLegalMoves(board.turn)
+        ttMove = moveKey(moves[-1])
+        picked = list(MovePicker(board, None if staged else list(moves), ttMove, [moveIdentity(moves[0])], [0] * 4096))
+        assert sorted(move.toUci() for move in picked) == sorted(move.toUci() for move in moves)
+        assert picked[0].toUci() == moves[-1].toUci()
+
+
+def test_order_of_stages():
+    # Kiwipete: TT move first, then winning captures, then the killer, then quiets by history, losing captures last
+    board = BACKENDS['grid'].fromFen(POSITIONS[1][1])
+    history = [0] * 4096
+    history[historyIndex(findMove(board, 'a2a3'))] = 100
+    killer = moveIdentity(findMove(board, 'g2g3'))
+    picked = [move.toUci() for move in MovePicker(board, None, moveKey(findMove(board, 'e1g1')), [killer], history)]
+
+    assert picked[0] == 'e1g1'
+    killerIndex = picked.index('g2g3')
+    assert all(findMove(board, uci).pieceCaptured for uci in picked[1:killerIndex])
+    assert picked[killerIndex + 1] == 'a2a3'
+    losing = [uci for uci in picked[killerIndex:] if findMove(board, uci).pieceCaptured]
+    assert losing and picked[-len(losing):] == losing
+    assert all(see(board, findMove(board, uci)) < 0 for uci in losing)
+
+
+def test_illegal_tt_move_is_ignored():
+    board = BACKENDS['grid'].fromFen()
+    # e2e5 is not a legal move in the start position
+    ttMove = 52 | 28 << 6
+    picked = list(MovePicker(board, None, ttMove))
+    assert len(picked) == 20
+
+
+def test_skip_bad_captures():
+    board = BACKENDS['grid'].fromFen("4k3/8/3p4/4p3/8/8/4Q3/4K3 w - - 0 1")
+    captures = board.generateAllLegalMoves('w', GEN_CAPTURES)
+    assert [move.toUci() for move in captures] == ['e2e5']
+    assert list(MovePicker(board, captures, skipBadCaptures=True)) == []
+
+
+@pytest.mark.parametrize("fen, uci, expected", [
+    ("4k3/8/8/4p3/8/8/4R3/4K3 w - - 0 1", 'e2e5', 100),
+    ("4k3/8/3p4/4p3/8/8/4Q3/4K3 w - - 0 1", 'e2e5', 100 - 900),
+    ("4k3/8/3p4/4n3/8/5N2/4R3/4K3 w - - 0 1", 'f3e5', 320 - 320 + 100),
+    ("4k3/8/3p4/4n3/8/5N2/4R3/4K3 w - - 0 1", 'e2e5', 320 - 500 + 100),
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", 'e5d6', 100),
+])
+def test_see(fen, uci, expected):
+    board = BACKENDS['grid'].fromFen(fen)
+    assert see(board, findMove(board, uci)) == expected
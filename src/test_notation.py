@@ -0,0 +1,53 @@
+import pytest
+
+from bench import BACKENDS, POSITIONS, randomPositions
+from notation import parseSan, toSan
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_san_round_trip(backend):
+    for fen in [fen for _, fen, _ in POSITIONS] + randomPositions(100, seed=11):
+        board = BACKENDS[backend].fromFen(fen)
+        fen = board.toFen()
+        legalMoves = board.generateAllLegalMoves(board.turn)
+        sans = [toSan(board, move, legalMoves) for move in legalMoves]
+        assert len(set(sans)) == len(sans)
+        for move, san in zip(legalMoves, sans):
+            assert parseSan(board, san, legalMoves) is move
+        assert board.toFen() == fen
+
+
+@pytest.mark.parametrize("fen, uci, san", [
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", 'e1g1', 'O-O'),
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", 'e1c1', 'O-O-O'),
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", 'a1a8', 'Rxa8+'),
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", 'a1a8', 'Ra8#'),
+    ("4k3/8/8/8/8/8/8/N1N1K3 w - - 0 1", 'a1b3', 'Nab3'),
+    ("4k3/8/8/N7/8/8/8/N3K3 w - - 0 1", 'a1b3', 'N1b3'),
+    ("4k3/8/8/N7/8/8/8/N1N1K3 w - - 0 1", 'a1b3', 'Na1b3'),
+    ("3nk3/2P5/8/8/8/8/8/4K3 w - - 0 1", 'c7d8n', 'cxd8=N'),
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", 'e5d6', 'exd6'),
+])
+def test_to_san(fen, uci, san):
+    board = BACKENDS['grid'].fromFen(fen)
+    move = next(move for move in board.generateAllLegalMoves(board.turn) if move.toUci() == uci)
+    assert toSan(board, move) == san
+
+
+def test_parse_san_accepts_variants():
+    board = BACKENDS['grid'].fromFen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    assert parseSan(board, '0-0').toUci() == 'e1g1'
+    assert parseSan(board, 'Ra1xa8+!?').toUci() == 'a1a8'
+    board = BACKENDS['grid'].fromFen("3nk3/2P5/8/8/8/8/8/4K3 w - - 0 1")
+    assert parseSan(board, 'cxd8Q').promotionType == 'Q'
+
+
+@pytest.mark.parametrize("san", ['Nf6', 'e5', 'Qh9', 'Zf3', '', 'Nbf3'])
+def test_parse_san_rejects_illegal_moves(san):
+    with pytest.raises(ValueError):
+        parseSan(BACKENDS['grid'].fromFen(), san)
+
+
+def test_parse_san_rejects_ambiguous_moves():
+    with pytest.raises(ValueError):
+        parseSan(BACKENDS['grid'].fromFen("4k3/8/8/8/8/8/8/N1N1K3 w - - 0 1"), 'Nb3')
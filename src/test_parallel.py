@@ -0,0 +1,29 @@
+import pytest
+
+from bench import BACKENDS, POSITIONS
+from parallel import ParallelSearch, findMove, parallelDivide, parallelPerft
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_parallel_perft_matches_perft(backend):
+    _, fen, counts = POSITIONS[1]
+    board = BACKENDS[backend].fromFen(fen)
+    assert parallelPerft(board, 2, workers=2) == counts[1]
+    assert parallelDivide(board, 2, workers=2) == board.divide(2)
+
+
+def test_find_move_rejects_illegal_move():
+    board = BACKENDS['grid'].fromFen(POSITIONS[0][1])
+    assert findMove(board, 'e2e4').toUci() == 'e2e4'
+    with pytest.raises(ValueError):
+        findMove(board, 'e2e5')
+
+
+def test_parallel_search_finds_mate():
+    search = ParallelSearch(workers=2, hashSizeMb=1)
+    try:
+        board = BACKENDS['grid'].fromFen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        assert search.search(board, depth=3).toUci() == 'a1a8'
+        assert search.completedDepth >= 1
+    finally:
+        search.close()
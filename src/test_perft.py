@@ -0,0 +1,23 @@
+import pytest
+
+from bench import BACKENDS, POSITIONS
+
+# Depth 3 keeps the suite quick on the grid Board; bench.py runs deeper
+TEST_DEPTH = 3
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("name, fen, counts", POSITIONS, ids=[name for name, _, _ in POSITIONS])
+def test_perft_node_counts(backend, name, fen, counts):
+    board = BACKENDS[backend].fromFen(fen)
+    for depth in range(1, TEST_DEPTH + 1):
+        assert board.perft(depth) == counts[depth - 1]
+    assert board.toFen() == BACKENDS[backend].fromFen(fen).toFen()
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_divide_sums_to_perft(backend):
+    name, fen, counts = POSITIONS[1]
+    divide = BACKENDS[backend].fromFen(fen).divide(2)
+    assert len(divide) == counts[0]
+    assert sum(divide.values()) == counts[1]
@@ -0,0 +1,51 @@
+from analyse import analysePosition, replayGame, runTasks
+from board import Board
+from pgn import parseMovetext, readGames, readPgn
+
+GAMES = '''[Event "Test"]
+[White "A \\"quoted\\" name"]
+[Black "B"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 {attacking f7} Nc6 (2... Nf6 3. d3) 3. Qh5 $1 Nf6?? 4. Qxf7# 1-0
+
+[Event "Illegal"]
+[Result "*"]
+
+1. e4 e5 2. Ke3 *
+%escaped line
+'''
+
+
+def test_parse_movetext_keeps_main_line():
+    text = "1. e4 {a comment} e5 ; rest of line\n2. Nf3 (2. f4 exf4 (2... d5)) 2... Nc6 $2 3. Bb5 1/2-1/2"
+    assert parseMovetext(text) == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5']
+
+
+def test_read_games_splits_games_and_headers():
+    games = list(readGames(GAMES.splitlines(True)))
+    assert len(games) == 2
+    headers, moves = games[0]
+    assert headers['White'] == 'A "quoted" name'
+    assert moves == ['e4', 'e5', 'Bc4', 'Nc6', 'Qh5', 'Nf6??', 'Qxf7#']
+    assert games[1][1] == ['e4', 'e5', 'Ke3']
+
+
+def test_read_pgn_file(tmp_path):
+    path = tmp_path / "games.pgn"
+    path.write_text(GAMES)
+    assert [headers['Event'] for headers, _ in readPgn(path)] == ['Test', 'Illegal']
+
+
+def test_replay_game_reports_status_and_errors():
+    games = list(readGames(GAMES.splitlines(True)))
+    tasks = [(replayGame, (Board, index, headers, moves, None, None, None)) for index, (headers, moves) in enumerate(games, 1)]
+    mate, illegal = runTasks(tasks, 1)
+    assert mate['status'] == 'checkmate' and mate['plies'] == 7
+    assert illegal['errorPly'] == 3 and 'Ke3' in illegal['error']
+
+
+def test_analyse_position_checks_best_move():
+    record = analysePosition((Board, 1, "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", {'bm': 'Ra8#', 'id': 'mate'}, 2, None, None))
+    assert record['best'] == 'Ra8#' and record['solved'] and record['id'] == 'mate'
+    assert 'error' in analysePosition((Board, 2, "8/8 w - -", {}, None, None, None))
@@ -0,0 +1,48 @@
+import pytest
+
+from bitboard import BitBoard
+from board import Board
+from search import Search, MATE_SCORE
+
+BACKENDS = [Board, BitBoard]
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_finds_mate_in_one(boardType):
+    board = boardType.fromFen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    search = Search()
+    assert search.search(board, depth=3).toUci() == 'a1a8'
+    assert search.bestScore == MATE_SCORE - 1
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_finds_mate_in_two(boardType):
+    board = boardType.fromFen("k7/8/2K5/8/8/8/8/7R w - - 0 1")
+    search = Search()
+    search.search(board, depth=4)
+    assert search.bestScore == MATE_SCORE - 3
+
+
+def test_no_legal_moves_returns_none():
+    assert Search().search(Board.fromFen("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1"), depth=2) is None
+
+
+def test_node_limit_still_returns_a_move():
+    board = Board.fromFen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    search = Search()
+    move = search.search(board, depth=10, nodeLimit=300)
+    assert move.toUci() in [legal.toUci() for legal in board.generateAllLegalMoves('w')]
+    assert search.completedDepth < 10
+    assert board.toFen() == "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+
+def test_stop_before_search_is_kept_until_cleared():
+    board = Board.fromFen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    search = Search()
+    search.stop()
+    search.search(board, depth=3)
+    assert search.completedDepth == 0
+    search.clearStop()
+    search.search(board, depth=2)
+    assert search.completedDepth == 2
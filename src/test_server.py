@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+from server import Client, GameServer, LocalClient, uciKey
+
+
+def request(server, **fields):
+    return json.loads(server.handleLine(json.dumps(fields)))
+
+
+@pytest.fixture
+def server():
+    return GameServer(cachePositions=16)
+
+
+def test_game_flow(server):
+    game = request(server, op='new')
+    assert game == {'game': 1, 'fen': "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 'turn': 'w', 'status': None}
+    assert len(request(server, op='moves', game=1)['moves']) == 20
+    for uci in ('f2f3', 'e7e5', 'g2g4', 'd8h4'):
+        reply = request(server, op='move', game=1, move=uci)
+    assert reply['status'] == 'checkmate' and reply['turn'] == 'w'
+    assert request(server, op='move', game=1, move='a2a3') == {'error': "Game is over", 'game': 1}
+    assert request(server, op='close', game=1) == {'game': 1, 'closed': True}
+    assert request(server, op='state', game=1) == {'error': "Unknown game 1"}
+
+
+def test_games_share_the_move_cache(server):
+    for _ in range(3):
+        gameId = request(server, op='new')['game']
+        request(server, op='move', game=gameId, move='e2e4')
+    stats = request(server, op='stats')
+    assert stats['games'] == 3 and stats['movesPlayed'] == 3
+    assert stats['cachedPositions'] == 2 and stats['cacheHitRate'] > 0.5
+
+
+def test_repetition_is_a_draw(server):
+    request(server, op='new')
+    for uci in ('g1f3', 'g8f6', 'f3g1', 'f6g8') * 2:
+        reply = request(server, op='move', game=1, move=uci)
+    assert reply['status'] == 'threefold repetition'
+
+
+@pytest.mark.parametrize("line, error", [
+    ("not json", "Invalid JSON"),
+    ("[1, 2]", "Request must be an object"),
+    ('{"op": "fly"}', "Unknown op 'fly'"),
+    ('{"op": "state"}', "Unknown game None"),
+    ('{"op": "state", "game": [1]}', "Unknown game [1]"),
+    ('{"op": "state", "game": 7}', "Unknown game 7"),
+    ('{"op": "new", "fen": 5}', "FEN must be a string"),
+    ('{"op": "new", "fen": "8/8 w - -"}', "Invalid FEN placement: '8/8'"),
+    ('{"op": "new", "fen": "8/8/8/8/8/8/8/K7 w - - 0 1"}', "Invalid position: each side needs exactly one king"),
+    ('{"op": "new", "fen": "P3k3/8/8/8/8/8/8/4K3 w - - 0 1"}', "Invalid position: pawn on the first or last rank"),
+    ('{"op": "new", "fen": "4k3/8/8/8/8/8/8/4KR2 w - - 0 1"}', None),
+    ('{"op": "new", "fen": "4k3/8/8/8/8/8/8/4R1K1 w - - 0 1"}', "Invalid position: the side not to move is in check"),
+])
+def test_error_replies(server, line, error):
+    reply = json.loads(server.handleLine(line))
+    assert reply.get('error') == error
+
+
+@pytest.mark.parametrize("move", ['e2e5', 'e2', 'z9z9', 'e7e8k', 'e2e4qq', 5, None])
+def test_illegal_moves(server, move):
+    request(server, op='new')
+    reply = request(server, op='move', game=1, move=move)
+    assert reply == {'error': f"Illegal move {move!r}", 'game': 1}
+    assert request(server, op='state', game=1)['turn'] == 'w'
+
+
+def test_uci_key():
+    assert uciKey('a8a1') == 0 | 56 << 6
+    assert uciKey('b7b8q') == (9 | 1 << 6 | 1 << 12)
+    assert uciKey('a8') is None and uciKey('a8a9') is None
+
+
+def test_local_clients_interleave(server):
+    async def play(client):
+        game = (await client.request('new'))['game']
+        for uci in ('e2e4', 'e7e5', 'g1f3'):
+            await client.request('move', game=game, move=uci)
+        return (await client.request('state', game=game))['fen']
+
+    async def main():
+        return await asyncio.gather(*(play(LocalClient(server)) for _ in range(10)))
+
+    fens = asyncio.run(main())
+    assert set(fens) == {"rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"}
+
+
+def test_socket_connection_survives_bad_lines(server):
+    async def main():
+        listener = await asyncio.start_server(server.handleConnection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            client = await Client.connect(port=port)
+            client.writer.write(b'x' * 100000 + b'\n')
+            tooLong = json.loads(await client.reader.readline())
+            client.writer.write(b'{"op": \n')
+            invalid = json.loads(await client.reader.readline())
+            game = await client.request('new')
+            await client.close()
+        return tooLong, invalid, game
+
+    tooLong, invalid, game = asyncio.run(main())
+    assert tooLong == {'error': "Request too long"}
+    assert invalid == {'error': "Invalid JSON"}
+    assert game['game'] == 1
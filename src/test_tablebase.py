@@ -0,0 +1,79 @@
+import io
+
+import pytest
+
+from bench import BACKENDS
+from search import Search
+from tablebase import Tablebase, generate, WIN, DRAW, LOSS
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory):
+    # KRK only: the quickest table to build
+    # - Returns (directory, generator output)
+    directory = tmp_path_factory.mktemp("tables")
+    out = io.StringIO()
+    generate(str(directory), ('KRK',), out)
+    return str(directory), out.getvalue()
+
+
+@pytest.fixture(scope="module")
+def tablebase(generated):
+    tablebase = Tablebase(generated[0], cacheBlocks=4)
+    yield tablebase
+    tablebase.close()
+
+
+def test_generator_finds_longest_win(generated, tablebase):
+    # The longest KRK win is mate in 16
+    assert "longest DTZ 32 plies" in generated[1]
+    assert tablebase.stats()['tables'] == ['KRK']
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("fen, wdl", [
+    ("8/8/3k4/8/8/8/8/R3K3 w - - 0 1", WIN),
+    ("8/8/3k4/8/8/8/8/R3K3 b - - 0 1", LOSS),
+    ("8/8/3K4/8/8/8/8/r3k3 b - - 0 1", WIN),
+    ("8/8/8/8/8/8/3k4/4R2K b - - 0 1", DRAW),
+    ("k7/8/K7/8/8/8/8/1R6 b - - 0 1", DRAW),
+])
+def test_probe_wdl(tablebase, backend, fen, wdl):
+    assert tablebase.probeWdl(BACKENDS[backend].fromFen(fen)) == wdl
+
+
+@pytest.mark.parametrize("fen", [
+    "8/8/3k4/8/8/8/8/Q3K3 w - - 0 1",
+    "8/8/3k4/8/8/8/P7/R3K3 w - - 0 1",
+    "4k3/8/8/8/8/8/8/R3K3 w Q - 0 1",
+])
+def test_positions_without_a_table(tablebase, fen):
+    board = BACKENDS['grid'].fromFen(fen)
+    assert tablebase.probeWdl(board) is None and tablebase.bestMove(board) is None
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_best_move_mates(tablebase, backend):
+    board = BACKENDS[backend].fromFen("k7/8/1K6/8/8/8/8/7R w - - 0 1")
+    assert tablebase.probeDtz(board) == 1
+    move, result = tablebase.bestMove(board)
+    assert result == WIN
+    board.makeMove(move)
+    assert board.inCheck(board.turn) and not board.hasLegalMove(board.turn)
+
+
+def test_best_move_keeps_the_win_to_mate(tablebase):
+    board = BACKENDS['bitboard'].fromFen("8/8/3k4/8/8/8/8/R3K3 w - - 0 1")
+    dtz = tablebase.probeDtz(board)
+    for ply in range(dtz):
+        move, _ = tablebase.bestMove(board)
+        board.makeMove(move)
+        assert tablebase.probeDtz(board) == dtz - ply - 1
+    assert not board.hasLegalMove(board.turn)
+
+
+def test_search_plays_tablebase_move(tablebase):
+    board = BACKENDS['grid'].fromFen("k7/8/1K6/8/8/8/8/7R w - - 0 1")
+    search = Search(tablebase=tablebase)
+    assert search.search(board, depth=1).toUci() == 'h1h8'
+    assert search.stats()['tbHits'] == 1
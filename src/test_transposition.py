@@ -0,0 +1,74 @@
+import pytest
+
+from bench import POSITIONS
+from board import Board
+from search import Search, MATE_SCORE, MAX_DEPTH, scoreToTable
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, SCORE_OFFSET, entryCount
+
+
+class RecordingTable(TranspositionTable):
+    # Keeps every score the search stores
+    def __init__(self, sizeMb=1):
+        super().__init__(sizeMb)
+        self.scores = []
+
+
+    def store(self, key, moveKey, score, depth, bound):
+        self.scores.append(score)
+        super().store(key, moveKey, score, depth, bound)
+
+
+@pytest.mark.parametrize("score", [0, 1, -1, 123, -MATE_SCORE + 1, MATE_SCORE - 1, SCORE_OFFSET - 1, -SCORE_OFFSET])
+def test_store_and_probe_round_trip(score):
+    tt = TranspositionTable(1)
+    tt.store(0x123456789ABCDEF0, 0x1234, score, 7, LOWER)
+    assert tt.probe(0x123456789ABCDEF0) == (0x1234, score, 7, LOWER)
+
+
+def test_mate_scores_fit_the_score_field():
+    for ply in range(MAX_DEPTH + 1):
+        for score in (MATE_SCORE - ply, -MATE_SCORE + ply):
+            assert -SCORE_OFFSET <= scoreToTable(score, ply) < SCORE_OFFSET
+
+
+def test_search_never_stores_infinity():
+    # Scores outside the 20-bit field would corrupt the depth and bound bits
+    for _, fen, _ in POSITIONS + [("mate", "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", None)]:
+        tt = RecordingTable()
+        Search(tt=tt).search(Board.fromFen(fen), depth=3)
+        assert tt.scores
+        assert all(-SCORE_OFFSET <= score < SCORE_OFFSET for score in tt.scores)
+
+
+def test_same_key_keeps_best_move_when_new_result_has_none():
+    tt = TranspositionTable(1)
+    tt.store(42, 99, 10, 3, EXACT)
+    tt.store(42, 0, -5, 4, UPPER)
+    assert tt.probe(42) == (99, -5, 4, UPPER)
+
+
+def test_replaces_shallowest_entry_in_full_bucket():
+    tt = TranspositionTable(1)
+    buckets = entryCount(1) // 2
+    deep, shallow, new = 5, 5 + buckets, 5 + 2 * buckets
+    tt.store(deep, 1, 0, 9, EXACT)
+    tt.store(shallow, 2, 0, 1, EXACT)
+    tt.store(new, 3, 0, 4, EXACT)
+    assert tt.probe(deep) is not None
+    assert tt.probe(shallow) is None
+    assert tt.probe(new) == (3, 0, 4, EXACT)
+
+
+def test_old_entries_replaced_first():
+    tt = TranspositionTable(1)
+    buckets = entryCount(1) // 2
+    tt.store(5, 1, 0, 9, EXACT)
+    tt.newSearch()
+    tt.store(5 + buckets, 2, 0, 1, EXACT)
+    tt.store(5 + 2 * buckets, 3, 0, 1, EXACT)
+    assert tt.probe(5) is None
+    assert tt.probe(5 + buckets) is not None
+
+
+def test_size_is_bounded():
+    assert TranspositionTable(1).stats()['bytes'] <= 1024 * 1024
@@ -0,0 +1,81 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bench import BACKENDS
+from uci import UciEngine, parseGo, scoreText, timeLimitFor
+from search import MATE_SCORE
+
+
+def runEngine(commands, **options):
+    out = io.StringIO()
+    UciEngine(out, **options).run(commands)
+    return out.getvalue().splitlines()
+
+
+def test_handshake():
+    lines = runEngine(["uci", "isready", "quit", "go depth 1"])
+    assert lines[0].startswith("id name") and lines[-2:] == ["uciok", "readyok"]
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_position_and_bestmove(backend):
+    lines = runEngine(["position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", "d", "go depth 3"], boardType=BACKENDS[backend])
+    assert lines[0] == "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+    assert "score mate 1" in lines[-2]
+    assert lines[-1] == "bestmove a1a8"
+
+
+def test_position_with_moves():
+    lines = runEngine(["position startpos moves e2e4 e7e5 g1f3", "d"])
+    assert lines == ["rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"]
+
+
+def test_illegal_position_keeps_the_old_one():
+    lines = runEngine(["position startpos moves e2e5", "position fen nonsense", "d"])
+    assert lines[0].startswith("info string") and lines[1].startswith("info string")
+    assert lines[2] == BACKENDS['grid'].fromFen().toFen()
+
+
+def test_no_legal_moves():
+    assert runEngine(["position fen k7/2Q5/1K6/8/8/8/8/8 b - - 0 1", "go depth 2"]) == ["bestmove 0000"]
+
+
+def test_infinite_search_waits_for_stop():
+    engine = UciEngine(io.StringIO())
+    for _ in range(20):
+        engine.handle("go infinite")
+        engine.handle("stop")
+    assert engine.out.getvalue().count("bestmove") == 20
+
+
+def test_bad_option_is_reported():
+    lines = runEngine(["setoption name Hash value lots", "setoption name BookFile value /no/such/book", "isready"])
+    assert [line.startswith("info string") for line in lines] == [True, True, False]
+
+
+def test_parse_go():
+    assert parseGo("wtime 1000 btime 2000 winc 10 movestogo 5 infinite".split()) == {'wtime': 1000, 'btime': 2000, 'winc': 10, 'movestogo': 5, 'infinite': True}
+    assert parseGo("depth x searchmoves e2e4 depth 3".split()) == {}
+
+
+def test_time_limit():
+    assert timeLimitFor({'movetime': 500}, 'w') == 0.48
+    assert timeLimitFor({'depth': 5}, 'w') is None
+    assert timeLimitFor({'wtime': 30000, 'btime': 10}, 'w') == 1.0
+    assert timeLimitFor({'wtime': 30000, 'btime': 10}, 'b') == 0.001
+
+
+def test_score_text():
+    assert scoreText(35) == "cp 35"
+    assert scoreText(MATE_SCORE - 3) == "mate 2"
+    assert scoreText(-MATE_SCORE + 2) == "mate -1"
+
+
+def test_imports_need_no_display():
+    # The engine and the game module load without pygame; only creating a Game imports it
+    code = "import sys, uci, game, analyse, server; sys.exit('pygame' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__))).returncode == 0
@@ -0,0 +1,76 @@
+import queue
+
+import pytest
+
+from bench import BACKENDS
+from notation import parseSan
+from worker import Worker, boardSnapshot, gameEndCheck, gameEndMessage, gameStatus
+
+
+def playSan(board, sans):
+    for san in sans.split():
+        board.makeMove(parseSan(board, san))
+
+
+def test_results_are_delivered_in_order_with_tickets():
+    results = queue.Queue()
+    worker = Worker(lambda *result: results.put(result))
+    tickets = [worker.submit('square', pow, value, 2) for value in range(5)]
+    assert [results.get(timeout=5) for _ in tickets] == [('square', value * value, ticket) for value, ticket in zip(range(5), tickets)]
+    worker.close()
+    worker.thread.join(5)
+    assert not worker.thread.is_alive()
+
+
+def test_failing_job_delivers_error():
+    results = queue.Queue()
+    worker = Worker(lambda *result: results.put(result))
+    ticket = worker.submit('fen', BACKENDS['grid'].fromFen, "not a fen")
+    kind, error, errorTicket = results.get(timeout=5)
+    assert kind == 'error' and isinstance(error, ValueError) and errorTicket == ticket
+    assert worker.submit('square', pow, 3, 2) == ticket + 1
+    assert results.get(timeout=5) == ('square', 9, ticket + 1)
+    worker.close()
+
+
+def test_snapshot_is_independent_and_keeps_repetitions():
+    for backend in BACKENDS.values():
+        board = backend.fromFen()
+        playSan(board, "Nf3 Nf6 Ng1 Ng8")
+        snapshot = boardSnapshot(board)
+        assert snapshot.toFen() == board.toFen() and snapshot.repetitionCount() == 2
+        playSan(snapshot, "Nf3 Nf6 Ng1 Ng8")
+        assert snapshot.repetitionCount() == 3
+        assert board.repetitionCount() == 2 and len(board.history) == 4
+
+
+def test_game_end_check_hands_back_moves_only_when_asked():
+    board = BACKENDS['grid'].fromFen()
+    message, moves = gameEndCheck(board, True)
+    assert message is None and len(moves) == 20
+    assert gameEndCheck(board, False) == (None, None)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("fen, status, message", [
+    ("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3", 'checkmate', "Checkmate: Black won!"),
+    ("6kR/5ppp/8/8/8/8/8/6K1 b - - 0 1", None, None),
+    ("R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1", 'checkmate', "Checkmate: White won!"),
+    ("k7/8/K7/8/8/8/8/1R6 b - - 0 1", 'stalemate', "Stalemate!"),
+    ("4k3/8/8/8/8/8/8/4KB2 b - - 0 1", 'insufficient material', "Draw: Insufficient material!"),
+    ("4k3/8/8/8/8/8/8/4KR2 b - - 150 100", '75 move rule', "Draw: 75 move rule!"),
+    # Mate on the move that reaches the 75 move limit still wins
+    ("R5k1/5ppp/8/8/8/8/8/6K1 b - - 150 100", 'checkmate', "Checkmate: White won!"),
+])
+def test_game_status_and_message(backend, fen, status, message):
+    board = BACKENDS[backend].fromFen(fen)
+    legalMoves = board.generateAllLegalMoves(board.turn)
+    assert gameStatus(board) == gameStatus(board, legalMoves) == status
+    assert gameEndMessage(board) == message
+
+
+def test_threefold_repetition_message():
+    board = BACKENDS['grid'].fromFen()
+    playSan(board, "Nf3 Nf6 Ng1 Ng8 Nf3 Nf6 Ng1 Ng8")
+    assert gameStatus(board) == 'threefold repetition'
+    assert gameEndCheck(board, False) == ("Draw: Threefold repetition!", None)
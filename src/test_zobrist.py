@@ -0,0 +1,71 @@
+from bitboard import BitBoard
+from board import Board
+from constants import START_FEN
+from notation import parseSan
+from test_board import playRandomGame
+from zobrist import countRepetitions
+
+import pytest
+
+BACKENDS = [Board, BitBoard]
+
+
+def playSan(board, sans):
+    for san in sans.split():
+        board.makeMove(parseSan(board, san))
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_incremental_hash_matches_recompute(boardType):
+    board = boardType.fromFen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    start = board.hash
+    for _ in playRandomGame(board, 80, seed=5):
+        assert board.hash == boardType.fromFen(board.toFen()).hash
+    while board.history:
+        board.undoMove()
+    assert board.hash == start
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_transpositions_hash_equal(boardType):
+    first = boardType.fromFen(START_FEN)
+    second = boardType.fromFen(START_FEN)
+    playSan(first, "Nf3 Nf6 e3")
+    playSan(second, "e3 Nf6 Nf3")
+    assert first.hash == second.hash
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_en_passant_only_hashed_when_capturable(boardType):
+    # No black pawn can take on e3, so the en Passant square must not change the hash
+    assert boardType.fromFen("4k3/8/8/8/4P3/8/8/4K3 b - e3 0 1").hash == boardType.fromFen("4k3/8/8/8/4P3/8/8/4K3 b - - 0 1").hash
+    assert boardType.fromFen("4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1").hash != boardType.fromFen("4k3/8/8/8/3pP3/8/8/4K3 b - - 0 1").hash
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_threefold_repetition(boardType):
+    board = boardType.fromFen(START_FEN)
+    assert board.repetitionCount() == 1 and not board.isRepetition()
+    playSan(board, "Nf3 Nf6 Ng1 Ng8")
+    assert board.repetitionCount() == 2 and board.isRepetition()
+    playSan(board, "Nf3 Nf6 Ng1 Ng8")
+    assert board.repetitionCount() == 3
+
+
+@pytest.mark.parametrize("boardType", BACKENDS)
+def test_pawn_move_resets_repetition_and_fifty_move_count(boardType):
+    board = boardType.fromFen("4k3/8/8/8/8/8/4P3/4K3 w - - 99 80")
+    assert not board.isFiftyMoveDraw()
+    playSan(board, "Kd1")
+    assert board.isFiftyMoveDraw()
+    board.undoMove()
+    playSan(board, "e4 Kd8 Kd1 Ke8 Ke1")
+    assert board.halfMoveClock == 4 and not board.isFiftyMoveDraw()
+
+
+def test_count_repetitions_limit_and_window():
+    # Same side to move every second entry; only the last halfMoveClock plies are scanned
+    history = [7, 1, 7, 2, 7, 3]
+    assert countRepetitions(history, 7, 6) == 2
+    assert countRepetitions(history, 7, 6, limit=1) == 1
+    assert countRepetitions(history, 7, 2) == 0
@@ -0,0 +1,153 @@
+from array import array
+
+# Bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Packed entry data (64 bits)
+# - bits 0-14: best move key (move.moveKey), 0 = none
+# - bits 15-34: score + SCORE_OFFSET
+# - bits 35-42: depth
+# - bits 43-44: bound type
+# - bits 45-50: search age
+SCORE_OFFSET = 1 << 19
+SCORE_MASK = (1 << 20) - 1
+AGE_MASK = 63
+
+ENTRY_BYTES = 16        # Two 64-bit words per entry
+BUCKET_SIZE = 2         # Entries probed per hash index
+
+
+def entryCount(sizeMb):
+    # Largest power of two number of entries that fits in sizeMb
+    entries = BUCKET_SIZE
+    while entries * 2 * ENTRY_BYTES <= sizeMb * 1024 * 1024:
+        entries *= 2
+    return entries
+
+
+def tableBytes(sizeMb):
+    # Bytes used by a table of sizeMb (the size of a buffer to share)
+    return entryCount(sizeMb) * ENTRY_BYTES
+
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table keyed by Zobrist hash
+    - Stores depth, score, bound type and best move packed into 64-bit words of one flat array
+    - Each entry is (key ^ data, data) so a torn or foreign entry fails the key check
+    - Buckets of two entries: same key is updated, otherwise the stale or shallowest entry is replaced
+    - Counts probes, hits, collisions and stores, and estimates how full the table is
+    - Can live in shared memory so several search processes share one table
+    """
+    def __init__(self, sizeMb=16, buffer=None):
+        # sizeMb caps the memory used; the entry count is rounded down to a power of two
+        # buffer places the table in existing memory (e.g. shared memory) instead of a private array
+        entries = entryCount(sizeMb)
+
+        self.entryCount = entries
+        self.bucketMask = entries // BUCKET_SIZE - 1
+        if buffer is None:
+            self.words = array('Q', bytes(entries * ENTRY_BYTES))
+        else:
+            self.words = memoryview(buffer)[:entries * ENTRY_BYTES].cast('Q')
+        self.age = 0
+        self.resetStats()
+
+
+    def resetStats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+
+    def newSearch(self):
+        # Ages the table so entries from earlier searches are replaced first
+        self.age = (self.age + 1) & AGE_MASK
+
+
+    def clear(self):
+        # Empties the table (e.g. for a new game)
+        self.words[:] = array('Q', bytes(self.entryCount * ENTRY_BYTES))
+        self.age = 0
+        self.resetStats()
+
+
+    def probe(self, key):
+        # Returns (moveKey, score, depth, bound) for the position, or None
+        self.probes += 1
+        words = self.words
+        index = (key & self.bucketMask) * BUCKET_SIZE * 2
+
+        for slot in range(index, index + BUCKET_SIZE * 2, 2):
+            data = words[slot + 1]
+            if words[slot] ^ data == key:
+                self.hits += 1
+                return (data & 0x7FFF, ((data >> 15) & SCORE_MASK) - SCORE_OFFSET, (data >> 35) & 0xFF, (data >> 43) & 3)
+
+        if words[index + 1]:
+            self.collisions += 1
+        return None
+
+
+    def store(self, key, moveKey, score, depth, bound):
+        # Stores a search result, choosing the entry to replace within the bucket
+        self.stores += 1
+        words = self.words
+        index = (key & self.bucketMask) * BUCKET_SIZE * 2
+
+        victim = None
+        victimValue = None
+        for slot in range(index, index + BUCKET_SIZE * 2, 2):
+            data = words[slot + 1]
+
+            # Same position: keep the old best move if the new result has none
+            if words[slot] ^ data == key:
+                if not moveKey:
+                    moveKey = data & 0x7FFF
+                victim = slot
+                break
+
+            if not data:
+                victim = slot
+                break
+
+            # Prefer replacing entries from old searches, then shallow entries
+            stale = ((data >> 45) & AGE_MASK) != self.age
+            value = (data >> 35) & 0xFF if not stale else -1
+            if victimValue is None or value < victimValue:
+                victim = slot
+                victimValue = value
+        else:
+            self.replacements += 1
+
+        data = moveKey | (score + SCORE_OFFSET) << 15 | min(depth, 255) << 35 | bound << 43 | self.age << 45
+        words[victim] = key ^ data
+        words[victim + 1] = data
+
+
+    def hashFull(self):
+        # Permille of a sample of entries that were written by the current search
+        sample = min(1000, self.entryCount)
+        used = 0
+        for slot in range(0, sample * 2, 2):
+            data = self.words[slot + 1]
+            if data and ((data >> 45) & AGE_MASK) == self.age:
+                used += 1
+        return used * 1000 // sample
+
+
+    def stats(self):
+        # Summary of table usage for sizing
+        return {
+            'entries': self.entryCount,
+            'bytes': self.entryCount * ENTRY_BYTES,
+            'probes': self.probes,
+            'hits': self.hits,
+            'hitRate': self.hits / self.probes if self.probes else 0.0,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'hashFull': self.hashFull(),
+        }
@@ -0,0 +1,238 @@
+import sys
+import threading
+
+from board import Board
+from search import Search, MATE_SCORE, MAX_DEPTH
+from parallel import findMove
+from tablebase import Tablebase
+from book import OpeningBook
+from constants import START_FEN
+
+ENGINE_NAME = "ChessAI"
+ENGINE_AUTHOR = "benjohnsn"
+
+DEFAULT_HASH_MB = 16
+
+# Share of the remaining clock spent on one move when no moves to go are given
+MOVES_TO_GO = 30
+
+# Milliseconds kept back from each move for the reply to reach the GUI
+MOVE_OVERHEAD_MS = 20
+
+
+def scoreText(score):
+    # UCI score: centipawns, or moves to mate (negative when being mated)
+    if abs(score) >= MATE_SCORE - MAX_DEPTH:
+        plies = MATE_SCORE - abs(score)
+        moves = (plies + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def parseGo(tokens):
+    # Reads the parameters of a go command into a dict (times in milliseconds)
+    params = {}
+    index = 0
+    while index < len(tokens):
+        name = tokens[index]
+        if name == 'infinite':
+            params['infinite'] = True
+        elif name == 'searchmoves':
+            # Restricting the root moves is not supported: the rest of the command is the move list
+            break
+        elif index + 1 < len(tokens):
+            try:
+                params[name] = int(tokens[index + 1])
+                index += 1
+            except ValueError:
+                pass
+        index += 1
+    return params
+
+
+def timeLimitFor(params, turn):
+    # Seconds to spend on the move, or None to search until the depth or node limit (or stop)
+    if 'movetime' in params:
+        return max(params['movetime'] - MOVE_OVERHEAD_MS, 1) / 1000
+    remaining = params.get('wtime' if turn == 'w' else 'btime')
+    if remaining is None:
+        return None
+    increment = params.get('winc' if turn == 'w' else 'binc', 0)
+    movesToGo = params.get('movestogo', MOVES_TO_GO)
+    budget = remaining / max(movesToGo, 1) + increment * 3 // 4
+    return max(min(budget, remaining - MOVE_OVERHEAD_MS), 1) / 1000
+
+
+class UciEngine:
+    """
+    UCI protocol front end
+    - Reads commands line by line and writes replies to an output stream
+    - Searches on a worker thread, so stop, isready and quit are answered while it runs
+    - Imports no GUI code, so it runs on machines without a display
+    """
+    def __init__(self, out=sys.stdout, boardType=Board, tablebase=None, book=None):
+        # tablebase and book start the engine with an endgame Tablebase and an OpeningBook (also set by setoption)
+        self.out = out
+        self.outLock = threading.Lock()
+        self.boardType = boardType
+        self.board = boardType.fromFen(START_FEN)
+        self.hashSizeMb = DEFAULT_HASH_MB
+        self.tablebase = tablebase
+        self.book = book
+        self.engine = self.newEngine()
+        self.thread = None
+        self.stopRequested = threading.Event()
+
+
+    def newEngine(self):
+        return Search(onInfo=self.sendInfo, hashSizeMb=self.hashSizeMb, tablebase=self.tablebase)
+
+
+    def send(self, line):
+        with self.outLock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+
+    def sendInfo(self, depth, score, nodes, elapsed, pv):
+        milliseconds = int(elapsed * 1000)
+        nps = int(nodes / elapsed) if elapsed > 0 else 0
+        moves = ' '.join(move.toUci() for move in pv)
+        self.send(f"info depth {depth} score {scoreText(score)} nodes {nodes} nps {nps} time {milliseconds} pv {moves}")
+
+
+    def run(self, lines=sys.stdin):
+        # Handles commands until quit or the end of the input
+        for line in lines:
+            if not self.handle(line):
+                break
+        self.stopSearch()
+
+
+    def handle(self, line):
+        # Handles one command line, returns False on quit
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max 1024")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("option name BookFile type string default <empty>")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.stopSearch()
+            self.engine = self.newEngine()
+            self.board = self.boardType.fromFen(START_FEN)
+        elif command == 'setoption':
+            self.setOption(args)
+        elif command == 'position':
+            self.stopSearch()
+            self.setPosition(args)
+        elif command == 'go':
+            self.stopSearch()
+            self.go(parseGo(args))
+        elif command == 'stop':
+            self.stopSearch()
+        elif command == 'quit':
+            return False
+        elif command == 'd':
+            self.send(self.board.toFen())
+        return True
+
+
+    def setOption(self, args):
+        # setoption name <name> value <value>
+        if 'name' not in args:
+            return
+        nameEnd = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:nameEnd]).lower()
+        value = ' '.join(args[nameEnd + 1:])
+        empty = value in ('', '<empty>')
+        self.stopSearch()
+        try:
+            if name == 'hash':
+                self.hashSizeMb = max(1, int(value))
+            elif name == 'tablebasepath':
+                self.tablebase = None if empty else Tablebase(value)
+            elif name == 'bookfile':
+                self.book = None if empty else OpeningBook(value)
+            else:
+                return
+        except (ValueError, OSError) as error:
+            self.send(f"info string {error}")
+            return
+        self.engine = self.newEngine()
+
+
+    def setPosition(self, args):
+        # position startpos|fen <fen> [moves <uci> ...]
+        movesAt = args.index('moves') if 'moves' in args else len(args)
+        if args[:1] == ['fen']:
+            fen = ' '.join(args[1:movesAt])
+        else:
+            fen = START_FEN
+
+        try:
+            board = self.boardType.fromFen(fen)
+            for uci in args[movesAt + 1:]:
+                board.makeMove(findMove(board, uci))
+        except ValueError as error:
+            self.send(f"info string {error}")
+            return
+        self.board = board
+
+
+    def go(self, params):
+        # Starts a search on a worker thread that replies with bestmove when it ends
+        # - An infinite search only replies once stopped, as the protocol requires
+        if self.book and not params.get('infinite'):
+            move = self.book.chooseMove(self.board)
+            if move:
+                self.send(f"bestmove {move.toUci()}")
+                return
+
+        depth = params.get('depth')
+        nodes = params.get('nodes')
+        timeLimit = None if params.get('infinite') else timeLimitFor(params, self.board.turn)
+        if depth is not None:
+            depth = max(1, min(depth, MAX_DEPTH))
+
+        # The search works on its own copy, so a new position command never touches a board in use
+        board = self.boardType.fromFen(self.board.toFen())
+        board.hashHistory = list(self.board.hashHistory)
+
+        # Cleared here rather than in the search, so a stop sent right after go is never lost
+        self.stopRequested.clear()
+        self.engine.clearStop()
+        self.thread = threading.Thread(target=self.searchAndReply, args=(board, depth, timeLimit, nodes, params.get('infinite', False)), daemon=True)
+        self.thread.start()
+
+
+    def searchAndReply(self, board, depth, timeLimit, nodes, infinite):
+        move = self.engine.search(board, depth=depth, timeLimit=timeLimit, nodeLimit=nodes)
+        if infinite:
+            self.stopRequested.wait()
+        self.send(f"bestmove {move.toUci() if move else '0000'}")
+
+
+    def stopSearch(self):
+        # Stops a running search and waits for its bestmove
+        if self.thread is not None:
+            self.stopRequested.set()
+            self.engine.stop()
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    UciEngine().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import queue
+import threading
+
+
+def boardSnapshot(board):
+    # An independent copy of a board (same position, counters and repetition history) for another thread to use
+    snapshot = type(board).fromFen(board.toFen())
+    snapshot.hashHistory = list(board.hashHistory)
+    return snapshot
+
+
+# Message shown for each way a game can end in a draw
+DRAW_MESSAGES = {
+    'stalemate': "Stalemate!",
+    'insufficient material': "Draw: Insufficient material!",
+    '75 move rule': "Draw: 75 move rule!",
+    'threefold repetition': "Draw: Threefold repetition!",
+}
+
+
+def gameStatus(board, legalMoves=None):
+    # Describes how the game stands after the last move (None while it is still going)
+    # - Checkmate and stalemate come first: a move that mates wins even if it also completes a draw condition
+    # - legalMoves: the side to move's legal moves if they were generated anyway, otherwise hasLegalMove
+    #   stops at the first legal move it finds
+    hasMove = board.hasLegalMove(board.turn) if legalMoves is None else bool(legalMoves)
+    if not hasMove:
+        return 'checkmate' if board.inCheck(board.turn) else 'stalemate'
+    if board.insufficientMaterial():
+        return 'insufficient material'
+    if board.halfMoveClock >= 150:
+        return '75 move rule'
+    if board.repetitionCount() >= 3:
+        return 'threefold repetition'
+    return None
+
+
+def gameEndMessage(board, legalMoves=None):
+    # The game's status as the message shown to the players, or None if it goes on
+    status = gameStatus(board, legalMoves)
+    if status == 'checkmate':
+        return "Checkmate: Black won!" if board.turn == 'w' else "Checkmate: White won!"
+    return DRAW_MESSAGES.get(status)
+
+
+def gameEndCheck(board, withMoves):
+    # (game end message or None, legal moves or None) of a board
+    # - withMoves: when a player is to move, the legal moves are needed for piece selection anyway, so they are
+    #   generated once here and handed back to the board the copy was made from
+    # - Otherwise (the engine is to move) hasLegalMove decides without generating every move
+    legalMoves = board.legalMoves() if withMoves else None
+    return gameEndMessage(board, legalMoves), legalMoves
+
+
+class Worker:
+    """
+    Background worker thread for slow game jobs (engine search, game end checks)
+    - Jobs run one at a time, in the order they were submitted
+    - Each result is handed to a deliver callback as (kind, result, ticket), e.g. to post it to an event queue
+    - A job that raises delivers ('error', exception, ticket) instead
+    - Tickets let the receiver drop results of jobs it no longer waits for
+    """
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.jobs = queue.Queue()
+        self.ticket = 0
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+
+    def submit(self, kind, function, *args):
+        # Queues function(*args) and returns the ticket its result will carry
+        self.ticket += 1
+        self.jobs.put((kind, function, args, self.ticket))
+        return self.ticket
+
+
+    def loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            kind, function, args, ticket = job
+            try:
+                result = function(*args)
+            except Exception as error:
+                kind, result = 'error', error
+            self.deliver(kind, result, ticket)
+
+
+    def close(self):
+        # Lets the thread finish its current job and exit
+        self.jobs.put(None)
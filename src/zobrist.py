@@ -0,0 +1,39 @@
+import random
+
+from constants import PIECE_TYPES
+
+# Zobrist keys (fixed seed so hashes are stable between runs and processes)
+# - PIECE_KEYS[colour][type][row * 8 + col]
+# - SIDE_KEY is xored in when black is to move
+# - CASTLING_KEYS[rights] with rights bits 1 = K, 2 = Q, 4 = k, 8 = q
+# - EN_PASSANT_KEYS[col] is only xored in when the side to move can capture en passant
+keyGenerator = random.Random(20240601)
+
+PIECE_KEYS = {colour: {pieceType: [keyGenerator.getrandbits(64) for _ in range(64)] for pieceType in PIECE_TYPES} for colour in ('w', 'b')}
+SIDE_KEY = keyGenerator.getrandbits(64)
+CASTLING_KEYS = [0] + [keyGenerator.getrandbits(64) for _ in range(15)]
+EN_PASSANT_KEYS = [keyGenerator.getrandbits(64) for _ in range(8)]
+
+WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE = 1, 2, 4, 8
+
+# FEN castling characters for each rights bit
+CASTLING_CHARS = (('K', WHITE_KING_SIDE), ('Q', WHITE_QUEEN_SIDE), ('k', BLACK_KING_SIDE), ('q', BLACK_QUEEN_SIDE))
+
+# Halfmove clock value at which the fifty move rule applies
+FIFTY_MOVE_PLIES = 100
+
+
+def countRepetitions(hashHistory, key, halfMoveClock, limit=None):
+    # Counts earlier occurrences of the position with hash key
+    # - hashHistory holds the hash before each move played, oldest first
+    # - Only positions since the last capture or pawn move (halfMoveClock plies) with the same side to move are scanned
+    # - Stops early once limit occurrences are found
+    count = 0
+    end = len(hashHistory)
+    start = max(end - halfMoveClock, 0)
+    for index in range(end - 4, start - 1, -2):
+        if hashHistory[index] == key:
+            count += 1
+            if count == limit:
+                break
+    return count